@@ -6,6 +6,7 @@ from .algebras import Algebra, Subalgebra, Quotient, AlgebraProduct
 from .classes import Quasivariety
 from .congruences import Congruence, CongruenceSystem, sup_proj
 from .lattices import Lattice, LatticeProduct, Sublattice, LatticeQuotient
+from .distributive import DistributiveLattice, lattice_to_distributive
 from .models import Model, Submodel, Product
 from .morphisms import Homomorphism, Embedding, Isomorphism
 from .theories import Theory
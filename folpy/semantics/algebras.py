@@ -4,7 +4,10 @@
 from itertools import chain, permutations, combinations
 from functools import lru_cache
 
-from ..utils import indent
+from ..utils import indent, indexed_tables, IsoClassStore
+from ..utils.methods.terms import (TERM_LIMIT, term_operation,
+                                   maltsev_identities, nu_identities,
+                                   wnu_identities, siggers_identities)
 from .models import Model, Submodel, Product
 from .morphisms import Homomorphism
 from .modelfunctions import Operation, Constant
@@ -210,14 +213,86 @@ class Algebra(Model):
         """
         congruences = []
         for factor in factors:
-            homomorphisms = self.homomorphisms_to(factor,
-                                                  surj=True)
-            for homomorphism in homomorphisms:
-                con = homomorphism.kernel()
+            for con in self.image_kernels(factor):
                 if con not in congruences:
                     congruences.append(con)
         return congruences
 
+    def homomorphic_images(self):
+        """
+        Devuelve las imagenes homomorficas del algebra salvo isomorfismo,
+        recorriendo Con(A): una lista de pares (A/θ, congruencias cuyo
+        cociente es isomorfo a A/θ). Los cocientes se separan por
+        certificado canonico y se calculan una vez por algebra.
+
+        >>> from folpy.examples.lattices import rhombus
+        >>> sorted((len(image), len(kernels))
+        ...        for image, kernels in rhombus.homomorphic_images())
+        [(1, 1), (2, 2), (4, 1)]
+        """
+        images, kernels = self.__images()
+        return list(zip(images, kernels))
+
+    def image_kernels(self, target):
+        """
+        Devuelve las congruencias θ tales que A/θ es isomorfo a target (los
+        nucleos de los homomorfismos de A sobre target), buscando a target
+        por certificado entre las imagenes homomorficas. Si target no es
+        imagen homomorfica devuelve una lista vacia.
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> len(rhombus.image_kernels(gen_chain(2)))
+        2
+        >>> rhombus.image_kernels(gen_chain(3))
+        []
+        """
+        images, kernels = self.__images()
+        slot = images.index(target)
+        if slot is None:
+            return []
+        return list(kernels[slot])
+
+    def homomorphism_with_kernel(self, congruence, target):
+        """
+        Devuelve un homomorfismo de A sobre target con nucleo congruence, o
+        None si A/congruence no es isomorfo a target
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> c2 = gen_chain(2)
+        >>> theta = rhombus.image_kernels(c2)[0]
+        >>> rhombus.homomorphism_with_kernel(theta, c2).kernel() == theta
+        True
+        """
+        quotient = Quotient(self, congruence)
+        images = self.__images()[0]
+        if images.key(quotient) != images.key(target) or \
+                images.digest(quotient) != images.digest(target):
+            return None
+        natural = quotient.natural_map()
+        iso = images.isomorphism(quotient, target)
+        d = {(x,): iso(natural(x)) for x in self.universe}
+        return Homomorphism(d, self, target, self.type, surj=True)
+
+    def __images(self):
+        """
+        Calcula (IsoClassStore de los cocientes, lista de los nucleos de
+        cada uno) recorriendo las congruencias
+        """
+        tables = indexed_tables(self)
+        if "homomorphic_images" not in tables.cache:
+            images = IsoClassStore(self.type)
+            kernels = []
+            for congruence in self.congruences():
+                quotient = Quotient(self, congruence)
+                slot = images.index(quotient)
+                if slot is None:
+                    images.add(quotient)
+                    kernels.append([congruence])
+                else:
+                    kernels[slot].append(congruence)
+            tables.cache["homomorphic_images"] = (images, kernels)
+        return tables.cache["homomorphic_images"]
+
     def congruences(self):
         """
         Devuelve todas las congruencias del algebra
@@ -269,6 +344,72 @@ class Algebra(Model):
         from .lattices import CongruenceLattice
         return CongruenceLattice(self.congruences())
 
+    def term_with_identities(self, n, identities, subtype=None,
+                             limit=TERM_LIMIT):
+        """
+        Si existe, devuelve una operacion term n-aria que cumple las
+        identidades (en el formato de Model.polymorphisms), como tabla;
+        si no, devuelve False. Si la busqueda pasa de limit operaciones
+        term restringidas sin decidir, devuelve None (con limit=None no se
+        corta nunca).
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> f = gen_chain(3).term_with_identities(2, ["symmetric"])
+        >>> f(0, 2) == f(2, 0)
+        True
+        """
+        return term_operation(self, n, identities, subtype, limit)
+
+    def has_maltsev_term(self, limit=TERM_LIMIT):
+        """
+        Si existe, devuelve un termino de Maltsev (m(x,y,y) = x = m(y,y,x),
+        es decir, congruencias permutables en la variedad); si no, False.
+        Devuelve None si no se decide dentro de limit (ver
+        term_with_identities).
+
+        >>> from folpy.examples.lattices import M3
+        >>> M3.has_maltsev_term()
+        False
+        """
+        return self.term_with_identities(3, maltsev_identities(),
+                                         limit=limit)
+
+    def has_nu_term(self, k=3, limit=TERM_LIMIT):
+        """
+        Si existe, devuelve un termino de casi unanimidad k-ario; si no,
+        False
+
+        >>> from folpy.examples.lattices import N5
+        >>> m = N5.has_nu_term()
+        >>> m(1, 1, 4), m(1, 4, 1), m(4, 1, 1)
+        (1, 1, 1)
+        """
+        return self.term_with_identities(k, nu_identities(k), limit=limit)
+
+    def has_wnu(self, k=3, limit=TERM_LIMIT):
+        """
+        Si existe, devuelve un termino de casi unanimidad debil k-ario; si
+        no, False
+
+        >>> from folpy.examples.lattices import rhombus
+        >>> bool(rhombus.has_wnu(4))
+        True
+        """
+        return self.term_with_identities(k, wnu_identities(k), limit=limit)
+
+    def has_siggers_term(self, limit=TERM_LIMIT):
+        """
+        Si existe, devuelve un termino de Siggers idempotente
+        s(a,r,e,a) = s(r,a,r,e) (el algebra es de Taylor); si no, False
+
+        >>> from folpy.examples.lattices import M3
+        >>> s = M3.has_siggers_term()
+        >>> s(1, 2, 3, 1) == s(2, 1, 2, 3)
+        True
+        """
+        return self.term_with_identities(4, siggers_identities(),
+                                         limit=limit)
+
     def restrict(self, subuniverse, subtype=None):
         """
         Devuelve la restriccion del algebra al subuniverso que se supone
@@ -4,6 +4,7 @@
 import itertools
 
 from ..syntax import AlgebraicType
+from ..utils import IsoClassStore
 from .morphisms import Homomorphism
 from .congruences import sup_proj
 from .modelfunctions import Operation, Constant
@@ -40,11 +41,13 @@ class Quasivariety(object):
         if self.rsi:
             return self.rsi
         sub = []
+        isoclasses = IsoClassStore(self.type)
         for a in self.generators:
             sub.append(a)
+            isoclasses.add(a)
             suba = a.substructures()
             for s in suba:
-                if len(s) != 1 and not s.is_isomorphic_to_any(sub):
+                if len(s) != 1 and isoclasses.add(s):
                     sub.append(s.continous()[0])
         n = len(sub)
         for i in range(n - 1, -1, -1):
@@ -53,11 +56,8 @@ class Quasivariety(object):
             t = False
             for j in range(0, len(sub)):
                 if i != j:
-                    homomorphisms = sub[i].homomorphisms_to(sub[j],
-                                                            self.type,
-                                                            surj=True)
-                    for f in homomorphisms:
-                        ker = ker & {tuple(t) for t in f.kernel().table()}
+                    for kernel in sub[i].image_kernels(sub[j]):
+                        ker = ker & {tuple(t) for t in kernel.table()}
                         if ker == mincon:
                             sub.pop(i)
                             t = True
@@ -86,9 +86,9 @@ class Quasivariety(object):
             mincon = {(x, x) for x in a.universe}
             t = False
             for b in rsi:
-                for f in a.homomorphisms_to(b, a.type, surj=True):
-                    ker = ker & {tuple(t) for t in f.kernel().table()}
-                    F.add(f)
+                for kernel in a.image_kernels(b):
+                    ker = ker & {tuple(t) for t in kernel.table()}
+                    F.add(a.homomorphism_with_kernel(kernel, b))
                     if ker == mincon:
                         t = True
                         break
@@ -118,8 +118,7 @@ class Quasivariety(object):
         elif type(f) == Homomorphism:
             result = []
             for b in rsi:
-                for f in a.homomorphisms_to(b, a.type, surj=True):
-                    result.append(f.kernel())
+                result += a.image_kernels(b)
             return list(set(result))
         return [a.mincon()]
 
@@ -202,6 +202,29 @@ class Congruence(Partition):
         if check_operations:
             assert self._are_operations_preserved()
 
+    @classmethod
+    def from_labels(cls, elements, labels, algebra):
+        """
+        Congruencia que relaciona los elementos que tienen la misma
+        etiqueta, armando los bloques directamente
+
+        >>> from folpy.examples.lattices import rhombus
+        >>> rel = Congruence.from_labels([0, 1, 2, 3], [0, 1, 0, 1], rhombus)
+        >>> rel(1, 3), rel(0, 3)
+        (True, False)
+        """
+        v = {}
+        roots = {}
+        for e, label in zip(elements, labels):
+            if label in roots:
+                r = roots[label]
+                v[e] = r
+                v[r] = _CardinalBlock(v[r].value - 1)
+            else:
+                roots[label] = e
+                v[e] = _CardinalBlock(-1)
+        return cls(v, algebra)
+
     def __and__(self, other):
         """
         Genera la congruencia a partir de la intersección de 2 congruencias
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+from ..utils.misc import bits
+from .lattices import Lattice
+from .modelfunctions import Operation_decorator
+
+
+class DistributiveLattice(object):
+
+    """
+    Reticulado distributivo representado por su poset de join-irreducibles
+    (dualidad de Birkhoff). Los elementos son los down-sets de J(L),
+    guardados como bitmasks sobre la lista de irreducibles, asi que el
+    supremo y el infimo son OR y AND de bits. Nunca se arman las tablas.
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> c3, translation = lattice_to_distributive(model_to_lattice(
+    ...     gen_chain(3)))
+    >>> translation
+    {0: 0, 1: 1, 2: 3}
+    >>> big = c3 ** 12
+    >>> len(big)
+    531441
+    >>> big.join(0b01, 0b100) == 0b101
+    True
+    >>> 0b10 in big
+    False
+    """
+
+    def __init__(self, irreducibles, below, name=""):
+        """
+        Toma la lista de join-irreducibles y, para cada uno, un bitmask con
+        los irreducibles que estan por debajo (incluido el mismo).
+        """
+        assert len(irreducibles) == len(below)
+        self.irreducibles = list(irreducibles)
+        self.below = list(below)
+        self.above = [0] * len(self.below)
+        for i, mask in enumerate(self.below):
+            assert mask >> i & 1, "below tiene que ser reflexivo"
+            for j in bits(mask):
+                self.above[j] |= 1 << i
+        self.name = name
+        self.top = (1 << len(self.irreducibles)) - 1
+        self.counts = {}
+
+    def __repr__(self):
+        if self.name:
+            return "DistributiveLattice(name= %s)\n" % self.name
+        return "DistributiveLattice(%s)" % self.irreducibles
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.elements()
+
+    def __contains__(self, x):
+        return self.is_downset(x)
+
+    def __mul__(self, other):
+        """
+        Producto de reticulados distributivos, que corresponde a la union
+        disjunta de los posets de irreducibles.
+        """
+        return distributive_product([self, other])
+
+    def __pow__(self, exponent):
+        """
+        Potencia de un reticulado distributivo
+        """
+        return distributive_product([self] * exponent)
+
+    def join(self, x, y):
+        """
+        devuelve el supremo de x e y para el reticulado
+        """
+        return x | y
+
+    def meet(self, x, y):
+        """
+        devuelve el infimo de x e y para el reticulado
+        """
+        return x & y
+
+    def le(self, x, y):
+        """
+        devuelve la relación <= para los elementos x e y del reticulado
+        """
+        return not x & ~y
+
+    def lt(self, x, y):
+        """
+        devuelve la relación < para los elementos x e y del reticulado
+        """
+        return x != y and self.le(x, y)
+
+    def max(self):
+        """
+        devuelve el maximo del reticulado
+        """
+        return self.top
+
+    def min(self):
+        """
+        devuelve el minimo del reticulado
+        """
+        return 0
+
+    def rank(self, x):
+        """
+        Devuelve el rango de x, es decir la cantidad de irreducibles por
+        debajo de x.
+        """
+        return bin(x).count("1")
+
+    def is_downset(self, x):
+        """
+        Decide si el bitmask x es un down-set de J(L)
+        """
+        if x & ~self.top or x < 0:
+            return False
+        return all(not self.below[i] & ~x for i in bits(x))
+
+    def downset(self, irreducibles):
+        """
+        Devuelve el elemento generado por una lista de irreducibles (el
+        supremo de ellos)
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> from folpy.semantics.lattices import model_to_lattice
+        >>> d, t = lattice_to_distributive(model_to_lattice(gen_chain(4)))
+        >>> d.downset([2])
+        3
+        """
+        result = 0
+        for j in irreducibles:
+            result |= self.below[self.irreducibles.index(j)]
+        return result
+
+    def join_irreducibles(self):
+        """
+        Devuelve los join-irreducibles del reticulado como elementos
+        """
+        return list(self.below)
+
+    def covers(self, x):
+        """
+        Devuelve una lista con los elementos que cubren a x
+        """
+        return [x | 1 << i for i in bits(self.top & ~x)
+                if not self.below[i] & ~(x | 1 << i)]
+
+    def covers_by(self, x):
+        """
+        Devuelve una lista con los elementos que son cubiertos por x
+        """
+        return [x & ~(1 << i) for i in bits(x)
+                if not self.above[i] & x & ~(1 << i)]
+
+    def elements(self):
+        """
+        Generador de todos los elementos (down-sets). Recorre los
+        irreducibles en un orden compatible con el orden del poset.
+        """
+        order = self.linear_extension()
+        n = len(order)
+
+        def extend(k, current):
+            if k == n:
+                yield current
+                return
+            i = order[k]
+            yield from extend(k + 1, current)
+            if not self.below[i] & ~(current | 1 << i):
+                yield from extend(k + 1, current | 1 << i)
+
+        return extend(0, 0)
+
+    def linear_extension(self):
+        """
+        Devuelve los indices de los irreducibles ordenados por cantidad de
+        elementos por debajo (una extension lineal del orden).
+        """
+        return sorted(range(len(self.below)),
+                      key=lambda i: bin(self.below[i]).count("1"))
+
+    def count(self, subset=None):
+        """
+        Cuenta los down-sets del subposet dado por el bitmask subset sin
+        enumerarlos: separa en componentes conexas y usa
+        #O(P) = #O(P - ↑x) + #O(P - ↓x), memoizando por bitmask.
+
+        >>> from folpy.examples.lattices import rhombus
+        >>> from folpy.semantics.lattices import model_to_lattice
+        >>> d, t = lattice_to_distributive(model_to_lattice(rhombus))
+        >>> d.count()
+        4
+        """
+        if subset is None:
+            subset = self.top
+        if subset in self.counts:
+            return self.counts[subset]
+        if not subset:
+            return 1
+        components = self.components(subset)
+        if len(components) > 1:
+            result = 1
+            for component in components:
+                result *= self.count(component)
+        else:
+            # elijo el irreducible mas comparable para partir
+            i = max(bits(subset),
+                    key=lambda i: bin((self.below[i] | self.above[i]) &
+                                      subset).count("1"))
+            result = (self.count(subset & ~self.above[i]) +
+                      self.count(subset & ~self.below[i]))
+        self.counts[subset] = result
+        return result
+
+    def components(self, subset):
+        """
+        Devuelve las componentes conexas (como bitmasks) del grafo de
+        comparabilidad restringido a subset
+        """
+        result = []
+        rest = subset
+        while rest:
+            low = rest & -rest
+            component = low
+            frontier = low
+            while frontier:
+                new = 0
+                for i in bits(frontier):
+                    new |= (self.below[i] | self.above[i])
+                new &= subset & ~component
+                component |= new
+                frontier = new
+            result.append(component)
+            rest &= ~component
+        return result
+
+    def subuniverse(self, elements):
+        """
+        Devuelve el subreticulado generado por una lista de elementos como
+        un conjunto de bitmasks
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> from folpy.semantics.lattices import model_to_lattice
+        >>> d, t = lattice_to_distributive(model_to_lattice(gen_chain(3)))
+        >>> sorted((d ** 2).subuniverse([0b01, 0b100]))
+        [0, 1, 4, 5]
+        """
+        result = set(elements)
+        new = set(elements)
+        while new:
+            current = list(result)
+            found = set()
+            for x in new:
+                for y in current:
+                    for z in (x | y, x & y):
+                        if z not in result:
+                            found.add(z)
+            result |= found
+            new = found
+        return result
+
+    def to_lattice(self):
+        """
+        Materializa el reticulado como un Lattice, con universo la lista de
+        bitmasks.
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> from folpy.semantics.lattices import model_to_lattice
+        >>> d, t = lattice_to_distributive(model_to_lattice(gen_chain(3)))
+        >>> lat = (d * d).to_lattice()
+        >>> len(lat), lat.is_distributive()
+        (9, True)
+        """
+        universe = sorted(self.elements())
+
+        @Operation_decorator(universe)
+        def join(x, y):
+            return x | y
+
+        @Operation_decorator(universe)
+        def meet(x, y):
+            return x & y
+
+        return Lattice(universe, join, meet, name=self.name,
+                       distributive=True)
+
+
+def lattice_to_distributive(lattice):
+    """
+    Convierte un Lattice distributivo en un DistributiveLattice a partir de
+    sus join-irreducibles. Devuelve el reticulado y un diccionario que
+    traduce cada elemento al down-set de irreducibles por debajo de el.
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> d, t = lattice_to_distributive(model_to_lattice(rhombus))
+    >>> d.irreducibles
+    [1, 2]
+    >>> t
+    {0: 0, 1: 1, 2: 2, 3: 3}
+    """
+    assert isinstance(lattice, Lattice), "No es un reticulado"
+    assert lattice.is_distributive(), "El reticulado no es distributivo"
+    irreducibles = lattice.join_irreducibles()
+    below = []
+    for j in irreducibles:
+        mask = 0
+        for i, k in enumerate(irreducibles):
+            if lattice.le(k, j):
+                mask |= 1 << i
+        below.append(mask)
+    translation = {}
+    for a in lattice.universe:
+        mask = 0
+        for i, j in enumerate(irreducibles):
+            if lattice.le(j, a):
+                mask |= 1 << i
+        translation[a] = mask
+    return (DistributiveLattice(irreducibles, below, name=lattice.name),
+            translation)
+
+
+def distributive_product(factors):
+    """
+    Producto de reticulados distributivos: los irreducibles del producto son
+    los pares (indice del factor, irreducible) y el orden es la union
+    disjunta.
+    """
+    irreducibles = []
+    below = []
+    shift = 0
+    for k, factor in enumerate(factors):
+        irreducibles += [(k, j) for j in factor.irreducibles]
+        below += [mask << shift for mask in factor.below]
+        shift += len(factor.irreducibles)
+    return DistributiveLattice(irreducibles, below)
+
+
+def downset_tuples(factors, elements):
+    """
+    Traduce un elemento del producto a la tupla de elementos de cada factor
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> d, t = lattice_to_distributive(model_to_lattice(gen_chain(3)))
+    >>> downset_tuples([d, d], 0b0111)
+    (3, 1)
+    """
+    result = []
+    for factor in factors:
+        n = len(factor.irreducibles)
+        result.append(elements & ((1 << n) - 1))
+        elements >>= n
+    return tuple(result)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
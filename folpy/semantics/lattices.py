@@ -6,10 +6,20 @@ from functools import lru_cache
 
 from ..syntax.types import AlgebraicType
 from ..utils import latdraw
-from ..utils.methods import is_subuniverse_for_lattices
+from ..utils.methods import (
+    is_subuniverse_for_lattices,
+    operation_tables,
+    sublattice_closure,
+    sublattices,
+    order_bitsets,
+    is_partial_order,
+    lattice_tables
+)
+from ..utils.methods.sublattices import to_mask, from_mask
+from ..utils.misc import bits
 
 from .algebras import Algebra, Subalgebra, Quotient, AlgebraProduct
-from .modelfunctions import Operation, Operation_decorator
+from .modelfunctions import Operation
 
 
 class Lattice(Algebra):
@@ -29,6 +39,7 @@ class Lattice(Algebra):
         self.join_dic = {(x, x): x for x in self.universe}
         self.meet_dic = {(x, x): x for x in self.universe}
         self.certificate = None
+        self.tables = None
 
     def __mul__(self, other):
         """
@@ -193,7 +204,14 @@ class Lattice(Algebra):
         self.distributive = distributive
         return distributive
 
-    def draw(self):
+    def draw(self, path=None, fmt=None):
+        """
+        Dibuja el reticulado. Sin path usa LatDraw (necesita java); con path
+        escribe el dibujo en el proceso, en formato svg, dot o json segun
+        fmt o la extension del archivo.
+        """
+        if path:
+            return latdraw.draw(self, path, fmt=fmt)
         return latdraw.LatDraw(self)
 
     @lru_cache()
@@ -328,6 +346,61 @@ class Lattice(Algebra):
         """
         return is_subuniverse_for_lattices(self, subset)
 
+    def operation_tables(self):
+        """
+        Devuelve (universe, index, join, meet) con las tablas de supremo e
+        infimo como listas de listas de indices. Se calculan una sola vez.
+        """
+        if not self.tables:
+            self.tables = operation_tables(self)
+        return self.tables
+
+    def sublattice(self, subset):
+        """
+        Devuelve el subreticulado generado por subset
+
+        >>> from folpy.examples.lattices import *
+        >>> model_to_lattice(rhombus).sublattice([1, 2])
+        [0, 1, 2, 3]
+        """
+        universe, index, join, meet = self.operation_tables()
+        mask = sublattice_closure(join, meet, to_mask(index, subset))
+        return from_mask(universe, mask)
+
+    def sublattices(self, containing=[], proper=True):
+        """
+        Generador de los subreticulados que contienen a la lista
+        `containing`, usando bitmasks sobre las tablas precalculadas.
+        No devuelve el subreticulado vacio.
+
+        >>> from folpy.examples.lattices import *
+        >>> len(list(model_to_lattice(rhombus).sublattices()))
+        11
+        >>> len(list(model_to_lattice(M3).sublattices([1], proper=False)))
+        7
+        >>> c2 = model_to_lattice(gen_chain(2))
+        >>> len(list((c2 * c2 * c2).sublattices()))
+        72
+        """
+        universe, index, join, meet = self.operation_tables()
+        for mask in sublattices(join, meet, to_mask(index, containing),
+                                proper=proper):
+            yield from_mask(universe, mask)
+
+    def subuniverses(self, subtype=None, proper=True):
+        """
+        NO DEVUELVE EL SUBUNIVERSO VACIO
+        Generador que va devolviendo los subuniversos. Para el tipo de
+        reticulados usa los bitmasks de sublattices.
+
+        >>> from folpy.examples.lattices import *
+        >>> len(list(model_to_lattice(gen_chain(4)).subuniverses()))
+        14
+        """
+        if subtype and subtype != self.type:
+            return super().subuniverses(subtype=subtype, proper=proper)
+        return self.sublattices(proper=proper)
+
     @property
     @lru_cache(maxsize=1)
     def atoms(self):
@@ -396,6 +469,151 @@ class Lattice(Algebra):
         """
         return [a for a in self.universe if self.is_meet_irreducible(a)]
 
+    @lru_cache(maxsize=1)
+    def dependency_relation(self):
+        """
+        Calcula la relacion de dependencia D entre join-irreducibles
+        (Freese): j D k si j != k y existe p tal que j <= k v p pero
+        j no es <= k_* v p, donde k_* es el unico cubierto por k.
+        Devuelve la lista de indices de los join-irreducibles, sus cubiertos
+        inferiores y, para cada uno, el bitmask (sobre la lista de
+        irreducibles) de los j con j D k.
+
+        >>> from folpy.examples.lattices import *
+        >>> irreducibles, lower, depends = model_to_lattice(
+        ...     N5).dependency_relation()
+        >>> irreducibles, lower, depends
+        ([1, 2, 3], [0, 1, 0], [2, 0, 2])
+        """
+        universe, index, join, meet = self.operation_tables()
+        n = len(universe)
+        up = [0] * n
+        for i in range(n):
+            for k in range(n):
+                if meet[i][k] == i:
+                    up[i] |= 1 << k
+        bottom = index[self.min()]
+        irreducibles = []
+        lower = []
+        for j in range(n):
+            below = bottom
+            for x in range(n):
+                if x != j and up[x] >> j & 1:
+                    below = join[below][x]
+            if j != bottom and below != j:
+                irreducibles.append(j)
+                lower.append(below)
+        depends = [0] * len(irreducibles)
+        for b, k in enumerate(irreducibles):
+            join_k = join[k]
+            join_lower = join[lower[b]]
+            for a, j in enumerate(irreducibles):
+                if a == b:
+                    continue
+                up_j = up[j]
+                if any(up_j >> join_k[p] & 1 and
+                       not up_j >> join_lower[p] & 1 for p in range(n)):
+                    depends[b] |= 1 << a
+        return (irreducibles, lower, depends)
+
+    @lru_cache(maxsize=1)
+    def congruence_lattice(self):
+        """
+        Devuelve el reticulado de congruencias como el reticulado de
+        down-sets del cociente de la clausura transitiva de D, sin generar
+        congruencias principales. Los irreducibles del resultado son los
+        join-irreducibles j representantes de cada clase (la congruencia
+        principal de (j_*, j)).
+
+        >>> from folpy.examples.lattices import *
+        >>> len(model_to_lattice(N5).congruence_lattice())
+        5
+        >>> len(model_to_lattice(M3).congruence_lattice())
+        2
+        >>> c2 = model_to_lattice(gen_chain(2))
+        >>> len((c2 ** 5).congruence_lattice())
+        32
+        """
+        from .distributive import DistributiveLattice
+
+        universe = self.operation_tables()[0]
+        irreducibles, lower, depends = self.dependency_relation()
+        m = len(irreducibles)
+        # clausura reflexiva y transitiva: closure[k] son los j con j D* k
+        closure = [depends[k] | 1 << k for k in range(m)]
+        changed = True
+        while changed:
+            changed = False
+            for k in range(m):
+                new = closure[k]
+                for j in bits(closure[k]):
+                    new |= closure[j]
+                if new != closure[k]:
+                    closure[k] = new
+                    changed = True
+        classes = []
+        for k in range(m):
+            if closure[k] not in classes:
+                classes.append(closure[k])
+        below = []
+        for c in classes:
+            mask = 0
+            for i, d in enumerate(classes):
+                if not d & ~c:
+                    mask |= 1 << i
+            below.append(mask)
+        representatives = [universe[irreducibles[(c & -c).bit_length() - 1]]
+                           for c in classes]
+        result = DistributiveLattice(representatives, below,
+                                     name="Con(%s)" % self.name
+                                     if self.name else "")
+        result.collapsed = classes
+        return result
+
+    def congruence_from_downset(self, downset):
+        """
+        Devuelve la Congruence que corresponde a un elemento del reticulado
+        de congruencias: a y b estan relacionados si tienen los mismos
+        join-irreducibles por debajo, salvo los colapsados.
+
+        >>> from folpy.examples.lattices import *
+        >>> rhom = model_to_lattice(rhombus)
+        >>> rhom.congruence_from_downset(0b01)
+        Congruence([|0, 1|, |2, 3|])
+        """
+        from .congruences import Partition
+
+        con_lattice = self.congruence_lattice()
+        universe, index, join, meet = self.operation_tables()
+        irreducibles = self.dependency_relation()[0]
+        collapsed = 0
+        for c in bits(downset):
+            collapsed |= con_lattice.collapsed[c]
+        blocks = {}
+        for x in universe:
+            key = 0
+            for a, j in enumerate(irreducibles):
+                if meet[j][index[x]] == j:
+                    key |= 1 << a
+            blocks.setdefault(key & ~collapsed, []).append(x)
+        partition = Partition()
+        partition.from_blocks(list(blocks.values()))
+        return partition.to_congruence(self)
+
+    def congruences(self):
+        """
+        Devuelve todas las congruencias del reticulado a partir de
+        congruence_lattice
+
+        >>> from folpy.examples.lattices import *
+        >>> len(model_to_lattice(gen_chain(4)).congruences())
+        8
+        >>> len(model_to_lattice(N5).congruences())
+        5
+        """
+        return [self.congruence_from_downset(x)
+                for x in self.congruence_lattice().elements()]
+
 
 class Sublattice(Lattice, Subalgebra):
     """
@@ -621,30 +839,18 @@ def poset_to_lattice(poset):
     assert '<=' in poset.relations
 
     universe = poset.universe
-    upper_bounds = {x : set(y for y in universe 
-                            if [x,y] in poset.relations["<="]) 
-                    for x in universe}
-    lower_bounds = {x : set(y for y in universe 
-                            if [y,x] in poset.relations["<="]) 
-                    for x in universe}
-
-    @Operation_decorator(universe)
-    def meet(x,y):
-        lbs = lower_bounds[x].intersection(lower_bounds[y])
-        r = next(iter(lbs))
-        for z in lbs:
-            if [r,z] in poset.relations["<="]:
-                r = z
-        return r
-    
-    @Operation_decorator(universe)
-    def join(x,y):
-        ubs = upper_bounds[x].intersection(upper_bounds[y])
-        r = next(iter(ubs))
-        for z in ubs:
-            if [z,r] in poset.relations["<="]:
-                r = z
-        return r
+    up, down, index = order_bitsets(universe, poset.relations["<="])
+    assert is_partial_order(up, down), "La relacion <= no es un orden parcial"
+    tables = lattice_tables(up, down)
+    assert tables, "El poset no es un reticulado"
+    join_table, meet_table = tables
+
+    join = Operation({(x, y): universe[join_table[i][j]]
+                      for i, x in enumerate(universe)
+                      for j, y in enumerate(universe)})
+    meet = Operation({(x, y): universe[meet_table[i][j]]
+                      for i, x in enumerate(universe)
+                      for j, y in enumerate(universe)})
 
     return Lattice(
         universe,
@@ -652,6 +858,7 @@ def poset_to_lattice(poset):
         meet
         )
 
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -3,12 +3,14 @@
 
 from itertools import chain, product
 
-from ..utils import indent, minion
+from ..utils import indent, minion, model_certificate
 from ..utils.methods import (
                                 substructures,
                                 subuniverse,
                                 subuniverses,
-                                is_subuniverse
+                                is_subuniverse,
+                                AutomorphismGroup,
+                                EndomorphismMonoid
                             )
 from .morphisms import Embedding, Homomorphism
 from .modelfunctions import (
@@ -152,6 +154,36 @@ class Model(object):
             subtype = self.type
         return self.isomorphisms_to(self, subtype, without=without)
 
+    def automorphism_group(self, subtype=None):
+        """
+        Grupo de automorfismos de este modelo, en el subtype, dado por
+        generadores: el orden, la pertenencia y las orbitas se calculan sin
+        enumerar el grupo.
+
+        >>> from folpy.examples.lattices import M3
+        >>> aut = M3.automorphism_group()
+        >>> aut.order(), len(aut.generators()), aut.orbit(1)
+        (6, 2, [1, 2, 3])
+        """
+        if not subtype:
+            subtype = self.type
+        return AutomorphismGroup(self, subtype)
+
+    def endomorphism_monoid(self, subtype=None):
+        """
+        Monoide de endomorfismos de este modelo, en el subtype: los
+        automorfismos como grupo y un representante por cada orbita del
+        resto bajo la composicion con automorfismos.
+
+        >>> from folpy.examples.posets import rhombus
+        >>> end = rhombus.endomorphism_monoid()
+        >>> end.order(), end.units.order()
+        (36, 2)
+        """
+        if not subtype:
+            subtype = self.type
+        return EndomorphismMonoid(self, subtype)
+
     def isomorphisms_to(self, target, subtype=None, without=[]):
         """
         Genera todos los isomorfismos de este modelo a target, en el subtype.
@@ -160,6 +192,90 @@ class Model(object):
             subtype = self.type
         return minion.isomorphisms(self, target, subtype, without=without)
 
+    def count_homomorphisms_to(self, target, subtype=None, inj=None,
+                               surj=None, without=[]):
+        """
+        Cuenta los homomorfismos de este modelo a target, en el subtype,
+        sin generarlos.
+
+        >>> from folpy.examples.posets import *
+        >>> rhombus.count_homomorphisms_to(rhombus)
+        36
+        >>> rhombus.count_homomorphisms_to(gen_chain(2), surj=True)
+        4
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.count_homomorphisms(self, target, subtype, inj=inj,
+                                          surj=surj, without=without)
+
+    def stream_homomorphisms_to(self, target, subtype=None, inj=None,
+                                surj=None, without=[], view=True):
+        """
+        Genera los homomorfismos de este modelo a target, en el subtype, sin
+        guardarlos. Con view=False da arrays con el indice en target de
+        cada elemento del universo.
+
+        >>> from folpy.examples.posets import *
+        >>> sum(1 for h in rhombus.stream_homomorphisms_to(rhombus))
+        36
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.stream_morphisms(Homomorphism, subtype, self, target,
+                                       inj=inj, surj=surj,
+                                       without=without, view=view)
+
+    def count_embeddings_to(self, target, subtype=None, without=[]):
+        """
+        Cuenta los embeddings de este modelo a target, en el subtype.
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.count_embeddings(self, target, subtype, without=without)
+
+    def count_isomorphisms_to(self, target, subtype=None, without=[]):
+        """
+        Cuenta los isomorfismos de este modelo a target, en el subtype.
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.count_isomorphisms(self, target, subtype,
+                                         without=without)
+
+    def polymorphisms(self, n, identities=[], subtype=None):
+        """
+        Genera los polimorfismos n-arios de este modelo (homomorfismos de
+        A^n en A) en el subtype, como operaciones, sin construir A^n.
+        identities son nombres ("idempotent", "symmetric", "cyclic") o
+        pares de palabras, como ("xyy", "x") para f(x,y,y) = x.
+        Con stream() se recorren sin guardarlos.
+
+        >>> from folpy.examples.posets import *
+        >>> len(gen_chain(2).polymorphisms(2))
+        6
+        >>> f = rhombus.polymorphisms(2, ["idempotent", "symmetric"])[0]
+        >>> f(2, 3)
+        0
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.polymorphisms(self, n, subtype, identities)
+
+    def has_polymorphism(self, n, identities=[], subtype=None):
+        """
+        Si existe, devuelve un polimorfismo n-ario de este modelo que
+        cumple las identidades, en el subtype;
+        Si no, devuelve False
+
+        >>> from folpy.examples.lattices import *
+        >>> bool(rhombus.has_polymorphism(2, ["idempotent", "symmetric"]))
+        False
+        """
+        if not subtype:
+            subtype = self.type
+        return minion.has_polymorphism(self, n, subtype, identities)
+
     def is_homomorphic_image(self, target, subtype=None, without=[]):
         """
         Si existe, devuelve un homomorfismo de este modelo a target,
@@ -181,6 +297,22 @@ class Model(object):
             subtype = self.type
         return minion.is_substructure(self, target, subtype, without=without)
 
+    def get_certificate(self, subtype=None):
+        """
+        Devuelve un certificado canonico del modelo en el subtype: dos
+        modelos son isomorfos si y solo si tienen el mismo certificado
+
+        >>> from folpy.examples.posets import *
+        >>> c2 = gen_chain(2)
+        >>> (c2 * c2).get_certificate() == rhombus.get_certificate()
+        True
+        >>> M3.get_certificate() == rhombus.get_certificate()
+        False
+        """
+        if not subtype:
+            subtype = self.type
+        return model_certificate(self, subtype)
+
     def is_isomorphic(self, target, subtype=None, without=[]):
         """
         Si existe, devuelve un isomorfismo de este modelo a target,
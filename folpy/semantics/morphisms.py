@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
 
-from ..utils import Function, indent
+import numpy as np
+
+from ..utils import Function, indent, indexed_tables
+from ..utils.preservation import (operation_violation, relation_violation,
+                                  morphism_violation)
 from .congruences import Congruence
 
 
@@ -9,6 +13,9 @@ class Homomorphism(Function):
 
     """
     Homomorfismos
+    Ademas del diccionario, se puede ver como un array de enteros sobre los
+    indices de los universos (ver array), con el que el nucleo, la imagen,
+    la composicion, la inversa y la restriccion son operaciones O(n).
 
     >>> from folpy.examples.posets import gen_chain
     >>> c2 = gen_chain(2)
@@ -34,6 +41,7 @@ class Homomorphism(Function):
         assert isinstance(antitype, list), type(antitype)
         self.inj = inj
         self.surj = surj
+        self.values = None
         assert self.arity() == 1
         # assert self.subtype.is_subtype_of(source.fo_type)
         #  and self.subtype.is_subtype_of(target.fo_type)
@@ -59,26 +67,111 @@ class Homomorphism(Function):
         result += ")"
         return result
 
+    @classmethod
+    def from_array(cls, values, source, target, subtype, antitype=[],
+                   inj=None, surj=None):
+        """
+        Arma el morfismo a partir de su array: en la posicion i el indice en
+        target de la imagen del i-esimo elemento de source (-1 si no esta
+        definido)
+
+        >>> from folpy.examples.posets import gen_chain
+        >>> c2 = gen_chain(2)
+        >>> Homomorphism.from_array([1, 1], c2, c2, c2.type)(0)
+        1
+        """
+        values = np.asarray(values, dtype=np.int64)
+        source_universe = indexed_tables(source).universe
+        target_universe = indexed_tables(target).universe
+        d = {(source_universe[i],): target_universe[v]
+             for i, v in enumerate(values.tolist()) if v != -1}
+        result = cls(d, source, target, subtype, list(antitype), inj, surj)
+        result.values = values
+        return result
+
+    def array(self):
+        """
+        Devuelve el morfismo como array de numpy sobre los indices de los
+        universos (ver from_array). Se calcula una vez.
+
+        >>> from folpy.examples.posets import gen_chain
+        >>> c3 = gen_chain(3)
+        >>> Homomorphism({(0,): 2, (1,): 2, (2,): 0}, c3, c3, c3.type).array()
+        array([2, 2, 0])
+        """
+        if self.values is None:
+            source = indexed_tables(self.source)
+            target = indexed_tables(self.target)
+            self.values = np.array([target.index[self.dict[(x,)]]
+                                    if (x,) in self.dict else -1
+                                    for x in source.universe],
+                                   dtype=np.int64)
+        return self.values
+
+    def map_in_place(self, f):
+        super(Homomorphism, self).map_in_place(f)
+        self.values = None
+
+    def restrict(self, subuniverse):
+        result = super(Homomorphism, self).restrict(subuniverse)
+        result.values = None
+        return result
+
+    def image(self):
+        """
+        Un generador de la imagen
+        """
+        target_universe = indexed_tables(self.target).universe
+        return iter([target_universe[v] for v in np.unique(self.array())
+                     if v != -1])
+
     def inverse(self):
         """
         Devuelve la inversa del morfismo
         Para que sea funcion la inversa tiene que ser injectivo.
+
+        >>> from folpy.examples.posets import gen_chain
+        >>> c3 = gen_chain(3)
+        >>> h = Embedding({(0,): 2, (1,): 0, (2,): 1}, c3, c3, c3.type)
+        >>> h.inverse().array()
+        array([1, 2, 0])
         """
         assert self.inj
 
-        d = {}
-        for k in self.dict:
-            if len(k) > 1:
-                d[(self.dict[k],)] = k
-            else:
-                d[(self.dict[k],)] = k[0]
-        return type(self)(d, self.target, self.source, self.subtype,
-                          self.antitype, self.inj, self.surj)
+        values = self.array()
+        defined = values != -1
+        inverse = np.full(len(self.target), -1, dtype=np.int64)
+        inverse[values[defined]] = np.arange(len(values))[defined]
+        return type(self).from_array(inverse, self.target, self.source,
+                                     self.subtype, self.antitype, self.inj,
+                                     self.surj)
+
+    def restriction(self, submodel):
+        """
+        Restringe el morfismo a un submodelo de source
+
+        >>> from folpy.examples.posets import gen_chain
+        >>> c3 = gen_chain(3)
+        >>> h = Homomorphism({(0,): 2, (1,): 2, (2,): 0}, c3, c3, c3.type)
+        >>> h.restriction(c3.restrict([0, 2])).array()
+        array([2, 0])
+        """
+        index = indexed_tables(self.source).index
+        positions = [index[x] for x in indexed_tables(submodel).universe]
+        return type(self).from_array(self.array()[positions], submodel,
+                                     self.target, self.subtype,
+                                     self.antitype, self.inj)
 
     def is_embedding(self):
         """
         Devuelve si el homomorfismo es un embedding.
         Revisa la vuelta de las relaciones.
+
+        >>> from folpy.examples.posets import gen_chain, rhombus
+        >>> h = Homomorphism({(0,): 0, (1,): 3, (2,): 1, (3,): 2}, rhombus,
+        ...                  gen_chain(4), rhombus.type)
+        >>> h.is_embedding()
+        False
         """
         for rel in self.subtype.relations:
             if not self.inverse_preserves_rel(rel):
@@ -86,6 +179,26 @@ class Homomorphism(Function):
 
         return True
 
+    def violation(self, subtype=None, check_inverse=False):
+        """
+        Verifica que la funcion sea morfismo para subtype (por defecto, el
+        del morfismo) y con check_inverse tambien la vuelta de las
+        relaciones. Devuelve (simbolo, tupla) con la primer tupla que lo
+        rompe, o None. Sirve para revisar funciones armadas a mano.
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> h = Homomorphism({(0,): 0, (1,): 1, (2,): 1, (3,): 1}, rhombus,
+        ...                  gen_chain(2), rhombus.type)
+        >>> h.violation()
+        ('^', (1, 2))
+        >>> h.violation(rhombus.type - rhombus.type) is None
+        True
+        """
+        if subtype is None:
+            subtype = self.subtype
+        return morphism_violation(self.array(), self.source, self.target,
+                                  subtype, check_inverse)
+
     def composition(self, g):
         """
         Compone con otro morfismo, F.compone(G) = F o G
@@ -105,8 +218,19 @@ class Homomorphism(Function):
             subtype = g.subtype
         antitype = self.antitype + g.antitype
 
-        result = morph_type(g.dict, g.source, self.target, subtype, antitype)
-        result.map_in_place(self)
+        inner = g.array()
+        middle = indexed_tables(g.target)
+        source = indexed_tables(self.source)
+        if middle.universe != source.universe:
+            # g cae en un submodelo de self.source
+            translation = np.array([source.index[x] for x in middle.universe],
+                                   dtype=np.int64)
+            inner = np.where(inner == -1, -1, translation[inner])
+        defined = inner != -1
+        values = np.full(len(inner), -1, dtype=np.int64)
+        values[defined] = self.array()[inner[defined]]
+        result = morph_type.from_array(values, g.source, self.target, subtype,
+                                       antitype)
 
         result.inj = None
         result.surj = None
@@ -152,43 +276,48 @@ class Homomorphism(Function):
         elif rel in self.antitype:
             return False
         else:
-            result = self.__preserves_relations(
-                self.source.relations[rel], self.target.relations[rel])
+            result = relation_violation(self.array(), self.source,
+                                        self.target, rel) is None
             if not result:
                 self.antitype.append(rel)
             return result
 
     def preserves_operation(self, op):
-        # TODO ES CORRECTA LA IDEA?
         """
-        Revisa preservacion de una operacion a traves de revisar la
-         preservacion ida y vuelta de la relacion dada por el grafico
+        Revisa que f(op_A(a1,...,an)) = op_B(f(a1),...,f(an)) en todas las
+        tuplas donde esta definido
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> c3 = gen_chain(3)
+        >>> h = Homomorphism({(0,): 0, (1,): 2, (2,): 1}, c3, c3,
+        ...                  c3.type - c3.type)
+        >>> h.preserves_operation("v"), "v" in h.antitype
+        (False, True)
         """
         if op in self.subtype.operations:
             return True
         elif op in self.antitype:
             return False
         else:
-            rel_source = self.source.operations[
-                op].graph_fo_relation(self.source.universe)
-            rel_target = self.target.operations[
-                op].graph_fo_relation(self.target.universe)
-            result = self.__preserves_relations(rel_source, rel_target)
+            result = operation_violation(self.array(), self.source,
+                                         self.target, op) is None
             if not result:
                 self.antitype.append(op)
             return result
 
     def inverse_preserves_rel(self, rel):
         """
-        Prueba la inversa preserve la relacion
+        Prueba la inversa preserve la relacion, es decir que
+        rel_B interseccion Im(f)^aridad este contenido en f(rel_A)
         """
         if isinstance(self, Embedding) and rel in self.subtype.relations:
             return True
         elif rel in self.antitype:
             return False
         else:
-            result = self.__inverse_preserves_relations(
-                self.source.relations[rel], self.target.relations[rel])
+            result = relation_violation(self.array(), self.source,
+                                        self.target, rel,
+                                        inverse=True) is None
             if not result:
                 self.antitype.append(rel)
             return result
@@ -235,14 +364,27 @@ class Homomorphism(Function):
 
     def kernel(self):
         """
-        Devuelve el kernel del homomorfismo
+        Devuelve el kernel del homomorfismo, agrupando los elementos por el
+        indice de su imagen. Solo tiene sentido para morfismos totales: en
+        un morfismo parcial los elementos sin imagen quedarian juntos en un
+        mismo bloque.
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> h = rhombus.homomorphisms_to(gen_chain(2), surj=True)[0]
+        >>> len(h.kernel().table())
+        8
+        >>> c2 = gen_chain(2)
+        >>> Homomorphism({(0,): 0}, c2, c2, c2.type).kernel()
+        Traceback (most recent call last):
+            ...
+        ValueError: El morfismo no esta definido en todo el universo
         """
-        k = []
-        for x in self.source.universe:
-            for y in self.source.universe:
-                if self.dict[(x,)] == self.dict[(y,)]:
-                    k.append((x, y))
-        return Congruence(k, self.source)
+        labels = self.array().tolist()
+        if -1 in labels:
+            raise ValueError("El morfismo no esta definido en todo el "
+                             "universo")
+        return Congruence.from_labels(indexed_tables(self.source).universe,
+                                      labels, self.source)
 
     def image_model(self):
         """
@@ -250,35 +392,6 @@ class Homomorphism(Function):
         """
         return self.target.restrict(list(self.image()), self.target.fo_type)
 
-    def __preserves_relations(self, rel_a, rel_b):
-        """
-        Revisa la preservacion entre dos relaciones.
-        Lo esperable seria que las dos relaciones tuvieran el mismo simbolo
-        en las estructuras A y B
-        """
-        result = True
-        for t in rel_a.domain():
-            if rel_a(*t):
-                result = result and rel_b(*self.vector_call(t))
-        return result
-
-    def __inverse_preserves_relations(self, rel_a, rel_b):
-        """
-        Prueba que ("rel_b" interseccion Im(f)^aridad(rel_b)) este
-         contenido en f("rel_a")
-        Funcion de Camper
-        """
-        # frelSource = [map(lambda x: self(x), row) for row in rel_a.table()]
-        frelSource = []
-        for row in rel_a.table():
-            if set(row) <= set(x[0] for x in self.domain()):
-                frelSource.append([self(x) for x in row])
-        for row in rel_b.table():
-            if all(x in self.image() for x in row):
-                if row not in frelSource:
-                    return False
-        return True
-
 
 class Embedding(Homomorphism):
 
@@ -3,6 +3,11 @@
 
 from .misc import indent, comment, powerset, compose
 from .functions import Function
+from .tables import IndexedTables, indexed_tables
+from .invariants import Invariants, invariants
+from .certificates import model_certificate, canonical_form
+from .isoclasses import IsoClassStore
+from .preservation import morphism_violation
 from .minion import minion
 from .latdraw import latdraw
 from .files import object_to_file, file_to_object, create_pipe, remove, write
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Certificados canonicos de modelos.
+El modelo se codifica como un grafo coloreado y nauty calcula su forma
+canonica: dos modelos son isomorfos si y solo si tienen el mismo
+certificado.
+"""
+
+from .tables import indexed_tables
+
+
+def colored_graph(model, subtype=None):
+    """
+    Codifica las tablas del modelo en el subtype como un grafo coloreado.
+    Tiene un vertice por elemento, un vertice por cada fila de cada tabla y,
+    para cada fila, un vertice por posicion que la une con el elemento que
+    esta en esa posicion. Los colores separan elementos, filas de cada
+    simbolo y posiciones.
+    Devuelve el grafo y la firma (simbolo, aridad, filas) de cada tabla.
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> graph, signature = colored_graph(gen_chain(2))
+    >>> graph.number_of_vertices, signature
+    (11, (('<=', 2, 3),))
+    """
+    from pynauty import Graph
+
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    n = tables.n
+
+    tables_rows = []
+    for op in sorted(subtype.operations):
+        tables_rows.append((op, tables.arity(op) + 1, tables.graph(op)))
+    for rel in sorted(subtype.relations):
+        tables_rows.append((rel, tables.arity(rel),
+                            sorted(tables.relation(rel))))
+
+    adjacency = {x: [] for x in range(n)}
+    coloring = [set(range(n))]
+    signature = []
+    vertex = n
+    for symbol, width, rows in tables_rows:
+        signature.append((symbol, width, len(rows)))
+        row_vertices = set()
+        slots = [set() for i in range(width)]
+        for row in rows:
+            row_vertex = vertex
+            row_vertices.add(row_vertex)
+            adjacency[row_vertex] = []
+            vertex += 1
+            for i, x in enumerate(row):
+                slots[i].add(vertex)
+                adjacency[row_vertex].append(vertex)
+                adjacency[vertex] = [x]
+                vertex += 1
+        coloring.append(row_vertices)
+        coloring += slots
+
+    graph = Graph(vertex,
+                  directed=False,
+                  adjacency_dict=adjacency,
+                  vertex_coloring=[c for c in coloring if c])
+    return graph, tuple(signature)
+
+
+def canonical_form(model, subtype=None):
+    """
+    Devuelve (certificado, etiquetado) del modelo en el subtype. El
+    etiquetado es la lista de indices de los elementos en el orden
+    canonico. Se calcula una vez por modelo y subtype.
+    """
+    from pynauty import canon_label, certificate
+
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("certificate", subtype)
+    if key not in tables.cache:
+        graph, signature = colored_graph(model, subtype)
+        labeling = list(canon_label(graph)[:tables.n])
+        tables.cache[key] = ((tables.n, signature, certificate(graph)),
+                             labeling)
+    return tables.cache[key]
+
+
+def model_certificate(model, subtype=None):
+    """
+    Certificado canonico (hasheable) del modelo en el subtype
+
+    >>> from folpy.examples.lattices import gen_chain, rhombus, M3, N5
+    >>> model_certificate(gen_chain(2) ** 2) == model_certificate(rhombus)
+    True
+    >>> model_certificate(M3) == model_certificate(N5)
+    False
+    """
+    return canonical_form(model, subtype)[0]
+
+
+def canonical_isomorphism(source, target, subtype=None):
+    """
+    Si source y target tienen el mismo certificado devuelve un isomorfismo
+    como diccionario {(i,): j} entre los indices de sus universos; si no,
+    None.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> canonical_isomorphism(gen_chain(2) ** 2, rhombus) is None
+    False
+    >>> canonical_isomorphism(gen_chain(4), rhombus) is None
+    True
+    """
+    if subtype is None:
+        subtype = source.type
+    source_certificate, source_labeling = canonical_form(source, subtype)
+    target_certificate, target_labeling = canonical_form(target, subtype)
+    if source_certificate != target_certificate:
+        return None
+    return {(x,): y for x, y in zip(source_labeling, target_labeling)}
+
+
+def automorphism_generators(model, subtype=None):
+    """
+    Devuelve (generadores, orden) del grupo de automorfismos del modelo en
+    el subtype. Los generadores son permutaciones (tuplas) de los indices
+    del universo y los calcula nauty sobre el grafo del certificado.
+
+    >>> from folpy.examples.lattices import M3, gen_chain
+    >>> automorphism_generators(M3)[1]
+    6
+    >>> automorphism_generators(gen_chain(3))
+    ([], 1)
+    """
+    from pynauty import autgrp
+
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("automorphisms", subtype)
+    if key not in tables.cache:
+        graph = colored_graph(model, subtype)[0]
+        generators, mantissa, exponent = autgrp(graph)[:3]
+        tables.cache[key] = ([tuple(g[:tables.n]) for g in generators],
+                             int(round(mantissa * 10 ** exponent)))
+    return tables.cache[key]
+
+
+def automorphism_group(model, subtype=None):
+    """
+    Lista de todos los automorfismos del modelo en el subtype, como
+    permutaciones de los indices del universo, cerrando los generadores
+    por composicion.
+
+    >>> from folpy.examples.lattices import M3
+    >>> len(automorphism_group(M3))
+    6
+    """
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("automorphism_group", subtype)
+    if key not in tables.cache:
+        generators = automorphism_generators(model, subtype)[0]
+        identity = tuple(range(tables.n))
+        group = {identity}
+        frontier = [identity]
+        while frontier:
+            new = []
+            for p in frontier:
+                for g in generators:
+                    q = tuple(g[x] for x in p)
+                    if q not in group:
+                        group.add(q)
+                        new.append(q)
+            frontier = new
+        tables.cache[key] = sorted(group)
+    return tables.cache[key]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Grupos de permutaciones de range(degree) dados por generadores, sin
+enumerar sus elementos. Las permutaciones son arrays de numpy (p[x] es la
+imagen de x) y se componen aplicando primero la de la izquierda: la
+composicion de p y despues q es q[p].
+El algoritmo de Schreier-Sims arma una base b1,...,bk y una cadena de
+estabilizadores G = G1 >= G2 >= ... >= Gk+1 = 1 (Gi fija b1,...,bi-1), con
+una transversal de la orbita de bi en Gi en cada nivel. Con eso el orden es
+el producto de los tamaños de las orbitas y la pertenencia se decide
+tamizando (sift) por la cadena.
+"""
+
+import numpy as np
+
+
+def inverse(p):
+    """
+    Inversa de una permutacion
+
+    >>> inverse(np.array([1, 2, 0])).tolist()
+    [2, 0, 1]
+    """
+    result = np.empty_like(p)
+    result[p] = np.arange(len(p))
+    return result
+
+
+def moved_point(p):
+    """
+    Primer punto que mueve la permutacion, o None si es la identidad
+    """
+    moved = np.flatnonzero(p != np.arange(len(p)))
+    return int(moved[0]) if len(moved) else None
+
+
+class PermutationGroup(object):
+
+    """
+    Grupo de permutaciones con su cadena de estabilizadores. Se puede pedir
+    que la base empiece por ciertos puntos (base); los niveles de esos
+    puntos pueden tener orbita trivial.
+
+    >>> s4 = PermutationGroup(4, [[1, 0, 2, 3], [1, 2, 3, 0]])
+    >>> s4.order()
+    24
+    >>> [2, 0, 1, 3] in s4, s4.orbit(0)
+    (True, [0, 1, 2, 3])
+    >>> v4 = PermutationGroup(4, [[1, 0, 3, 2], [2, 3, 0, 1]])
+    >>> v4.order(), [0, 2, 1, 3] in v4
+    (4, False)
+    >>> PermutationGroup(3, []).order()
+    1
+    """
+
+    def __init__(self, degree, generators, base=[]):
+        self.degree = degree
+        self.identity = np.arange(degree, dtype=np.int64)
+        self.generators = []
+        for g in generators:
+            g = np.asarray(g, dtype=np.int64)
+            if moved_point(g) is not None:
+                self.generators.append(g)
+        self.base = [int(b) for b in base]
+        for g in self.generators:
+            if all(g[b] == b for b in self.base):
+                self.base.append(moved_point(g))
+        # strong[i] genera Gi, transversals[i] es {punto: (u, inversa de u)}
+        # con u[base[i]] == punto
+        self.strong = [[g for g in self.generators
+                        if all(g[b] == b for b in self.base[:i])]
+                       for i in range(len(self.base))]
+        self.transversals = [self.transversal(i)
+                             for i in range(len(self.base))]
+        self.schreier_sims()
+
+    def __repr__(self):
+        return "PermutationGroup(degree=%s, order=%s, generators=%s)" % (
+            self.degree, self.order(), len(self.generators))
+
+    def transversal(self, i):
+        """
+        Orbita de base[i] en Gi con un representante por punto
+        """
+        point = self.base[i]
+        result = {point: (self.identity, self.identity)}
+        frontier = [point]
+        while frontier:
+            new = []
+            for gamma in frontier:
+                u = result[gamma][0]
+                for s in self.strong[i]:
+                    delta = int(s[gamma])
+                    if delta not in result:
+                        v = s[u]
+                        result[delta] = (v, inverse(v))
+                        new.append(delta)
+            frontier = new
+        return result
+
+    def sift(self, g, start=0):
+        """
+        Tamiza g por la cadena desde el nivel start. Devuelve (residuo,
+        nivel): el nivel donde la imagen del punto de la base no esta en la
+        orbita, o len(base) si paso por todos.
+        """
+        for i in range(start, len(self.base)):
+            beta = int(g[self.base[i]])
+            if beta not in self.transversals[i]:
+                return g, i
+            g = self.transversals[i][beta][1][g]
+        return g, len(self.base)
+
+    def schreier_residue(self, i):
+        """
+        Busca un generador de Schreier del nivel i que no tamice hasta la
+        identidad por los niveles siguientes. Devuelve (residuo, nivel) o
+        None.
+        """
+        for beta, (u, u_inverse) in self.transversals[i].items():
+            for s in self.strong[i]:
+                v_inverse = self.transversals[i][int(s[beta])][1]
+                residue, level = self.sift(v_inverse[s[u]], i + 1)
+                if level < len(self.base) or \
+                        moved_point(residue) is not None:
+                    return residue, level
+        return None
+
+    def schreier_sims(self):
+        """
+        Completa la base y los generadores fuertes hasta que cada Gi+1 sea
+        el estabilizador de base[i] en Gi
+        """
+        i = len(self.base) - 1
+        while i >= 0:
+            found = self.schreier_residue(i)
+            if found is None:
+                i -= 1
+                continue
+            residue, level = found
+            if level == len(self.base):
+                self.base.append(moved_point(residue))
+                self.strong.append([])
+                self.transversals.append(None)
+            for j in range(i + 1, level + 1):
+                self.strong[j].append(residue)
+                self.transversals[j] = self.transversal(j)
+            i = level
+
+    def order(self):
+        """
+        Cantidad de elementos del grupo
+        """
+        return int(np.prod([len(t) for t in self.transversals],
+                           dtype=object))
+
+    def __contains__(self, p):
+        p = np.asarray(p, dtype=np.int64)
+        if len(p) != self.degree or \
+                not np.array_equal(np.sort(p), self.identity):
+            return False
+        residue, level = self.sift(p)
+        return level == len(self.base) and moved_point(residue) is None
+
+    def orbit(self, point):
+        """
+        Orbita del punto, ordenada
+        """
+        result = {point}
+        frontier = [point]
+        while frontier:
+            new = []
+            for gamma in frontier:
+                for g in self.generators:
+                    delta = int(g[gamma])
+                    if delta not in result:
+                        result.add(delta)
+                        new.append(delta)
+            frontier = new
+        return sorted(result)
+
+    def orbits(self):
+        """
+        Particion de range(degree) en orbitas
+
+        >>> PermutationGroup(5, [[1, 0, 2, 4, 3]]).orbits()
+        [[0, 1], [2], [3, 4]]
+        """
+        result = []
+        seen = set()
+        for point in range(self.degree):
+            if point not in seen:
+                orbit = self.orbit(point)
+                seen.update(orbit)
+                result.append(orbit)
+        return result
+
+    def rebase(self, points):
+        """
+        El mismo grupo con una base que empieza por points. Los generadores
+        fuertes ya calculados sirven de generadores.
+        """
+        strong = {tuple(g.tolist()) for level in self.strong for g in level}
+        return PermutationGroup(self.degree, sorted(strong), base=points)
+
+    def stabilizer(self, points):
+        """
+        Estabilizador puntual de points
+
+        >>> s4 = PermutationGroup(4, [[1, 0, 2, 3], [1, 2, 3, 0]])
+        >>> s4.stabilizer([0]).order(), s4.stabilizer([0, 1]).order()
+        (6, 2)
+        """
+        points = list(points)
+        chain = self.rebase(points)
+        return PermutationGroup(self.degree, chain.level_generators(
+            len(points)), base=chain.base[len(points):])
+
+    def level_generators(self, i):
+        """
+        Generadores de Gi (el estabilizador de los primeros i puntos de la
+        base)
+        """
+        if i < len(self.strong):
+            return self.strong[i]
+        return []
+
+    def extension(self, partial):
+        """
+        Busca un elemento del grupo que extienda la funcion parcial
+        (diccionario punto: imagen). Devuelve la permutacion o None.
+        Conviene que la base empiece por los puntos de partial (ver
+        rebase): en esos niveles no hay que elegir.
+
+        >>> s4 = PermutationGroup(4, [[1, 0, 2, 3], [1, 2, 3, 0]])
+        >>> s4.extension({0: 2, 1: 0})[:2].tolist()
+        [2, 0]
+        >>> v4 = PermutationGroup(4, [[1, 0, 3, 2], [2, 3, 0, 1]])
+        >>> v4.extension({0: 1, 2: 2}) is None
+        True
+        """
+        return self.extend({int(x): int(y) for x, y in partial.items()}, 0)
+
+    def extend(self, partial, i):
+        """
+        Extension de partial en Gi (ver extension)
+        """
+        if all(x == y for x, y in partial.items()):
+            return self.identity
+        if i == len(self.base):
+            return None
+        point = self.base[i]
+        if point in partial:
+            candidates = [partial[point]]
+        else:
+            candidates = list(self.transversals[i])
+        for beta in candidates:
+            if beta not in self.transversals[i]:
+                continue
+            u, u_inverse = self.transversals[i][beta]
+            # g = h y despues u, con h en Gi+1
+            h = self.extend({x: int(u_inverse[y])
+                             for x, y in partial.items()}, i + 1)
+            if h is not None:
+                return u[h]
+        return None
+
+    def elements(self, depth=None):
+        """
+        Genera todos los elementos del grupo, recorriendo la cadena. Con
+        depth solo recorre los primeros depth niveles: genera un
+        representante por coclase de G(depth+1), es decir, uno por cada
+        imagen posible de los primeros depth puntos de la base.
+
+        >>> sum(1 for p in PermutationGroup(3, [[1, 2, 0]]).elements())
+        3
+        >>> s3 = PermutationGroup(3, [[1, 0, 2], [1, 2, 0]])
+        >>> sorted(int(p[0]) for p in s3.elements(1))
+        [0, 1, 2]
+        """
+        if depth is None:
+            depth = len(self.base)
+
+        def level(i):
+            if i == depth:
+                yield self.identity
+                return
+            for h in level(i + 1):
+                for u, u_inverse in self.transversals[i].values():
+                    yield u[h]
+        return level(0)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
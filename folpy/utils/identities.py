@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Identidades de una operacion n-aria f, para buscar polimorfismos y
+operaciones term. Cada identidad es un par (lhs, rhs) de palabras sobre un
+alfabeto de letras: una palabra de largo n es f aplicada a esas letras y
+una de largo 1 es esa letra. Por ejemplo ("xyy", "x") es f(x,y,y) = x y
+("area", "rare") es f(a,r,e,a) = f(r,a,r,e). Tambien se pueden dar por
+nombre: "idempotent", "symmetric" o "cyclic".
+"""
+
+from itertools import product
+from string import ascii_lowercase
+
+
+def named_identities(name, n):
+    """
+    Identidades de un nombre para una operacion n-aria: "idempotent",
+    "symmetric" (invariante por permutaciones de los argumentos) o
+    "cyclic"
+
+    >>> named_identities("idempotent", 3)
+    [('xxx', 'x')]
+    >>> named_identities("symmetric", 3)
+    [('abc', 'bac'), ('abc', 'bca')]
+    """
+    letters = ascii_lowercase[:n]
+    if name == "idempotent":
+        return [("x" * n, "x")]
+    if name == "cyclic":
+        return [(letters, letters[1:] + letters[:1])]
+    if name == "symmetric":
+        result = [(letters, letters[1::-1] + letters[2:])]
+        if n > 2:
+            result.append((letters, letters[1:] + letters[:1]))
+        return result
+    raise ValueError("Unknown identity %s" % name)
+
+
+def identity_instances(identities, m, n):
+    """
+    Genera las instancias de las identidades sobre un universo de m
+    elementos: tuplas (izquierda, derecha, fijo) donde izquierda es el
+    indice en base mixta de la n-upla del lado izquierdo y, si el lado
+    derecho es una letra, fijo es su valor y derecha es None; si no,
+    derecha es el indice de la n-upla del lado derecho y fijo es None.
+
+    >>> list(identity_instances([("xy", "yx")], 2, 2))
+    [(0, 0, None), (1, 2, None), (2, 1, None), (3, 3, None)]
+    """
+    for identity in identities:
+        if isinstance(identity, str):
+            pairs = named_identities(identity, n)
+        else:
+            pairs = [identity]
+        for lhs, rhs in pairs:
+            if len(lhs) != n or len(rhs) not in (1, n):
+                raise ValueError("Wrong identity %s = %s" % (lhs, rhs))
+            letters = sorted(set(lhs + rhs))
+            for values in product(range(m), repeat=len(letters)):
+                value = dict(zip(letters, values))
+                left = 0
+                for letter in lhs:
+                    left = left * m + value[letter]
+                if len(rhs) == 1:
+                    yield (left, None, value[rhs])
+                    continue
+                right = 0
+                for letter in rhs:
+                    right = right * m + value[letter]
+                yield (left, right, None)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Invariantes baratos de modelos, para descartar pares de modelos antes de
+buscar morfismos entre ellos.
+"""
+
+from .tables import indexed_tables
+
+
+class Invariants(object):
+
+    """
+    Invariantes de un modelo en un subtype:
+        n: cardinal
+        loops: cantidad de elementos x con f(x,...,x) = x para todas las
+            operaciones y (x,...,x) en todas las relaciones
+        operations: para cada operacion (idempotentes, tamaño de la imagen,
+            si es total)
+        relations: para cada relacion (tamaño, tuplas diagonales,
+            sucesiones de grados ordenadas de cada coordenada)
+        profile: si hay ^ o v, cuantos elementos hay de cada rango en el
+            orden que define
+
+    Dos modelos isomorfos tienen los mismos invariantes.
+    """
+
+    def __init__(self, n, loops, operations, relations, profile=None):
+        self.n = n
+        self.loops = loops
+        self.operations = operations
+        self.relations = relations
+        self.profile = profile
+
+    def vector(self):
+        """
+        Tupla hasheable con todos los invariantes
+        """
+        return (self.n,
+                self.loops,
+                tuple(sorted(self.operations.items())),
+                tuple(sorted(self.relations.items())),
+                self.profile)
+
+    def __eq__(self, other):
+        return self.vector() == other.vector()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.vector())
+
+    def __repr__(self):
+        return "Invariants%s" % (self.vector(),)
+
+    def may_map_to(self, other, inj=None, surj=None):
+        """
+        Decide si los invariantes permiten un homomorfismo (inyectivo o
+        suryectivo si se pide) de este modelo a other. Si devuelve False
+        seguro que no lo hay.
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> c3 = invariants(gen_chain(3))
+        >>> c3.may_map_to(invariants(rhombus), inj=True)
+        True
+        >>> c3.may_map_to(invariants(gen_chain(2) * gen_chain(2)), surj=True)
+        False
+        """
+        if self.loops and not other.loops:
+            # la imagen de un loop es un loop
+            return False
+        if inj:
+            if self.n > other.n:
+                return False
+            for op, (idempotents, image, total) in self.operations.items():
+                other_idempotents, other_image, _ = other.operations[op]
+                if idempotents > other_idempotents or image > other_image:
+                    return False
+            for rel, (size, diagonal, degrees) in self.relations.items():
+                other_size, other_diagonal, other_degrees = \
+                    other.relations[rel]
+                if size > other_size or diagonal > other_diagonal:
+                    return False
+                for sequence, other_sequence in zip(degrees, other_degrees):
+                    if any(d > e for d, e in zip(sequence, other_sequence)):
+                        return False
+        if surj:
+            if self.n < other.n:
+                return False
+            for op, (idempotents, image, total) in self.operations.items():
+                if total and other.operations[op][1] > image:
+                    # la imagen de other es la imagen por el morfismo de la
+                    # imagen de este modelo
+                    return False
+        return True
+
+
+def invariants(model, subtype=None):
+    """
+    Devuelve los invariantes del modelo en el subtype (por defecto su
+    tipo). Se calculan una vez por modelo y subtype.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> invariants(gen_chain(2) ** 2) == invariants(rhombus)
+    True
+    >>> invariants(gen_chain(4)) == invariants(rhombus)
+    False
+    >>> from folpy.examples.lattices import M3, N5
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> invariants(model_to_lattice(M3)).profile
+    (1, 3, 1)
+    >>> invariants(model_to_lattice(N5)).profile
+    (1, 2, 1, 1)
+    >>> from folpy.examples.lattices import rhombus
+    >>> invariants(rhombus) == invariants(model_to_lattice(rhombus))
+    True
+    >>> rhombus.count_isomorphisms_to(model_to_lattice(rhombus))
+    2
+    """
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("invariants", subtype)
+    if key not in tables.cache:
+        tables.cache[key] = compute_invariants(model, tables, subtype)
+    return tables.cache[key]
+
+
+def compute_invariants(model, tables, subtype):
+    """
+    Calcula los invariantes sobre las tablas indexadas del modelo
+    """
+    n = tables.n
+    loops = set(range(n))
+
+    operations = {}
+    for op in subtype.operations:
+        table = tables.operation(op)
+        arity = tables.arity(op)
+        # indice de (x,...,x) en la tabla plana
+        step = sum(n ** i for i in range(arity))
+        idempotents = {x for x in range(n) if table[x * step] == x}
+        loops &= idempotents
+        image = {v for v in table if v is not None}
+        operations[op] = (len(idempotents), len(image), None not in table)
+
+    relations = {}
+    for rel in subtype.relations:
+        rows = tables.relation(rel)
+        arity = tables.arity(rel)
+        diagonal = {row[0] for row in rows if len(set(row)) <= 1}
+        loops &= diagonal
+        degrees = []
+        for i in range(arity):
+            degree = [0] * n
+            for row in rows:
+                degree[row[i]] += 1
+            degrees.append(tuple(sorted(degree, reverse=True)))
+        relations[rel] = (len(rows), len(diagonal), tuple(degrees))
+
+    profile = None
+    for op, dual in (("^", False), ("v", True)):
+        if op in subtype.operations and tables.arity(op) == 2:
+            profile = rank_profile(tables, op, dual)
+            break
+
+    return Invariants(n, len(loops), operations, relations, profile)
+
+
+def rank_profile(tables, op, dual=False):
+    """
+    Cuantos elementos hay de cada rango en el orden que define la
+    operacion binaria op: a <= b si a op b = a (o si a op b = b, con dual,
+    para el supremo). Se calcula sobre las tablas, asi que no depende de
+    la clase del modelo.
+
+    >>> from folpy.examples.lattices import N5
+    >>> rank_profile(indexed_tables(N5), "v", dual=True)
+    (1, 2, 1, 1)
+    """
+    from .latdraw.layout import covers_of, ranks
+
+    n = tables.n
+    table = tables.operation(op)
+    strictly_above = [0] * n
+    for a in range(n):
+        for b in range(n):
+            value = table[a * n + b]
+            if a != b and value == (b if dual else a):
+                strictly_above[a] |= 1 << b
+    rank = ranks(covers_of(strictly_above))
+    return tuple(rank.count(r) for r in range(max(rank) + 1)) if rank else ()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
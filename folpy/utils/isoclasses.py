@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Conjuntos de modelos salvo isomorfismo.
+"""
+
+import hashlib
+import shelve
+from collections import OrderedDict
+from itertools import product
+
+from .certificates import canonical_form, canonical_isomorphism
+from .invariants import invariants
+from .tables import indexed_tables
+
+
+class IsoClassStore(object):
+
+    """
+    Guarda un representante por clase de isomorfismo.
+    Los modelos se separan en baldes por sus invariantes y solo cuando hay
+    otro modelo en el mismo balde se calcula el certificado canonico, del
+    que se guarda un hash. Asi, saber si ya hay una copia isomorfa cuesta
+    un hash de invariantes y a lo sumo un certificado.
+
+    Si se da path, a partir de memory_limit representantes en memoria los
+    mas viejos se bajan a disco (en un shelve en path) con sus tablas en el
+    orden canonico; al pedirlos se reconstruyen como Model sobre 0..n-1.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus, M3
+    >>> store = IsoClassStore()
+    >>> store.add(rhombus)
+    True
+    >>> store.add(gen_chain(2) ** 2)
+    False
+    >>> store.add(M3), len(store)
+    (True, 2)
+    >>> gen_chain(2) ** 2 in store, gen_chain(3) in store
+    (True, False)
+    >>> representative, iso = store.find(gen_chain(2) ** 2, isomorphism=True)
+    >>> representative is rhombus, iso((1, 1))
+    (True, 1)
+    """
+
+    def __init__(self, subtype=None, path=None, memory_limit=100000):
+        self.subtype = subtype
+        self.path = path
+        self.memory_limit = memory_limit
+        self.buckets = {}
+        self.digests = []
+        self.in_memory = OrderedDict()
+        self.disk = shelve.open(path) if path else None
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, model):
+        return self.find(model) is not None
+
+    def __iter__(self):
+        for slot in range(len(self.digests)):
+            yield self.representative(slot)
+
+    def key(self, model):
+        """
+        Clave del balde del modelo: hash de sus invariantes
+        """
+        return hash(invariants(model, self.model_subtype(model)))
+
+    def digest(self, model):
+        """
+        Hash del certificado canonico del modelo
+        """
+        certificate = canonical_form(model, self.model_subtype(model))[0]
+        return hashlib.sha1(repr(certificate).encode("utf8")).digest()
+
+    def model_subtype(self, model):
+        return self.subtype if self.subtype is not None else model.type
+
+    def slot_digest(self, slot):
+        """
+        Hash del certificado del representante de slot, calculandolo si
+        hacia falta
+        """
+        if self.digests[slot] is None:
+            self.digests[slot] = self.digest(self.representative(slot))
+        return self.digests[slot]
+
+    def index(self, model):
+        """
+        Devuelve la posicion (en el orden en que se agregaron) del
+        representante isomorfo a model, o None si no hay
+        """
+        slots = self.buckets.get(self.key(model))
+        if not slots:
+            return None
+        digest = self.digest(model)
+        for slot in slots:
+            if self.slot_digest(slot) == digest:
+                return slot
+        return None
+
+    def find(self, model, isomorphism=False):
+        """
+        Devuelve el representante isomorfo a model, o None si no hay.
+        Con isomorphism=True devuelve (representante, isomorfismo de model
+        en el representante).
+        """
+        slot = self.index(model)
+        if slot is None:
+            return None
+        representative = self.representative(slot)
+        if isomorphism:
+            return (representative, self.isomorphism(model, representative))
+        return representative
+
+    def add(self, model):
+        """
+        Agrega el modelo si no hay una copia isomorfa. Devuelve si lo
+        agrego.
+        """
+        key = self.key(model)
+        slots = self.buckets.setdefault(key, [])
+        digest = None
+        if slots:
+            digest = self.digest(model)
+            if any(self.slot_digest(slot) == digest for slot in slots):
+                return False
+        slot = len(self.digests)
+        slots.append(slot)
+        self.digests.append(digest)
+        self.in_memory[slot] = model
+        if self.disk is not None and len(self.in_memory) > self.memory_limit:
+            self.spill()
+        return True
+
+    def representative(self, slot):
+        """
+        Devuelve el representante guardado en slot
+        """
+        if slot in self.in_memory:
+            return self.in_memory[slot]
+        return model_from_tables(*self.disk[str(slot)])
+
+    def spill(self):
+        """
+        Baja a disco el representante mas viejo que esta en memoria
+        """
+        slot, model = self.in_memory.popitem(last=False)
+        if self.digests[slot] is None:
+            self.digests[slot] = self.digest(model)
+        self.disk[str(slot)] = canonical_tables(model,
+                                                self.model_subtype(model))
+
+    def isomorphism(self, model, representative):
+        """
+        Isomorfismo de model en representative, a partir de los
+        etiquetados canonicos
+        """
+        from ..semantics import Isomorphism
+        from .minion.solutions import morphism_fun
+
+        subtype = self.model_subtype(model)
+        iso = canonical_isomorphism(model, representative, subtype)
+        return morphism_fun(Isomorphism, subtype, model, representative,
+                            True, True)(iso)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def canonical_tables(model, subtype):
+    """
+    Tablas del modelo en el subtype renombrando los elementos por su
+    posicion en el etiquetado canonico. Devuelve (tipo, n, operaciones,
+    relaciones) con las operaciones como diccionarios de tuplas y las
+    relaciones como listas de tuplas.
+    """
+    tables = indexed_tables(model)
+    labeling = canonical_form(model, subtype)[1]
+    label = [0] * tables.n
+    for position, x in enumerate(labeling):
+        label[x] = position
+    operations = {}
+    for op in subtype.operations:
+        operations[op] = {tuple(label[x] for x in row[:-1]): label[row[-1]]
+                          for row in tables.graph(op)}
+    relations = {}
+    for rel in subtype.relations:
+        relations[rel] = sorted(tuple(label[x] for x in row)
+                                for row in tables.relation(rel))
+    return (subtype, tables.n, operations, relations)
+
+
+def model_from_tables(subtype, n, operations, relations):
+    """
+    Reconstruye un Model sobre 0..n-1 a partir de canonical_tables
+
+    >>> from folpy.examples.posets import rhombus
+    >>> model = model_from_tables(*canonical_tables(rhombus, rhombus.type))
+    >>> bool(model.is_isomorphic(rhombus))
+    True
+    """
+    from ..semantics import Model
+    from ..semantics.modelfunctions import Operation, Relation
+
+    universe = list(range(n))
+    model_operations = {op: Operation(table, d_universe=universe,
+                                      arity=subtype.operations[op])
+                        for op, table in operations.items()}
+    model_relations = {}
+    for rel, rows in relations.items():
+        arity = subtype.relations[rel]
+        rows = set(rows)
+        model_relations[rel] = Relation(
+            {t: t in rows for t in product(universe, repeat=arity)},
+            d_universe=universe,
+            arity=arity)
+    return Model(subtype, universe, model_operations, model_relations)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
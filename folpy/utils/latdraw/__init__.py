@@ -2,3 +2,4 @@
 # -*- coding: utf8 -*-
 
 from .latdraw import LatDraw
+from .layout import layered_layout, to_svg, to_dot, to_json, draw
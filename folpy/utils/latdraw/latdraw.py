@@ -41,15 +41,17 @@ class LatDraw(object):
         )"""
         lattice = self.lattice
         lattice.join_to_le()
+        upper = {e: [] for e in lattice.universe}
+        for r in lattice.relations["<="].table():
+            upper[r[0]].append(r[1])
         result = ""
         espacio = '" "'
         result += "\n"
         result += "(\n"
         for e in lattice.universe:
-            if [r[1] for r in lattice.relations["<="].table() if r[0] == e]:
+            if upper[e]:
                 result += '  ("%s" ("%s"))\n' % (e, espacio.join(
-                    str(r[1]) for r in lattice.relations["<="].table()
-                    if r[0] == e))
+                    str(x) for x in upper[e]))
             else:
                 result += '  ("%s" ())\n' % e
         result += ")\n"
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Dibujo de reticulados en Python puro, sin levantar una JVM.
+Calcula un layout por capas a partir del grafo de cubrimientos (capas por
+rango y reduccion de cruces por baricentros) y lo escribe como SVG, DOT o
+JSON.
+"""
+
+import json
+
+from ..misc import bits
+
+
+def cover_graph(lattice):
+    """
+    Devuelve (universe, covers) donde covers[i] es la lista de indices de
+    los elementos que cubren a universe[i]. Usa bitsets sobre las tablas
+    del reticulado.
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> cover_graph(model_to_lattice(rhombus))
+    ([0, 1, 2, 3], [[1, 2], [3], [3], []])
+    """
+    universe, index, join, meet = lattice.operation_tables()
+    n = len(universe)
+    strictly_above = [0] * n
+    for i in range(n):
+        meet_i = meet[i]
+        for k in range(n):
+            if k != i and meet_i[k] == i:
+                strictly_above[i] |= 1 << k
+    return (universe, covers_of(strictly_above))
+
+
+def covers_of(strictly_above):
+    """
+    Cubrimientos de un orden dado por bitsets: strictly_above[i] tiene
+    prendidos los elementos estrictamente mayores que i
+
+    >>> covers_of([0b1110, 0b1000, 0b1000, 0])
+    [[1, 2], [3], [3], []]
+    """
+    n = len(strictly_above)
+    covers = []
+    for i in range(n):
+        above = strictly_above[i]
+        not_covers = 0
+        for k in bits(above):
+            not_covers |= strictly_above[k]
+        covers.append(list(bits(above & ~not_covers)))
+    return covers
+
+
+def ranks(covers):
+    """
+    Rango de cada elemento como la cadena mas larga desde el minimo en el
+    grafo de cubrimientos.
+
+    >>> ranks([[1, 2], [3], [3], []])
+    [0, 1, 1, 2]
+    """
+    n = len(covers)
+    lower = [[] for _ in range(n)]
+    for i, cs in enumerate(covers):
+        for j in cs:
+            lower[j].append(i)
+    result = [0] * n
+    pending = [i for i in range(n) if not lower[i]]
+    missing = [len(lower[i]) for i in range(n)]
+    while pending:
+        i = pending.pop()
+        for j in covers[i]:
+            result[j] = max(result[j], result[i] + 1)
+            missing[j] -= 1
+            if not missing[j]:
+                pending.append(j)
+    return result
+
+
+def layered_layout(lattice, sweeps=4):
+    """
+    Calcula un layout por capas. Devuelve un diccionario con el universo,
+    las aristas de cubrimiento (como pares de indices), el rango y las
+    coordenadas de cada elemento. Las coordenadas x de cada capa se ordenan
+    por baricentro de los vecinos, alternando barridos hacia arriba y hacia
+    abajo.
+
+    >>> from folpy.examples.lattices import M3
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> layout = layered_layout(model_to_lattice(M3))
+    >>> layout["ranks"]
+    [0, 1, 1, 1, 2]
+    >>> layout["positions"]
+    [(0.0, 0), (-1.0, 1), (0.0, 1), (1.0, 1), (0.0, 2)]
+    """
+    universe, covers = cover_graph(lattice)
+    rank = ranks(covers)
+    n = len(universe)
+    lower = [[] for _ in range(n)]
+    for i, cs in enumerate(covers):
+        for j in cs:
+            lower[j].append(i)
+
+    layers = [[] for _ in range(max(rank) + 1 if rank else 0)]
+    for i in range(n):
+        layers[rank[i]].append(i)
+    order = [0] * n
+    for layer in layers:
+        for k, i in enumerate(layer):
+            order[i] = k
+
+    def barycenter(i, neighbours):
+        if not neighbours[i]:
+            return order[i]
+        return sum(order[j] for j in neighbours[i]) / len(neighbours[i])
+
+    for sweep in range(sweeps):
+        if sweep % 2 == 0:
+            sequence, neighbours = layers[1:], lower
+        else:
+            sequence, neighbours = list(reversed(layers[:-1])), covers
+        for layer in sequence:
+            layer.sort(key=lambda i: (barycenter(i, neighbours), order[i]))
+            for k, i in enumerate(layer):
+                order[i] = k
+
+    positions = [None] * n
+    for layer in layers:
+        width = len(layer)
+        for k, i in enumerate(layer):
+            positions[i] = (k - (width - 1) / 2, rank[i])
+
+    edges = [(i, j) for i in range(n) for j in covers[i]]
+    return {
+        "universe": universe,
+        "edges": edges,
+        "ranks": rank,
+        "positions": positions,
+    }
+
+
+def to_svg(layout, scale=60, radius=6):
+    """
+    Genera un string con el dibujo en SVG
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> svg = to_svg(layered_layout(model_to_lattice(gen_chain(2))))
+    >>> svg.count("<circle"), svg.count("<line")
+    (2, 1)
+    """
+    positions = layout["positions"]
+    if positions:
+        xs = [x for x, y in positions]
+        top = max(y for x, y in positions)
+        left = min(xs)
+        width = (max(xs) - left) * scale + 4 * radius
+        height = top * scale + 4 * radius
+    else:
+        top = left = width = height = 0
+
+    def point(i):
+        x, y = positions[i]
+        return ((x - left) * scale + 2 * radius,
+                (top - y) * scale + 2 * radius)
+
+    result = ('<svg xmlns="http://www.w3.org/2000/svg" '
+              'width="%s" height="%s">\n' % (width, height))
+    for i, j in layout["edges"]:
+        x1, y1 = point(i)
+        x2, y2 = point(j)
+        result += ('  <line x1="%s" y1="%s" x2="%s" y2="%s" '
+                   'stroke="black"/>\n' % (x1, y1, x2, y2))
+    for i, x in enumerate(layout["universe"]):
+        cx, cy = point(i)
+        result += ('  <circle cx="%s" cy="%s" r="%s" fill="white" '
+                   'stroke="black"/>\n' % (cx, cy, radius))
+        result += ('  <text x="%s" y="%s" font-size="10">%s</text>\n'
+                   % (cx + radius + 2, cy, escape(str(x))))
+    result += "</svg>\n"
+    return result
+
+
+def to_dot(layout):
+    """
+    Genera un string con el grafo de cubrimientos en formato DOT, con las
+    posiciones del layout
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> print(to_dot(layered_layout(model_to_lattice(gen_chain(2)))))
+    digraph {
+      rankdir=BT;
+      n0 [label="0", pos="0.0,0!"];
+      n1 [label="1", pos="0.0,1!"];
+      n0 -> n1;
+    }
+    <BLANKLINE>
+    """
+    result = "digraph {\n  rankdir=BT;\n"
+    for i, x in enumerate(layout["universe"]):
+        px, py = layout["positions"][i]
+        result += '  n%s [label="%s", pos="%s,%s!"];\n' % (
+            i, str(x).replace('"', '\\"'), px, py)
+    for i, j in layout["edges"]:
+        result += "  n%s -> n%s;\n" % (i, j)
+    result += "}\n"
+    return result
+
+
+def to_json(layout):
+    """
+    Genera un string JSON con nodos (etiqueta, rango y posicion) y aristas
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> to_json(layered_layout(model_to_lattice(gen_chain(2))))
+    '{"nodes": [{"label": "0", "rank": 0, "x": 0.0, "y": 0}, \
+{"label": "1", "rank": 1, "x": 0.0, "y": 1}], "edges": [[0, 1]]}'
+    """
+    nodes = []
+    for i, x in enumerate(layout["universe"]):
+        px, py = layout["positions"][i]
+        nodes.append({"label": str(x),
+                      "rank": layout["ranks"][i],
+                      "x": px,
+                      "y": py})
+    return json.dumps({"nodes": nodes,
+                       "edges": [list(e) for e in layout["edges"]]})
+
+
+FORMATS = {"svg": to_svg, "dot": to_dot, "json": to_json}
+
+
+def draw(lattice, path, fmt=None):
+    """
+    Escribe el dibujo del reticulado en path. El formato se toma de fmt o de
+    la extension del archivo (svg, dot o json).
+    """
+    if not fmt:
+        fmt = path.rsplit(".", 1)[-1]
+    if fmt not in FORMATS:
+        raise ValueError("Formato desconocido: '%s'" % fmt)
+    with open(path, "w") as open_file:
+        open_file.write(FORMATS[fmt](layered_layout(lattice)))
+
+
+def escape(text):
+    """
+    Escapa los caracteres especiales de XML
+
+    >>> escape("a<b")
+    'a&lt;b'
+    """
+    return (text.replace("&", "&amp;")
+                .replace("<", "&lt;")
+                .replace(">", "&gt;"))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
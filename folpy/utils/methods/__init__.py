@@ -8,8 +8,24 @@ from .substructures import (
 from .subuniverses import (
                             subuniverses,
                             subuniverse,
+                            generating_set,
                             is_subuniverse,
                             is_subuniverse_for_lattices
                           )
+from .orders import (
+    order_bitsets,
+    is_partial_order,
+    lattice_tables,
+    is_lattice
+)
+from .sublattices import (
+    operation_tables,
+    sublattice_closure,
+    sublattices
+)
+from .endomorphisms import (
+    AutomorphismGroup,
+    EndomorphismMonoid
+)
 
 substructures = substructures_by_maximals
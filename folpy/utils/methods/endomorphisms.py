@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Grupo de automorfismos y monoide de endomorfismos de un modelo, dados por
+generadores y sin enumerar sus elementos.
+Aut(A) sale de los generadores que da nauty (ver
+folpy.utils.certificates) con una cadena de estabilizadores
+(folpy.utils.groups). Los endomorfismos que no son automorfismos se
+guardan salvo composicion a izquierda con automorfismos: h y p*h (h y
+despues p) estan en la misma orbita, y la orbita de h tiene tantos
+elementos como restricciones distintas de automorfismos a la imagen de h.
+Aut(A) junto con un representante por orbita genera End(A).
+"""
+
+import numpy as np
+
+from ..certificates import automorphism_generators
+from ..groups import PermutationGroup
+from ..preservation import morphism_violation
+from ..tables import indexed_tables
+
+
+def automorphism_chain(model, subtype=None):
+    """
+    Aut(A) en el subtype como PermutationGroup sobre los indices del
+    universo. Se calcula una vez por modelo y subtype.
+
+    >>> from folpy.examples.lattices import M3
+    >>> automorphism_chain(M3).order()
+    6
+    """
+    if subtype is None:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("automorphism_chain", subtype)
+    if key not in tables.cache:
+        generators = automorphism_generators(model, subtype)[0]
+        tables.cache[key] = PermutationGroup(tables.n, generators)
+    return tables.cache[key]
+
+
+def as_array(model, f):
+    """
+    Funcion del universo del modelo en si mismo como array de indices.
+    f puede ser un morfismo, una funcion o una lista de elementos (las
+    imagenes en el orden del universo).
+    """
+    tables = indexed_tables(model)
+    if hasattr(f, "array"):
+        return f.array()
+    if callable(f):
+        images = [f(x) for x in tables.universe]
+    else:
+        images = list(f)
+    if len(images) != tables.n or \
+            any(y not in tables.index for y in images):
+        return None
+    return np.array([tables.index[y] for y in images], dtype=np.int64)
+
+
+def kernel_key(values):
+    """
+    Rotulacion canonica del nucleo de la funcion: dos funciones tienen el
+    mismo nucleo si y solo si tienen la misma rotulacion
+
+    >>> kernel_key([3, 1, 3, 0])
+    (0, 1, 0, 2)
+    """
+    labels = {}
+    return tuple(labels.setdefault(v, len(labels)) for v in values)
+
+
+class AutomorphismGroup(object):
+
+    """
+    Grupo de automorfismos de un modelo en el subtype, dado por
+    generadores y una cadena de estabilizadores: el orden, la pertenencia
+    y las orbitas no necesitan enumerar el grupo.
+
+    >>> from folpy.examples.lattices import M3, gen_chain
+    >>> aut = AutomorphismGroup(gen_chain(2) ** 3)
+    >>> aut.order()
+    6
+    >>> aut.orbit((0, 0, 1))
+    [(0, 0, 1), (0, 1, 0), (1, 0, 0)]
+    >>> [0, 2, 1, 3, 4] in AutomorphismGroup(M3)
+    True
+    >>> AutomorphismGroup(gen_chain(3)).order()
+    1
+    """
+
+    def __init__(self, model, subtype=None):
+        if subtype is None:
+            subtype = model.type
+        self.model = model
+        self.subtype = subtype
+        self.tables = indexed_tables(model)
+        self.group = automorphism_chain(model, subtype)
+
+    def __repr__(self):
+        return "AutomorphismGroup(order=%s, generators=%s)" % (
+            self.order(), len(self.group.generators))
+
+    def morphism(self, values):
+        """
+        Arma el Isomorphism a partir de su array
+        """
+        from ...semantics import Isomorphism
+
+        return Isomorphism.from_array(values, self.model, self.model,
+                                      self.subtype, inj=True, surj=True)
+
+    def generators(self):
+        """
+        Generadores del grupo, como Isomorphism
+        """
+        return [self.morphism(g) for g in self.group.generators]
+
+    def order(self):
+        """
+        Cantidad de automorfismos
+        """
+        return self.group.order()
+
+    def __contains__(self, f):
+        values = as_array(self.model, f)
+        return values is not None and values in self.group
+
+    def orbit(self, x):
+        """
+        Orbita del elemento x, ordenada como el universo
+        """
+        universe = self.tables.universe
+        return [universe[i] for i in self.group.orbit(self.tables.index[x])]
+
+    def orbits(self):
+        """
+        Particion del universo en orbitas
+
+        >>> from folpy.examples.lattices import M3
+        >>> AutomorphismGroup(M3).orbits()
+        [[0], [1, 2, 3], [4]]
+        """
+        universe = self.tables.universe
+        return [[universe[i] for i in orbit] for orbit in self.group.orbits()]
+
+    def elements(self):
+        """
+        Genera todos los automorfismos, sin guardarlos
+        """
+        for values in self.group.elements():
+            yield self.morphism(values)
+
+
+class EndomorphismMonoid(object):
+
+    """
+    Monoide de endomorfismos de un modelo en el subtype. Los
+    automorfismos son el grupo de unidades (units) y el resto se guarda con
+    un representante por orbita de la composicion a izquierda con
+    automorfismos (el lex-leader de la busqueda): representatives son los
+    arrays de los representantes y sizes los tamaños de sus orbitas.
+
+    >>> from folpy.examples.lattices import M3, rhombus
+    >>> end = EndomorphismMonoid(M3)
+    >>> end.order(), end.units.order(), end.sizes
+    (11, 6, [1, 3, 1])
+    >>> [2, 2, 2, 2, 2] in end, [0, 1, 1, 2, 4] in end
+    (True, False)
+    >>> end.orbit(1)
+    [0, 1, 2, 3, 4]
+    >>> end = EndomorphismMonoid(rhombus)
+    >>> end.order(), len(end.generators())
+    (16, 10)
+    >>> sum(1 for f in end.elements())
+    16
+    """
+
+    def __init__(self, model, subtype=None, backend=None):
+        if subtype is None:
+            subtype = model.type
+        self.model = model
+        self.subtype = subtype
+        self.tables = indexed_tables(model)
+        self.units = AutomorphismGroup(model, subtype)
+        self.representatives = []
+        self.sizes = []
+        self.chains = {}
+        self.find_representatives(backend)
+
+    def __repr__(self):
+        return "EndomorphismMonoid(order=%s, generators=%s)" % (
+            self.order(), len(self.units.group.generators) +
+            len(self.representatives))
+
+    def chain(self, values):
+        """
+        Aut(A) con una base que empieza por la imagen de values. Se
+        calcula una vez por imagen.
+        """
+        image = tuple(sorted(set(values.tolist())))
+        if image not in self.chains:
+            self.chains[image] = self.units.group.rebase(image)
+        return self.chains[image], len(image)
+
+    def find_representatives(self, backend=None):
+        """
+        Recorre los endomorfismos lex-leader para los generadores de
+        Aut(A) y se queda con uno por orbita. Dos endomorfismos de la misma
+        orbita tienen el mismo nucleo, asi que solo se comparan los que lo
+        comparten.
+        """
+        from ...semantics import Homomorphism
+        from ..minion.minion import morph_solver
+
+        group = self.units.group
+        symmetries = [tuple(g.tolist()) for g in group.generators]
+        solver = morph_solver(self.model, self.model, backend, self.subtype)
+        solutions = solver(Homomorphism, self.subtype, self.model,
+                           self.model, symmetries=symmetries)
+        buckets = {}
+        for values in solutions.stream(view=False):
+            values = np.asarray(values, dtype=np.int64)
+            key = kernel_key(values.tolist())
+            if len(set(key)) == self.tables.n:
+                continue
+            bucket = buckets.setdefault(key, [])
+            if any(self.same_orbit(r, values) for r in bucket):
+                continue
+            bucket.append(values)
+            chain, k = self.chain(values)
+            self.representatives.append(values)
+            # restricciones distintas de automorfismos a la imagen
+            self.sizes.append(int(np.prod([len(t) for t in
+                                           chain.transversals[:k]],
+                                          dtype=object)))
+
+    def same_orbit(self, r, values):
+        """
+        Decide si values es p*r para algun automorfismo p (r y values
+        tienen el mismo nucleo)
+        """
+        chain = self.chain(r)[0]
+        partial = dict(zip(r.tolist(), values.tolist()))
+        return chain.extension(partial) is not None
+
+    def morphism(self, values):
+        """
+        Arma el Homomorphism a partir de su array
+        """
+        from ...semantics import Homomorphism
+
+        return Homomorphism.from_array(values, self.model, self.model,
+                                       self.subtype)
+
+    def generators(self):
+        """
+        Generadores del monoide: los de Aut(A) y los representantes
+        """
+        return self.units.generators() + [self.morphism(r)
+                                          for r in self.representatives]
+
+    def order(self):
+        """
+        Cantidad de endomorfismos
+        """
+        return self.units.order() + sum(self.sizes)
+
+    def __contains__(self, f):
+        values = as_array(self.model, f)
+        return values is not None and morphism_violation(
+            values, self.model, self.model, self.subtype) is None
+
+    def orbit(self, x):
+        """
+        Imagenes de x por los endomorfismos, ordenadas como el universo
+        """
+        maps = list(self.units.group.generators) + self.representatives
+        start = self.tables.index[x]
+        result = {start}
+        frontier = [start]
+        while frontier:
+            new = []
+            for i in frontier:
+                for f in maps:
+                    j = int(f[i])
+                    if j not in result:
+                        result.add(j)
+                        new.append(j)
+            frontier = new
+        return [self.tables.universe[i] for i in sorted(result)]
+
+    def elements(self):
+        """
+        Genera todos los endomorfismos, sin guardarlos: los automorfismos y,
+        para cada representante r, los p*r con p recorriendo una
+        transversal de las restricciones a la imagen de r
+        """
+        for f in self.units.elements():
+            yield f
+        for r in self.representatives:
+            chain, k = self.chain(r)
+            for p in chain.elements(k):
+                yield self.morphism(p[r])
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
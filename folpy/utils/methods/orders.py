@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Herramientas para ordenes parciales representados con bitsets.
+
+Cada elemento del universo se identifica con su indice y la relacion <= se
+guarda como una lista de enteros: el bit j de up[i] esta prendido si y solo
+si universe[i] <= universe[j] (down es la traspuesta).
+"""
+
+from ..misc import bits
+
+
+def order_bitsets(universe, relation):
+    """
+    Carga la relacion binaria `relation` sobre `universe` en una matriz de
+    bitsets, recorriendo la tabla una sola vez.
+    Devuelve (up, down, index).
+
+    >>> from folpy.examples.posets import rhombus
+    >>> up, down, index = order_bitsets(rhombus.universe,
+    ...                                 rhombus.relations["<="])
+    >>> [bin(x) for x in up]
+    ['0b1111', '0b10', '0b110', '0b1010']
+    >>> [bin(x) for x in down]
+    ['0b1', '0b1111', '0b101', '0b1001']
+    """
+    index = {x: i for i, x in enumerate(universe)}
+    n = len(universe)
+    up = [0] * n
+    down = [0] * n
+    for x, y in relation.table():
+        i = index[x]
+        j = index[y]
+        up[i] |= 1 << j
+        down[j] |= 1 << i
+    return (up, down, index)
+
+
+def is_partial_order(up, down):
+    """
+    Decide si la relacion dada por los bitsets es reflexiva, antisimetrica y
+    transitiva.
+
+    >>> is_partial_order([0b11, 0b10], [0b01, 0b11])
+    True
+    >>> is_partial_order([0b11, 0b11], [0b11, 0b11])
+    False
+    >>> is_partial_order([0b011, 0b110, 0b100], [0b001, 0b011, 0b110])
+    False
+    """
+    for i, row in enumerate(up):
+        if row & down[i] != 1 << i:
+            # falla la reflexividad o la antisimetria
+            return False
+        for k in bits(row):
+            if up[k] & ~row:
+                return False
+    return True
+
+
+def lattice_tables(up, down):
+    """
+    Calcula las tablas de supremo e infimo de un orden parcial dado por
+    bitsets. El supremo de i y j es el k tal que up[k] == up[i] & up[j].
+    Devuelve (join, meet) como listas de listas de indices, o None si el
+    orden no es un reticulado.
+
+    >>> from folpy.examples.posets import rhombus
+    >>> up, down, index = order_bitsets(rhombus.universe,
+    ...                                 rhombus.relations["<="])
+    >>> join, meet = lattice_tables(up, down)
+    >>> join
+    [[0, 1, 2, 3], [1, 1, 1, 1], [2, 1, 2, 1], [3, 1, 1, 3]]
+    >>> meet
+    [[0, 0, 0, 0], [0, 1, 2, 3], [0, 2, 2, 0], [0, 3, 0, 3]]
+    >>> lattice_tables([0b01, 0b10], [0b01, 0b10]) is None
+    True
+    """
+    by_up = {row: k for k, row in enumerate(up)}
+    by_down = {row: k for k, row in enumerate(down)}
+    n = len(up)
+    join = [[None] * n for _ in range(n)]
+    meet = [[None] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i, n):
+            k = by_up.get(up[i] & up[j])
+            m = by_down.get(down[i] & down[j])
+            if k is None or m is None:
+                return None
+            join[i][j] = join[j][i] = k
+            meet[i][j] = meet[j][i] = m
+    return (join, meet)
+
+
+def is_lattice(poset):
+    """
+    Decide si un modelo con relacion <= es un reticulado.
+
+    >>> from folpy.examples.posets import rhombus, gen_chain
+    >>> is_lattice(rhombus)
+    True
+    >>> is_lattice(gen_chain(2) * gen_chain(2))
+    True
+    """
+    up, down, index = order_bitsets(poset.universe, poset.relations["<="])
+    if not is_partial_order(up, down):
+        return False
+    return lattice_tables(up, down) is not None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
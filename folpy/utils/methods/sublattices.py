@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Subreticulados con subconjuntos representados como bitmasks sobre los
+indices del universo y tablas de supremo e infimo precalculadas.
+"""
+
+from collections import deque
+from itertools import product
+
+from ..misc import bits
+
+
+def operation_tables(lattice):
+    """
+    Devuelve (universe, index, join, meet) donde join y meet son listas de
+    listas de indices. Para productos de reticulados arma las tablas
+    coordenada a coordenada a partir de las tablas de los factores, sin
+    llamar a las operaciones del producto.
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> universe, index, join, meet = operation_tables(
+    ...     model_to_lattice(rhombus))
+    >>> join[1][2], meet[1][2]
+    (3, 0)
+    """
+    factors = getattr(lattice, "factors", None)
+    if factors and all(hasattr(f, "operation_tables") for f in factors):
+        return product_tables(lattice.universe,
+                              [f.operation_tables() for f in factors])
+    universe = list(lattice.universe)
+    index = {x: i for i, x in enumerate(universe)}
+    n = len(universe)
+    join = [[None] * n for _ in range(n)]
+    meet = [[None] * n for _ in range(n)]
+    for i, x in enumerate(universe):
+        for j in range(i, n):
+            y = universe[j]
+            join[i][j] = join[j][i] = index[lattice.join(x, y)]
+            meet[i][j] = meet[j][i] = index[lattice.meet(x, y)]
+    return (universe, index, join, meet)
+
+
+def product_tables(universe, factor_tables):
+    """
+    Arma las tablas del producto a partir de las tablas de los factores.
+    Los indices del producto estan en base mixta, con la ultima coordenada
+    variando mas rapido (el orden de itertools.product).
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> c2 = model_to_lattice(gen_chain(2))
+    >>> universe, index, join, meet = (c2 * c2).operation_tables()
+    >>> universe[join[1][2]], universe[meet[1][2]]
+    ((1, 1), (0, 0))
+    """
+    sizes = [len(t[0]) for t in factor_tables]
+    digits = list(product(*[range(s) for s in sizes]))
+    assert len(digits) == len(universe)
+    strides = []
+    stride = 1
+    for s in reversed(sizes):
+        strides.insert(0, stride)
+        stride *= s
+
+    def combine(tables, d1, d2):
+        return sum(tables[k][d1[k]][d2[k]] * strides[k]
+                   for k in range(len(sizes)))
+
+    n = len(universe)
+    factor_joins = [t[2] for t in factor_tables]
+    factor_meets = [t[3] for t in factor_tables]
+    join = [[None] * n for _ in range(n)]
+    meet = [[None] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i, n):
+            join[i][j] = join[j][i] = combine(factor_joins,
+                                              digits[i], digits[j])
+            meet[i][j] = meet[j][i] = combine(factor_meets,
+                                              digits[i], digits[j])
+    index = {x: i for i, x in enumerate(universe)}
+    return (list(universe), index, join, meet)
+
+
+def sublattice_closure(join, meet, mask):
+    """
+    Clausura de un subconjunto (bitmask) bajo las tablas de supremo e
+    infimo.
+
+    >>> join = [[0, 1, 2, 3], [1, 1, 3, 3], [2, 3, 2, 3], [3, 3, 3, 3]]
+    >>> meet = [[0, 0, 0, 0], [0, 1, 0, 1], [0, 0, 2, 2], [0, 1, 2, 3]]
+    >>> bin(sublattice_closure(join, meet, 0b0110))
+    '0b1111'
+    >>> bin(sublattice_closure(join, meet, 0b0011))
+    '0b11'
+    """
+    closed = mask
+    pending = list(bits(mask))
+    while pending:
+        x = pending.pop()
+        join_x = join[x]
+        meet_x = meet[x]
+        for y in bits(closed):
+            for z in (join_x[y], meet_x[y]):
+                if not closed >> z & 1:
+                    closed |= 1 << z
+                    pending.append(z)
+    return closed
+
+
+def sublattices(join, meet, containing=0, proper=True):
+    """
+    Generador de todos los subreticulados (como bitmasks) que contienen al
+    bitmask `containing`. Parte de la clausura de `containing` y agrega un
+    elemento por vez, filtrando los repetidos con un conjunto de hashes.
+    No devuelve el subconjunto vacio.
+
+    >>> join = [[0, 1, 2, 3], [1, 1, 3, 3], [2, 3, 2, 3], [3, 3, 3, 3]]
+    >>> meet = [[0, 0, 0, 0], [0, 1, 0, 1], [0, 0, 2, 2], [0, 1, 2, 3]]
+    >>> len(list(sublattices(join, meet)))
+    11
+    >>> sorted(bin(x) for x in sublattices(join, meet, containing=0b0110,
+    ...                                    proper=False))
+    ['0b1111']
+    """
+    n = len(join)
+    full = (1 << n) - 1
+    start = sublattice_closure(join, meet, containing)
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        if current and not (proper and current == full):
+            yield current
+        for x in bits(full & ~current):
+            new = sublattice_closure(join, meet, current | 1 << x)
+            if new not in seen:
+                seen.add(new)
+                queue.append(new)
+
+
+def to_mask(index, subset):
+    """
+    Traduce un subconjunto del universo a bitmask
+    """
+    mask = 0
+    for x in subset:
+        mask |= 1 << index[x]
+    return mask
+
+
+def from_mask(universe, mask):
+    """
+    Traduce un bitmask a la lista de elementos del universo
+    """
+    return [universe[i] for i in bits(mask)]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
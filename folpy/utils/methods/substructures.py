@@ -1,6 +1,7 @@
 from itertools import combinations
 
 from .subuniverses import subuniverses, is_subuniverse, is_subdirect_subuniverse
+from ..isoclasses import IsoClassStore
 
 
 def substructures_downup(
@@ -67,7 +68,7 @@ def substructures_updown(
         subtype = model.type
     universe = model.universe.copy()
     result = []
-    # conviene guardar hashes de estructuras
+    isoclasses = IsoClassStore(subtype)
     result_compl = []
     for i in range(1, len(model)):
         for subset in combinations(universe, i):
@@ -80,8 +81,7 @@ def substructures_updown(
             if is_subuniverse(model, possible_subuniverse):
                 substructure = model.restrict(possible_subuniverse)
                 result_compl.append(subset)
-                if filter_isos and any(substructure.is_isomorphic(x)
-                                       for x in result):
+                if filter_isos and not isoclasses.add(substructure):
                     continue
                 result.append(substructure)
                 yield substructure
@@ -149,8 +149,7 @@ def substructures_by_maximals(
                 if is_subuniverse(model, possible_subuniverse):
                     new_substructure = supermodel.restrict(possible_subuniverse)
                     complements_subsets.append(supersubset)
-                    if filter_isos and any(new_substructure.is_isomorphic(x)
-                                           for x in known_substructures):
+                    if filter_isos and not isoclasses.add(new_substructure):
                         continue
                     known_substructures.append(new_substructure)
                     yield new_substructure
@@ -159,6 +158,7 @@ def substructures_by_maximals(
 
     known_substructures = []
     complements_subsets = []
+    isoclasses = IsoClassStore(subtype)
     old_substructure_list = maximal_substructures(model, model)
     new_substructure_list = []
 
@@ -1,5 +1,6 @@
 from itertools import product
 from .. import powerset
+from .sublattices import sublattice_closure, to_mask
 
 
 def subuniverse(model, subset, subtype=None):
@@ -54,6 +55,42 @@ def subuniverse(model, subset, subtype=None):
     result.sort()
     return (result, partials)
 
+def generating_set(model, subtype=None):
+    """
+    Devuelve un conjunto chico de generadores del modelo para el subtype:
+    agrega de a uno, entre los elementos que todavia no se generan, el que
+    genera solo el subuniverso mas grande, y despues saca los que sobran.
+    Se calcula una vez por modelo y subtype.
+
+    >>> from folpy.examples.lattices import *
+    >>> generating_set(rhombus)
+    [1, 2]
+    >>> len(generating_set(M3))
+    3
+    """
+    from ..tables import indexed_tables
+
+    if not subtype:
+        subtype = model.type
+    tables = indexed_tables(model)
+    key = ("generating_set", subtype)
+    if key not in tables.cache:
+        universe = sorted(model.universe)
+        one = {x: len(subuniverse(model, [x], subtype)[0]) for x in universe}
+        generators = []
+        closed = subuniverse(model, [], subtype)[0]
+        while len(closed) < len(universe):
+            missing = [x for x in universe if x not in closed]
+            generators.append(max(missing, key=lambda x: one[x]))
+            closed = subuniverse(model, list(generators), subtype)[0]
+        for x in list(generators):
+            rest = [y for y in generators if y != x]
+            if len(subuniverse(model, rest, subtype)[0]) == len(universe):
+                generators = rest
+        tables.cache[key] = generators
+    return list(tables.cache[key])
+
+
 def subuniverses(model, subtype=None, proper=True):
     """
     NO DEVUELVE EL SUBUNIVERSO VACIO
@@ -167,12 +204,22 @@ def is_subuniverse(model, subset, subtype=None):
 
 
 def is_subuniverse_for_lattices(model, possible_subuniverse):
-    for x in product(possible_subuniverse, repeat=2):
-        if model.join(*x) not in possible_subuniverse:
-            return False
-        if model.meet(*x) not in possible_subuniverse:
-            return False
-    return True
+    """
+    Dado un conjunto, decide si es subreticulado, usando la clausura por
+    bitmasks sobre las tablas del reticulado
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> from folpy.semantics.lattices import model_to_lattice
+    >>> is_subuniverse_for_lattices(model_to_lattice(rhombus), [0, 1, 3])
+    True
+    >>> is_subuniverse_for_lattices(model_to_lattice(rhombus), [1, 2, 3])
+    False
+    """
+    universe, index, join, meet = model.operation_tables()
+    if any(x not in index for x in possible_subuniverse):
+        return False
+    mask = to_mask(index, possible_subuniverse)
+    return sublattice_closure(join, meet, mask) == mask
 
 
 def is_subdirect_subuniverse(subuniverse, universe):
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Busqueda de operaciones term que cumplen identidades (Maltsev, NU, WNU,
+Siggers, ...).
+Una operacion term n-aria cumple las identidades si y solo si su
+restriccion a las n-uplas que aparecen en las identidades las cumple, y
+esas restricciones son exactamente el subuniverso de A^S generado por las
+n proyecciones restringidas a S. Asi que se cierra ese subuniverso por las
+operaciones hasta encontrar un vector que cumpla las identidades, y el
+testigo se arma evaluando en todo A^n el termino que lo genero.
+"""
+
+import numpy as np
+
+from ..identities import identity_instances
+from ..preservation import arguments, operation_array
+from ..tables import indexed_tables
+
+
+# cantidad de combinaciones de argumentos que se evaluan a la vez
+BLOCK = 4096
+# filas de la clausura a partir de las cuales se deja de buscar
+TERM_LIMIT = 200000
+
+
+def identity_coordinates(algebra, n, identities, subtype=None):
+    """
+    Devuelve (coordenadas, iguales, fijos) para buscar una operacion term
+    n-aria con las identidades: coordenadas son los indices (en base
+    mixta) de las n-uplas de S, iguales los pares de posiciones en
+    coordenadas que tienen que tomar el mismo valor y fijos los pares
+    (posicion, valor). Si la identidad fija el valor de una n-upla
+    constante (a,...,a) y {a} es subuniverso, esa restriccion se cumple
+    siempre y la n-upla no se mira. Devuelve None si las identidades se
+    contradicen.
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> coordinates, equal, fixed = identity_coordinates(
+    ...     gen_chain(2), 3, [("xyy", "x"), ("yyx", "x")])
+    >>> coordinates, equal, fixed
+    ([1, 3, 4, 6], [], [(0, 1), (1, 0), (2, 1), (3, 0)])
+    """
+    if subtype is None:
+        subtype = algebra.type
+    tables = indexed_tables(algebra)
+    m = tables.n
+    diagonal = {a: sum(a * m ** i for i in range(n)) for a in range(m)}
+    trivial = {diagonal[a]: a for a in range(m)
+               if idempotent_at(tables, a, subtype)}
+    values = {}
+    pairs = []
+    for left, right, value in identity_instances(identities, m, n):
+        if right is None:
+            if values.setdefault(left, value) != value:
+                return None
+        elif left != right:
+            pairs.append((left, right))
+    for left in list(values):
+        if trivial.get(left, values[left]) != values[left]:
+            return None
+        if left in trivial:
+            del values[left]
+    coordinates = sorted(set(values) | {c for pair in pairs for c in pair})
+    position = {c: i for i, c in enumerate(coordinates)}
+    equal = sorted({(position[a], position[b]) for a, b in pairs})
+    fixed = sorted((position[c], v) for c, v in values.items())
+    return coordinates, equal, fixed
+
+
+def idempotent_at(tables, a, subtype):
+    """
+    Decide si {a} es subuniverso para el subtype
+    """
+    for op in subtype.operations:
+        table = tables.operation(op)
+        k = tables.arity(op)
+        position = sum(a * tables.n ** i for i in range(k))
+        if table[position] not in (a, None):
+            return False
+    return True
+
+
+def argument_blocks(total, k, start):
+    """
+    Genera las k-uplas de argumentos (indices de filas de la clausura,
+    menores que total) que usan al menos una fila nueva (de start en
+    adelante), en bloques de a lo sumo BLOCK, como arrays de forma (c, k)
+
+    >>> [block.tolist() for block in argument_blocks(2, 2, 1)]
+    [[[1, 0], [1, 1]], [[0, 1]]]
+    """
+    for p in range(k):
+        # el primer argumento nuevo esta en la posicion p
+        ranges = [(0, start)] * p + [(start, total)] + \
+            [(0, total)] * (k - p - 1)
+        shape = [b - a for a, b in ranges]
+        count = int(np.prod(shape))
+        offsets = np.array([a for a, b in ranges], dtype=np.int64)
+        for begin in range(0, count, BLOCK):
+            flat = np.arange(begin, min(begin + BLOCK, count))
+            yield np.stack(np.unravel_index(flat, shape), axis=1) + offsets
+
+
+def maltsev_identities():
+    """
+    m(x,y,y) = x = m(y,y,x)
+    """
+    return [("xyy", "x"), ("yyx", "x")]
+
+
+def nu_identities(k):
+    """
+    Casi unanimidad k-aria: t(y,x,...,x) = ... = t(x,...,x,y) = x
+
+    >>> nu_identities(3)
+    [('yxx', 'x'), ('xyx', 'x'), ('xxy', 'x')]
+    """
+    return [("x" * i + "y" + "x" * (k - i - 1), "x") for i in range(k)]
+
+
+def wnu_identities(k):
+    """
+    Casi unanimidad debil k-aria: idempotente y
+    w(y,x,...,x) = ... = w(x,...,x,y)
+
+    >>> wnu_identities(3)
+    ['idempotent', ('yxx', 'xyx'), ('yxx', 'xxy')]
+    """
+    words = [lhs for lhs, rhs in nu_identities(k)]
+    return ["idempotent"] + [(words[0], word) for word in words[1:]]
+
+
+def siggers_identities():
+    """
+    Siggers de 4 variables: idempotente y s(a,r,e,a) = s(r,a,r,e)
+    """
+    return ["idempotent", ("area", "rare")]
+
+
+class TermClosure(object):
+
+    """
+    Subuniverso de A^S generado por las proyecciones (y las constantes),
+    con el termino que genero cada fila: parents[i] es (None, j) para la
+    proyeccion j y (op, filas de los argumentos) para el resto.
+    """
+
+    def __init__(self, tables, n, subtype, coordinates, equal, fixed):
+        self.m = tables.n
+        self.n = n
+        self.digits = arguments(self.m, n)
+        self.operations = [(tables.arity(op), operation_array(tables, op))
+                           for op in sorted(subtype.operations)]
+        self.rows = []
+        self.parents = []
+        self.seen = set()
+        self.left = np.array([a for a, b in equal], dtype=np.int64)
+        self.right = np.array([b for a, b in equal], dtype=np.int64)
+        self.where = np.array([p for p, v in fixed], dtype=np.int64)
+        self.value = np.array([v for p, v in fixed], dtype=np.int64)
+        projections = self.digits[coordinates].T
+        for j in range(n):
+            self.add(projections[j], (None, j))
+        for op, (arity, table) in enumerate(self.operations):
+            if arity == 0:
+                self.add(np.full(len(coordinates), table[0]), (op, ()))
+        self.rows = np.array(self.rows, dtype=np.int64).reshape(
+            -1, len(coordinates))
+
+    def add(self, row, parent):
+        """
+        Agrega la fila si es nueva. Devuelve si la agrego.
+        """
+        key = row.tobytes()
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        self.rows.append(row)
+        self.parents.append(parent)
+        return True
+
+    def witness(self, block):
+        """
+        Posicion de la primer fila del bloque que cumple las identidades,
+        o None
+        """
+        good = np.ones(len(block), dtype=bool)
+        if len(self.left):
+            good &= np.all(block[:, self.left] == block[:, self.right],
+                           axis=1)
+        if len(self.where):
+            good &= np.all(block[:, self.where] == self.value, axis=1)
+        found = np.flatnonzero(good)
+        return int(found[0]) if len(found) else None
+
+    def blocks(self, start):
+        """
+        Genera las filas nuevas que salen de aplicar las operaciones a
+        argumentos que usan alguna fila de start en adelante, de a bloques
+        (listas de filas, ya agregadas a parents)
+        """
+        end = len(self.rows)
+        for op, (arity, table) in enumerate(self.operations):
+            if arity == 0:
+                continue
+            for args in argument_blocks(end, arity, start):
+                position = np.zeros((len(args), self.rows.shape[1]),
+                                    dtype=np.int64)
+                for i in range(arity):
+                    position = position * self.m + self.rows[args[:, i]]
+                results = table[position]
+                defined = np.all(results != -1, axis=1)
+                fresh = []
+                for row, arg in zip(results[defined], args[defined]):
+                    key = row.tobytes()
+                    if key not in self.seen:
+                        self.seen.add(key)
+                        fresh.append(row)
+                        self.parents.append((op, tuple(arg.tolist())))
+                if fresh:
+                    yield fresh
+
+    def search(self, limit=None):
+        """
+        Cierra por rondas hasta encontrar una fila que cumpla las
+        identidades. Devuelve su posicion, None si no hay o "limit" si la
+        clausura pasa de limit filas.
+        """
+        found = self.witness(self.rows)
+        start = 0
+        while found is None and start < len(self.rows):
+            end = len(self.rows)
+            new = []
+            for fresh in self.blocks(start):
+                found = self.witness(np.array(fresh))
+                if found is not None:
+                    found += end + len(new)
+                new += fresh
+                if found is not None:
+                    break
+                if limit is not None and end + len(new) > limit:
+                    return "limit"
+            if new:
+                self.rows = np.concatenate([self.rows, np.array(new)])
+            start = end
+        return found
+
+    def evaluate(self, target):
+        """
+        Evalua en todas las n-uplas el termino que genero la fila target
+        """
+        needed = set()
+        pending = [target]
+        while pending:
+            i = pending.pop()
+            if i not in needed:
+                needed.add(i)
+                if self.parents[i][0] is not None:
+                    pending.extend(self.parents[i][1])
+        values = {}
+        for i in sorted(needed):
+            op, args = self.parents[i]
+            if op is None:
+                values[i] = self.digits[:, args]
+                continue
+            position = np.zeros(len(self.digits), dtype=np.int64)
+            for a in args:
+                position = position * self.m + values[a]
+            values[i] = self.operations[op][1][position]
+        return values[target]
+
+
+def term_operation(algebra, n, identities, subtype=None, limit=None):
+    """
+    Si existe, devuelve una operacion term n-aria del algebra (en el
+    subtype) que cumple las identidades, como Operation; si no, False.
+    Con limit, se rinde (devuelve None) si la clausura pasa de limit
+    elementos.
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> c2 = gen_chain(2)
+    >>> f = term_operation(c2, 3, [("xxy", "x"), ("xyx", "x"), ("yxx", "x")])
+    >>> [f(0, 0, 1), f(0, 1, 1), f(1, 0, 1)]
+    [0, 1, 1]
+    >>> term_operation(c2, 3, [("xyy", "x"), ("yyx", "x")])
+    False
+    """
+    from ...semantics.modelfunctions import Operation
+
+    if subtype is None:
+        subtype = algebra.type
+    tables = indexed_tables(algebra)
+    constraints = identity_coordinates(algebra, n, identities, subtype)
+    if constraints is None:
+        return False
+    closure = TermClosure(tables, n, subtype, *constraints)
+    found = closure.search(limit)
+    if found is None:
+        return False
+    if found == "limit":
+        return None
+    table = closure.evaluate(found)
+    universe = tables.universe
+    return Operation({tuple(universe[a] for a in args): universe[v]
+                      for args, v in zip(closure.digits.tolist(),
+                                         table.tolist())},
+                     d_universe=list(algebra.universe), arity=n)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -3,13 +3,31 @@
 
 from .minion import (
     MinionSol,
+    NativeMorphSol,
+    GeneratedMorphSol,
+    ProductMorphSol,
+    BACKENDS,
+    morph_solver,
     MorphMinionSol,
     ParallelMorphMinionSol,
     homomorphisms,
     embeddings,
     isomorphisms,
+    count_homomorphisms,
+    count_embeddings,
+    count_isomorphisms,
+    stream_morphisms,
+    morphism_orbits,
     is_homomorphic_image,
     is_substructure,
     is_isomorphic,
-    is_isomorphic_to_any
+    is_isomorphic_to_any,
+    PolymorphismSol,
+    polymorphisms,
+    has_polymorphism
 )
+from .batch import MinionBatch, batch_morphisms, first_morphism
+from .solutions import MorphismView
+from .pool import MinionPool, MinionJob, MinionProcess, default_pool
+from .cache import MorphismCache, get_morphism_cache, set_morphism_cache
+from .scheduler import MinionScheduler
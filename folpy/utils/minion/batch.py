@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Varias consultas de existencia de morfismos en una sola corrida de Minion.
+Minion no resuelve varios problemas en un mismo proceso, pero si uno que
+es la disyuncion de varios: cada consulta es un bloque con sus propias
+variables y tablas (MorphismModel con tag q<k>), sus restricciones se
+imponen con reifyimply(c, b[k]) y la variable which elige el bloque
+(b[k] <-> which = k). En **SEARCH** se pide ramificar primero en which y
+con valores crecientes (VARORDER STATIC, VALORDER), asi que la primer
+solucion es la de la primer consulta que tiene morfismo, y ninguna de las
+anteriores tiene.
+Solo se imprime el vector out: out[0] es which y el resto la solucion del
+bloque elegido, que se separa con demultiplex. Para saber la respuesta de
+las consultas que siguen se vuelve a correr con las que quedan.
+"""
+
+from collections import deque
+
+from .pool import default_pool
+
+
+# cantidad de consultas por corrida de Minion
+BATCH_SIZE = 64
+
+
+def batch_input(models, withouts):
+    """
+    Junta los modelos (MorphismModel con tags distintos) en un input de
+    Minion que busca un morfismo de alguno de ellos
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> from folpy.semantics import Homomorphism
+    >>> from .minion import MorphismModel
+    >>> c2, c3 = gen_chain(2), gen_chain(3)
+    >>> models = [MorphismModel(Homomorphism, c2.type, c3, c2, tag="q0"),
+    ...           MorphismModel(Homomorphism, c2.type, c2, c2, tag="q1")]
+    >>> lines = "".join(batch_input(models, [[], []])).splitlines()
+    >>> lines[3:6]
+    ['DISCRETE which{0..1}', 'BOOL b[2]', '']
+    >>> [line for line in lines if line.startswith("VA")]
+    ['VARORDER STATIC [which]', 'VALORDER [a]']
+    >>> print("\\n".join(line for line in lines if "q1f[1]" in line))
+    reifyimply(table([q1f[0],q1f[1]],q1leq), b[1])
+    reifyimply(table([q1f[1],q1f[1]],q1leq), b[1])
+    reifyimply(eq(out[2], q1f[1]), b[1])
+    """
+    width = max(model.source.n for model in models)
+    top = max(model.target.n for model in models) - 1
+    variables = ["DISCRETE which{0..%s}\n" % (len(models) - 1),
+                 "BOOL b[%s]\n\n" % len(models)]
+    tuplelist = []
+    constraints = ["eq(out[0], which)\n"]
+    for k, (model, without) in enumerate(zip(models, withouts)):
+        block = model.blocks(without)
+        variables += block[0]
+        tuplelist += block[1]
+        constraints.append("reify(eq(which, %s), b[%s])\n" % (k, k))
+        for line in "".join(block[2]).splitlines():
+            constraints.append("reifyimply(%s, b[%s])\n" % (line, k))
+        for i in range(width):
+            if i < model.source.n:
+                value = "%s[%s]" % (model.f, i)
+            else:
+                value = "-1"
+            constraints.append("reifyimply(eq(out[%s], %s), b[%s])\n" %
+                               (i + 1, value, k))
+    variables.append("DISCRETE out[%s]{-1..%s}\n\n" %
+                     (width + 1, max(top, len(models) - 1)))
+    result = ["MINION 3\n\n", "**VARIABLES**\n"]
+    result += variables
+    result += ["**SEARCH**\n", "VARORDER STATIC [which]\n",
+               "VALORDER [a]\n", "PRINT [out]\n\n", "**TUPLELIST**\n"]
+    result += tuplelist
+    result.append("**CONSTRAINTS**\n")
+    result += constraints
+    result.append("**EOF**\n")
+    return result
+
+
+def demultiplex(line, models):
+    """
+    Separa una linea de solucion de un input de batch_input: devuelve
+    (k, solucion del bloque k como {(i,): v})
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> from folpy.semantics import Homomorphism
+    >>> from .minion import MorphismModel
+    >>> c2, c3 = gen_chain(2), gen_chain(3)
+    >>> models = [MorphismModel(Homomorphism, c2.type, c3, c2, tag="q0"),
+    ...           MorphismModel(Homomorphism, c2.type, c2, c2, tag="q1")]
+    >>> demultiplex("1 0 1 -1\\n", models)
+    (1, {(0,): 0, (1,): 1})
+    """
+    values = list(map(int, line.split()))
+    k = values[0]
+    n = models[k].source.n
+    return k, {(i,): v for i, v in enumerate(values[1:n + 1])}
+
+
+class MinionBatch(object):
+
+    """
+    Consultas de existencia de morfismos del mismo tipo, de a size por
+    corrida de Minion. queries es una lista de pares (source, target) o
+    de ternas (source, target, without). Se encolan en el pool a lo sumo
+    cores corridas a la vez, en orden.
+    answers tiene, para cada consulta, el morfismo que se encontro, False
+    si no hay o None si todavia no se sabe.
+    """
+
+    def __init__(self, morph_type, subtype, queries, inj=None, surj=None,
+                 size=BATCH_SIZE, cores=10, pool=None):
+        from .minion import MorphismModel
+
+        self.morph_type = morph_type
+        self.subtype = subtype
+        self.models = []
+        self.withouts = []
+        for k, query in enumerate(queries):
+            source, target = query[:2]
+            self.models.append(MorphismModel(morph_type, subtype, source,
+                                             target, inj, surj,
+                                             tag="q%s" % k))
+            self.withouts.append(query[2] if len(query) > 2 else [])
+        self.answers = [None] * len(self.models)
+        self.size = size
+        self.cores = cores
+        self.pool = pool if pool is not None else default_pool()
+        self.pending = deque((start, min(start + size, len(self.models)))
+                             for start in range(0, len(self.models), size))
+        self.running = deque()
+
+    def submit(self):
+        """
+        Encola corridas hasta tener cores andando
+        """
+        while self.pending and len(self.running) < self.cores:
+            start, end = self.pending.popleft()
+            data = batch_input(self.models[start:end],
+                               self.withouts[start:end])
+            self.running.append((start, end,
+                                 self.pool.submit(data, allsols=False)))
+
+    def read(self, start, end, job):
+        """
+        Lee la respuesta de la corrida de las consultas de start a end.
+        Devuelve la posicion de la consulta que tiene morfismo, o None si
+        ninguna tiene.
+        """
+        line = job.get()
+        rest = job.get() if isinstance(line, str) else line
+        while isinstance(rest, str):
+            rest = job.get()
+        if isinstance(line, Exception):
+            raise line
+        if isinstance(rest, Exception):
+            raise rest
+        if line is None:
+            for k in range(start, end):
+                self.answers[k] = False
+            return None
+        try:
+            k, solution = demultiplex(line, self.models[start:end])
+        except (ValueError, IndexError):
+            raise ValueError("Minion Error:\n%s" % line)
+        k += start
+        for i in range(start, k):
+            self.answers[i] = False
+        self.answers[k] = self.models[k].fun(solution)
+        return k
+
+    def first(self):
+        """
+        Devuelve (posicion, morfismo) de la primer consulta que tiene
+        morfismo, o None si ninguna tiene. Las corridas que quedan se
+        cancelan.
+        """
+        self.submit()
+        while self.running:
+            start, end, job = self.running.popleft()
+            k = self.read(start, end, job)
+            if k is not None:
+                self.cancel()
+                return k, self.answers[k]
+            self.submit()
+        return None
+
+    def solve(self):
+        """
+        Responde todas las consultas y devuelve answers. Despues de cada
+        consulta con morfismo, las que le siguen en su corrida se vuelven
+        a encolar.
+        """
+        self.submit()
+        while self.running:
+            start, end, job = self.running.popleft()
+            k = self.read(start, end, job)
+            if k is not None and k + 1 < end:
+                self.pending.appendleft((k + 1, end))
+            self.submit()
+        return self.answers
+
+    def cancel(self):
+        """
+        Cancela las corridas que estan en el pool
+        """
+        while self.running:
+            self.running.popleft()[2].cancel()
+        self.pending.clear()
+
+
+def split_queries(morph_type, subtype, queries, inj=None, surj=None,
+                  backend=None):
+    """
+    Separa las posiciones de las consultas que los invariantes no
+    descartan en (las que se resuelven en Python, las que van a Minion),
+    segun morph_solver con el backend dado: sin backend, levantar Minion
+    para un problema chico cuesta mas que resolverlo
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> from folpy.semantics import Embedding
+    >>> queries = [(rhombus, gen_chain(4)), (gen_chain(3), rhombus)]
+    >>> split_queries(Embedding, rhombus.type, queries)
+    ([0, 1], [])
+    >>> split_queries(Embedding, rhombus.type, queries, backend="minion")
+    ([], [0, 1])
+    """
+    from .minion import discarded, morph_solver, MorphMinionSol
+
+    native, remote = [], []
+    for k, query in enumerate(queries):
+        source, target = query[:2]
+        if discarded(morph_type, subtype, source, target, inj, surj):
+            continue
+        if morph_solver(source, target, backend, subtype) == \
+                MorphMinionSol:
+            remote.append(k)
+        else:
+            native.append(k)
+    return native, remote
+
+
+def solve_natively(morph_type, subtype, query, inj=None, surj=None,
+                   backend=None):
+    """
+    Devuelve un morfismo de la consulta, o False, sin Minion
+    """
+    from .minion import solve_morphisms
+
+    without = query[2] if len(query) > 2 else []
+    solutions = solve_morphisms(morph_type, subtype, query[0], query[1], inj,
+                                surj, False, without, backend)
+    return solutions[0] if solutions else False
+
+
+def batch_morphisms(morph_type, subtype, queries, inj=None, surj=None,
+                    size=BATCH_SIZE, cores=10, backend=None):
+    """
+    Responde varias consultas de existencia de morfismos con corridas de
+    Minion de a size consultas: devuelve, en el orden de queries, un
+    morfismo o False para cada una. Las consultas que los invariantes
+    descartan no se le pasan a Minion, y las que morph_solver no le deja
+    a Minion (con backend, o las chicas si no se da) se resuelven en Python.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> from folpy.semantics import Embedding
+    >>> answers = batch_morphisms(Embedding, rhombus.type,
+    ...                           [(rhombus, gen_chain(4)),
+    ...                            (gen_chain(3), rhombus)])
+    >>> [bool(answer) for answer in answers]
+    [False, True]
+    """
+    answers = [False] * len(queries)
+    native, remote = split_queries(morph_type, subtype, queries, inj, surj,
+                                   backend)
+    for k in native:
+        answers[k] = solve_natively(morph_type, subtype, queries[k], inj,
+                                    surj, backend)
+    if remote:
+        batch = MinionBatch(morph_type, subtype,
+                            [queries[k] for k in remote], inj, surj,
+                            size, cores)
+        for k, answer in zip(remote, batch.solve()):
+            answers[k] = answer
+    return answers
+
+
+def first_morphism(morph_type, subtype, queries, inj=None, surj=None,
+                   size=BATCH_SIZE, cores=10, backend=None):
+    """
+    Devuelve (posicion, morfismo) de la primer consulta de queries que
+    tiene morfismo, o None si ninguna tiene, con corridas de Minion de a
+    size consultas. Las consultas que morph_solver no le deja a Minion (ver
+    batch_morphisms) se resuelven antes en Python, y a Minion solo se le
+    pregunta por las anteriores a la primera de ellas que tiene morfismo.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> from folpy.semantics import Embedding
+    >>> first_morphism(Embedding, rhombus.type,
+    ...                [(rhombus, gen_chain(4)), (gen_chain(3), rhombus),
+    ...                 (gen_chain(2), rhombus)])[0]
+    1
+    """
+    native, remote = split_queries(morph_type, subtype, queries, inj, surj,
+                                   backend)
+    found = None
+    for k in native:
+        answer = solve_natively(morph_type, subtype, queries[k], inj, surj,
+                                backend)
+        if answer:
+            found = (k, answer)
+            break
+    if found is not None:
+        remote = [k for k in remote if k < found[0]]
+    if remote:
+        answer = MinionBatch(morph_type, subtype,
+                             [queries[k] for k in remote], inj, surj, size,
+                             cores).first()
+        if answer is not None:
+            found = (remote[answer[0]], answer[1])
+    return found
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
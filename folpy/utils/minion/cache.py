@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Cache de consultas de morfismos.
+Las respuestas se guardan como tuplas de indices de target (una por
+elemento de source), bajo una clave armada con las huellas de los modelos,
+el subtype, el tipo de morfismo, inj/surj y los morfismos excluidos.
+Una entrada es completa si tiene todas las soluciones; si no, viene de una
+consulta de existencia y tiene a lo sumo una.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
+from ..files import object_to_file, file_to_object
+from ..tables import indexed_tables
+from .solutions import LazySolutions
+
+
+class MorphismCache(object):
+
+    """
+    Cache LRU de respuestas de morfismos con a lo sumo maxsize entradas.
+    Si se da path, ademas guarda cada respuesta en un archivo de ese
+    directorio y lo consulta cuando no la tiene en memoria.
+    No guarda listas de mas de max_solutions soluciones.
+
+    >>> cache = MorphismCache(maxsize=2)
+    >>> cache.store("a", [(0, 1)], complete=False)
+    >>> cache.lookup("a", allsols=False)
+    [(0, 1)]
+    >>> cache.lookup("a", allsols=True) is None
+    True
+    >>> cache.store("b", [], complete=True)
+    >>> cache.store("c", [], complete=True)
+    >>> cache.lookup("a", allsols=False) is None
+    True
+    >>> cache.store_count("d", 7)
+    >>> cache.lookup_count("d"), cache.lookup_count("b")
+    (7, 0)
+    """
+
+    def __init__(self, maxsize=4096, path=None, max_solutions=10000):
+        self.maxsize = maxsize
+        self.path = path
+        self.max_solutions = max_solutions
+        self.entries = OrderedDict()
+        self.counts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Devuelve la entrada (complete, solutions) de key, o None
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.path:
+            filename = self.filename(key)
+            if os.path.exists(filename):
+                entry = file_to_object(filename)
+                self.put(key, entry)
+                return entry
+        return None
+
+    def lookup(self, key, allsols=True):
+        """
+        Devuelve las soluciones guardadas para key si alcanzan para
+        responder la consulta (todas, o solo la existencia), si no None
+        """
+        entry = self.get(key)
+        if entry is not None:
+            complete, solutions = entry
+            if not allsols:
+                self.hits += 1
+                return solutions[:1]
+            if complete:
+                self.hits += 1
+                return solutions
+        self.misses += 1
+        return None
+
+    def store(self, key, solutions, complete):
+        """
+        Guarda las soluciones de una consulta. Una respuesta de existencia
+        no pisa a una completa.
+        """
+        if len(solutions) > self.max_solutions:
+            solutions, complete = solutions[:1], False
+        old = self.get(key)
+        if old is not None and old[0] and not complete:
+            return
+        entry = (complete, list(solutions))
+        self.put(key, entry)
+        if self.path:
+            object_to_file(entry, self.filename(key))
+
+    def lookup_count(self, key):
+        """
+        Devuelve la cantidad de soluciones de key si se conoce, si no None
+        """
+        if key not in self.counts and self.path:
+            filename = self.filename(key, ".count")
+            if os.path.exists(filename):
+                self.put_count(key, file_to_object(filename))
+        if key in self.counts:
+            self.hits += 1
+            self.counts.move_to_end(key)
+            return self.counts[key]
+        entry = self.get(key)
+        if entry is not None and entry[0]:
+            self.hits += 1
+            return len(entry[1])
+        self.misses += 1
+        return None
+
+    def store_count(self, key, count):
+        """
+        Guarda la cantidad de soluciones de una consulta
+        """
+        self.put_count(key, count)
+        if self.path:
+            object_to_file(count, self.filename(key, ".count"))
+
+    def put_count(self, key, count):
+        self.counts[key] = count
+        self.counts.move_to_end(key)
+        while len(self.counts) > self.maxsize:
+            self.counts.popitem(last=False)
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def filename(self, key, extension=".morphs"):
+        return os.path.join(self.path, key + extension)
+
+    def clear(self):
+        """
+        Vacia la cache en memoria (no borra los archivos)
+        """
+        self.entries.clear()
+        self.counts.clear()
+
+
+class CachedSolutions(LazySolutions):
+
+    """
+    Soluciones de una consulta que pasan por la cache. Si la cache tiene la
+    respuesta no se usa el resolvedor; si no, las soluciones del resolvedor
+    se guardan en la cache cuando termina (salvo que se hayan recorrido
+    con stream, porque no quedan guardadas).
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> from folpy.utils.minion import MorphismCache, set_morphism_cache
+    >>> set_morphism_cache(MorphismCache())
+    >>> query = lambda: gen_chain(2).homomorphisms_to(rhombus)
+    >>> len(list(query().stream())), len(list(query().stream()))
+    (9, 9)
+    >>> len(list(query())), len(list(query()))
+    (9, 9)
+    >>> set_morphism_cache(MorphismCache())
+    """
+
+    def __init__(self, cache, key, solver=None, solutions=None, allsols=True,
+                 fun=lambda x: x):
+        super(CachedSolutions, self).__init__(allsols, fun=fun)
+        self.cache = cache
+        self.key = key
+        self.solver = solver
+        if solver is None:
+            self.solutions = [{(i,): v for i, v in enumerate(solution)}
+                              for solution in solutions]
+            self.EOF = True
+
+    def next_solution(self):
+        solution = self.solver.next_solution()
+        self.EOF = self.solver.EOF
+        # si se recorrieron con stream no estan todas en self.solutions
+        if self.EOF and not self.streamed:
+            found = self.solutions + ([solution] if solution else [])
+            self.cache.store(self.key,
+                             [tuple(s[(i,)] for i in range(len(s)))
+                              for s in found],
+                             complete=self.allsols)
+        return solution
+
+
+def morphism_key(morph_type, subtype, source, target, inj, surj, without):
+    """
+    Clave de una consulta de morfismos
+
+    >>> from folpy.semantics import Homomorphism
+    >>> from folpy.examples.posets import gen_chain
+    >>> c2 = gen_chain(2)
+    >>> a = morphism_key(Homomorphism, c2.type, c2, c2, None, None, [])
+    >>> a == morphism_key(Homomorphism, c2.type, c2, gen_chain(2), False,
+    ...                   None, [])
+    True
+    >>> a == morphism_key(Homomorphism, c2.type, c2, c2, True, None, [])
+    False
+    """
+    source_tables = indexed_tables(source)
+    target_tables = indexed_tables(target)
+    excluded = sorted(
+        tuple(target_tables.index[morph.dict[(x,)]]
+              if (x,) in morph.dict else -1
+              for x in source_tables.universe)
+        for morph in without)
+    data = (source_tables.fingerprint(),
+            target_tables.fingerprint(),
+            sorted(subtype.operations.items()),
+            sorted(subtype.relations.items()),
+            morph_type.__name__,
+            bool(inj),
+            bool(surj),
+            excluded)
+    return hashlib.sha1(repr(data).encode("utf8")).hexdigest()
+
+
+morphism_cache = MorphismCache()
+
+
+def get_morphism_cache():
+    """
+    Devuelve la cache que usan las consultas de morfismos (o None)
+    """
+    return morphism_cache
+
+
+def set_morphism_cache(cache):
+    """
+    Cambia la cache que usan las consultas de morfismos; None la apaga
+    """
+    global morphism_cache
+    morphism_cache = cache
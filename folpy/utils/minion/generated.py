@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Busqueda de homomorfismos a partir de un conjunto de generadores de source.
+Un homomorfismo de algebras queda determinado por las imagenes de los
+generadores, asi que solo se eligen esas imagenes; el resto del morfismo se
+extiende por clausura y el candidato se descarta apenas hay un conflicto
+con alguna fila de las tablas.
+"""
+
+from itertools import product
+
+from ...semantics import Homomorphism, Embedding, Isomorphism
+from ..methods.subuniverses import generating_set
+from ..tables import indexed_tables
+from .solutions import SearchSolutions, morphism_fun
+
+
+def generation_plan(model, subtype):
+    """
+    Devuelve (generadores, etapas) para generar el modelo por clausura.
+    La etapa 0 cierra las constantes y la etapa i agrega el generador i y
+    cierra. Cada etapa es (pasos, filas): los pasos (op, argumentos,
+    resultado) definen los elementos nuevos de la etapa y las filas son las
+    demas filas de las tablas que quedan adentro de la clausura en esa
+    etapa, que hay que verificar. Todo en indices del universo.
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> generators, stages = generation_plan(rhombus, rhombus.type)
+    >>> generators, [len(steps) for steps, rows in stages]
+    ([1, 2], [0, 0, 2])
+    """
+    tables = indexed_tables(model)
+    key = ("generation_plan", subtype)
+    if key not in tables.cache:
+        n = tables.n
+        operations = [(tables.arity(op), tables.operation(op))
+                      for op in sorted(subtype.operations)]
+        stage_of = [None] * n
+        closure = []
+        generators = []
+        stages = []
+        seeds = [None] + [tables.index[x]
+                          for x in generating_set(model, subtype)]
+        for seed in seeds:
+            if seed is not None:
+                if stage_of[seed] is not None:
+                    continue
+                generators.append(seed)
+                stage_of[seed] = len(stages)
+                closure.append(seed)
+            steps = []
+            rows = []
+            done = set(closure) - {seed}
+            first = True
+            while first or len(done) < len(closure):
+                snapshot = list(closure)
+                for op, (arity, table) in enumerate(operations):
+                    if arity == 0 and not (first and seed is None):
+                        continue
+                    for args in product(snapshot, repeat=arity):
+                        if arity and all(a in done for a in args):
+                            continue
+                        position = 0
+                        for a in args:
+                            position = position * n + a
+                        value = table[position]
+                        if value is None:
+                            continue
+                        if stage_of[value] is None:
+                            stage_of[value] = len(stages)
+                            closure.append(value)
+                            steps.append((op, args, value))
+                        else:
+                            rows.append((op, args, value))
+                done = set(snapshot)
+                first = False
+            stages.append((steps, rows))
+        tables.cache[key] = (generators, stages)
+    return tables.cache[key]
+
+
+class GeneratedMorphSol(SearchSolutions):
+    """
+    Soluciones que son morfismos, buscando solo las imagenes de un conjunto
+    de generadores de source. Tiene la misma interfaz que NativeMorphSol.
+    Las relaciones del subtype (y su reflexion para embeddings) se
+    verifican sobre cada morfismo completo.
+
+    >>> from folpy.examples.lattices import gen_chain, rhombus, M3
+    >>> c2 = gen_chain(2)
+    >>> len(GeneratedMorphSol(Homomorphism, M3.type, M3, M3))
+    11
+    >>> len(GeneratedMorphSol(Homomorphism, c2.type, c2 ** 3, rhombus))
+    25
+    >>> len(GeneratedMorphSol(Isomorphism, rhombus.type, c2 ** 2, rhombus))
+    2
+    """
+
+    def __init__(self,
+                 morph_type,
+                 subtype,
+                 source,
+                 target,
+                 inj=None, surj=None, allsols=True, without=[],
+                 symmetries=None):
+        if morph_type not in (Homomorphism, Embedding, Isomorphism):
+            raise IndexError("Morphism unknown")
+        self.morph_type = morph_type
+        self.subtype = subtype
+        self.source = source
+        self.target = target
+        self.inj = inj
+        self.surj = surj
+        if morph_type in (Embedding, Isomorphism):
+            self.inj = True
+        if morph_type == Isomorphism:
+            self.surj = True
+        A = indexed_tables(source)
+        B = indexed_tables(target)
+        self.generators, self.stages = generation_plan(source, subtype)
+        self.tables = [B.operation(op) for op in sorted(subtype.operations)]
+        self.relations = [(A.relation(rel), B.relation(rel), A.arity(rel))
+                          for rel in subtype.relations]
+        self.without = {tuple(B.index[morph(x)] for x in A.universe)
+                        for morph in without}
+        self.symmetries = symmetries or []
+        self.search = self.assignments()
+        fun = morphism_fun(morph_type, subtype, source, target, self.inj,
+                           self.surj)
+        super(GeneratedMorphSol, self).__init__(allsols, fun=fun)
+
+    def extend(self, stage, h):
+        """
+        Extiende h por los pasos de la etapa y verifica sus filas.
+        Devuelve False si hay un conflicto.
+        """
+        m = len(self.target)
+        steps, rows = self.stages[stage]
+        for op, args, value in steps:
+            position = 0
+            for a in args:
+                position = position * m + h[a]
+            image = self.tables[op][position]
+            if image is None:
+                return False
+            h[value] = image
+        for op, args, value in rows:
+            position = 0
+            for a in args:
+                position = position * m + h[a]
+            if self.tables[op][position] != h[value]:
+                return False
+        if self.inj:
+            values = [v for v in h if v is not None]
+            if len(set(values)) < len(values):
+                return False
+        return True
+
+    def accepts(self, h):
+        """
+        Verificaciones sobre el morfismo completo
+        """
+        if self.surj and len(set(h)) < len(self.target):
+            return False
+        if tuple(h) in self.without:
+            return False
+        for rows_a, rows_b, arity in self.relations:
+            for row in rows_a:
+                if tuple(h[x] for x in row) not in rows_b:
+                    return False
+            if self.morph_type in (Embedding, Isomorphism):
+                for row in product(range(len(h)), repeat=arity):
+                    if row not in rows_a and \
+                            tuple(h[x] for x in row) in rows_b:
+                        return False
+        for p in self.symmetries:
+            if tuple(p[v] for v in h) < tuple(h):
+                return False
+        return True
+
+    def assignments(self):
+        """
+        Generador de las soluciones como listas de valores, recorriendo las
+        imagenes de los generadores en orden lexicografico
+        """
+        h = [None] * len(self.source)
+        if not self.extend(0, h):
+            return
+        stack = [(h, 1)]
+        while stack:
+            h, stage = stack.pop()
+            if self.limits is not None and not self.limits.step():
+                return
+            if stage > len(self.generators):
+                if self.accepts(h):
+                    yield h
+                continue
+            generator = self.generators[stage - 1]
+            used = set(h) if self.inj else ()
+            children = []
+            for value in range(len(self.target)):
+                if value in used:
+                    continue
+                new = list(h)
+                new[generator] = value
+                if self.extend(stage, new):
+                    children.append((new, stage + 1))
+            stack += reversed(children)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
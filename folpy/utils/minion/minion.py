@@ -7,405 +7,442 @@
 import codecs
 import os
 import pickle
-import subprocess as sp
-import select 
 from itertools import product
 from collections import defaultdict
+from queue import Queue
 
-from ...semantics import Homomorphism, Embedding, Isomorphism
-from .. import misc
-
-# --- parche multiplataforma para poll ---
-try:
-    from select import poll, POLLIN
-except ImportError:
-    # Fallback para Windows
-    class FakePoll:
-        def __init__(self):
-            self.fds = {}
-
-        def register(self, fd, eventmask=None):
-            self.fds[fd] = True
-
-        def unregister(self, fd):
-            if fd in self.fds:
-                del self.fds[fd]
-
-        def poll(self, timeout=None):
-            rlist, _, _ = select.select(
-                list(self.fds.keys()), [], [],
-                None if timeout is None else timeout/1000.0
-            )
-            return [(fd, POLLIN) for fd in rlist]
-
-    poll = FakePoll
-    POLLIN = 1
-# --- fin del parche ---
-
-class MinionSol(object):
-    count = 0
+import numpy as np
 
-    def __init__(self, input_data, allsols=True, fun=lambda x: x):
+from ...semantics import Homomorphism, Embedding, Isomorphism
+from ..certificates import canonical_isomorphism
+from ..invariants import invariants
+from ..tables import indexed_tables
+from .batch import first_morphism
+from .cache import CachedSolutions, get_morphism_cache, morphism_key
+from .generated import GeneratedMorphSol, generation_plan
+from .native import NativeMorphSol
+# se reexportan para los modelos
+from .polymorphisms import (PolymorphismSol, polymorphisms,  # noqa: F401
+                            has_polymorphism)
+from .pool import MinionProcess, default_pool
+from .products import ProductMorphSol, product_factors
+from .solutions import LazySolutions, morphism_fun
+
+
+class MinionSol(LazySolutions):
+
+    def __init__(self, input_data, allsols=True, fun=lambda x: x, pool=None,
+                 notify=None, buffer=0):
         """
         Toma el input para minion, si espera todas las soluciones y una
         funcion para aplicar a las listas que van a ir siendo soluciones.
+        Sin pool, el problema se corre en su propio Minion; con pool, se
+        encola ahi, y buffer acota las lineas de Minion que esperan ser
+        leidas.
         """
-        self.id = MinionSol.count
-        MinionSol.count += 1
-
-        self.fun = fun
-        self.allsols = allsols
-        self.minion_path = get_path() + "/"
-
-        self.input_filename = self.minion_path + "input_minion%s" % self.id
-        create_pipe(self.input_filename)
-
-        minionargs = ["-printsolsonly", "-randomseed", "0"]
-        if allsols:
-            minionargs += ["-findallsols"]
-        minionargs += [self.input_filename]
-
-        self.minionapp = sp.Popen([self.minion_path + "minion"] + minionargs,
-                                  stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.PIPE)
-        write(self.input_filename, input_data)
-        self.EOF = False
-        self.solutions = []
+        super(MinionSol, self).__init__(allsols, fun=fun)
+        if pool is None:
+            self.job = MinionProcess(input_data, allsols)
+        else:
+            self.job = pool.submit(input_data, allsols, notify,
+                                   buffer=buffer)
 
-    def __parse_solution(self):
+    def next_solution(self):
         """
         Bloquea hasta conseguir una solucion, o el EOF
         La parsea y devuelve una lista
         """
-        str_sol = self.minionapp.stdout.readline().decode('utf-8')
+        str_sol = self.job.get()
+        if isinstance(str_sol, Exception):
+            self.EOF = True
+            raise str_sol
         if str_sol:
-            str_sol = str_sol[:-1]  # borro el \n
             try:
-                result = list(map(int, str_sol.strip().split(" ")))
-                for i, v in enumerate(result):
-                    if v == -1:
-                        result[i] = None
-                result = {(i,): v for i, v in enumerate(result)}
-                # ACA IRIAN LAS TRADUCCIONES DE NOMBRES EN EL FUTURO
+                result = parse_solution(str_sol)
             except ValueError:
-                str_sol += "\n"
                 # leo toda la respuesta de minion para saber que paso
-                str_sol += self.minionapp.stdout.read().decode('utf-8')
+                self.EOF = True
+                rest = self.job.get()
+                while isinstance(rest, str):
+                    str_sol += rest
+                    rest = self.job.get()
+                self.job.cancel()
                 raise ValueError("Minion Error:\n%s" % str_sol)
             if not self.allsols:
                 self.EOF = True
-                self.__terminate()
             return result
         else:
-            str_err = self.minionapp.stderr.read().decode('utf-8')
-            if str_err:
-                raise ValueError("Minion Error:\n%s" % str_err)
             self.EOF = True
-            self.__terminate()
 
-    def __iter__(self):
-        for solution in self.solutions:
-            yield self.fun(solution)
-
-        while not self.EOF:
-            solution = self.__parse_solution()
-            if solution:
-                self.solutions.append(solution)
-                yield self.fun(solution)
-
-    def __getitem__(self, index):
-        try:
-            return self.fun(self.solutions[index])
-        except IndexError:
-            for i, solution in enumerate(self):
-                if i == index:
-                    # no hace falta aplicar self.fun porque esta llamando a
-                    # __iter__
-                    return solution
-            raise IndexError("There aren't so many solutions.")
-
-    def __bool__(self):
-        if self.solutions or self.EOF:
-            return bool(self.solutions)
-        else:
-            solution = self.__parse_solution()
-            if solution:
-                self.solutions.append(solution)
-                return True
-            else:
-                return False
-
-    def __len__(self):
-        if not self.EOF:
-            for i in self:
-                pass
-        return len(self.solutions)
-
-    def __terminate(self):
+    def next_batch(self, size):
         """
-        Mata a Minion
+        Toma de una vez las lineas que ya imprimio Minion (hasta size) y
+        las parsea juntas con numpy. Devuelve un array con una solucion por
+        fila.
         """
-        if hasattr(self, 'minionapp'):
-            self.minionapp.stdout.close()
-            self.minionapp.stdin.close()
-            self.minionapp.stderr.close()
-            self.minionapp.kill()
-
-            del self.minionapp
-        remove(self.input_filename)
+        if self.EOF:
+            return []
+        items = self.job.get_many(size)
+        if not isinstance(items[-1], str):
+            self.EOF = True
+            if isinstance(items[-1], Exception):
+                raise items.pop()
+            items.pop()
+        if not self.allsols:
+            self.EOF = True
+            items = items[:1]
+        if not items:
+            return []
+        try:
+            values = np.array(" ".join(items).split(), dtype=np.int64)
+            return values.reshape(len(items), -1)
+        except ValueError:
+            # leo toda la respuesta de minion para saber que paso
+            self.EOF = True
+            output = "".join(items)
+            rest = self.job.get()
+            while isinstance(rest, str):
+                output += rest
+                rest = self.job.get()
+            self.job.cancel()
+            raise ValueError("Minion Error:\n%s" % output)
 
     def __del__(self):
         """
-        Si no lo habia matado, mata a Minion.
+        Si no habia terminado, cancela el problema.
         """
-        if not self.EOF:
-            self.__terminate()
+        if not self.EOF and hasattr(self, "job"):
+            self.job.cancel()
 
 
-class MorphMinionSol(MinionSol):
+class MorphismModel(object):
     """
-    Soluciones de Minion que son morfismos
-    Necesita que las estructuras sean de universos del tipo 0...n
+    Modelo de Minion para buscar morfismos de source en target.
+    Trabaja sobre los indices de los universos (IndexedTables), asi que no
+    necesita que las estructuras sean de universos del tipo 0...n
+    Con tag, los nombres de las variables y tablas llevan el tag, asi que
+    los bloques de modelos con tags distintos se pueden juntar en un mismo
+    input (ver folpy.utils.minion.batch).
     """
 
-    def __init__(self,
-                 morph_type,
-                 subtype,
-                 source,
-                 target,
-                 inj=None, surj=None, allsols=True, without=[]):
+    def __init__(self, morph_type, subtype, source, target, inj=None,
+                 surj=None, tag=""):
         self.morph_type = morph_type
         self.subtype = subtype
-        self.source, self.source_renames = source.continous()
-        self.target, self.target_renames = target.continous()
+        self.source = indexed_tables(source)
+        self.target = indexed_tables(target)
         self.inj = inj
         self.surj = surj
-        self.EOF = False
-        if self.morph_type == Homomorphism:
-            input_data = self.__input_homo(without)
-        elif self.morph_type == Embedding:
+        self.tag = tag
+        self.f = tag + "f"
+        self.g = tag + "g"
+        if self.morph_type == Embedding:
             self.inj = True
-            input_data = self.__input_embedd(without)
         elif self.morph_type == Isomorphism:
             self.inj = True
             self.surj = True
-            input_data = self.__input_embedd(without)
-        else:
+        elif self.morph_type != Homomorphism:
             raise IndexError("Morphism unknown")
+        # funcion que tipa los morfismos
+        self.fun = morphism_fun(morph_type, subtype, source, target,
+                                self.inj, self.surj)
 
-        self.fun = lambda x: self.morph_type(
-            {(self.source_renames[k[0]],): self.target_renames[v]
-                for k, v in x.items()},
-            source,
-            target,
-            self.subtype,
-            antitype=[],
-            inj=self.inj,
-            surj=self.surj
-                                            )  # funcion que tipa los morfismos
-        super(MorphMinionSol, self).__init__(input_data, allsols, fun=self.fun)
-
-    def __minion_name(self, oprel):
-        """
-        Traduce los nombres de las operaciones/relaciones
-        """
-        # Minion accepts only letters for first character of names
-        if oprel.isalpha():
-            return oprel
-
-        ops = {"^": "m", "+": "p", "-": "s", "*": "t", "<=": "leq"}
-        if oprel in ops:
-            return ops[oprel]
-        else:
-            # le agrego espacios para evitar los = que mete b64
-            oprel += " " * ((3 - len(oprel)) % 3)
-
-            return codecs.encode(bytearray(oprel, "ascii"),
-                                 "base64").decode("ascii")[:-1]
-
-    def __oprel_table(self, symbol, oprel, prefix=""):
-        """
-        Devuelve un string con la tabla que representa a la relacion/operacion
-        en minion
-        """
-        table = oprel.table()
-        table_name = prefix + self.__minion_name(symbol)
-        height = len(table)
-        width = oprel.arity()
-        if not oprel.relation:
-            width += 1
-        result = ""
-        for row in table:
-            result += " ".join(map(str, row)) + "\n"
-        result = "%s %s %s\n" % (table_name, height, width) + result
+    def input_data(self, without=[], symmetries=[]):
+        """
+        Devuelve los pedazos del input de Minion. Si se dan symmetries
+        (generadores de automorfismos de target, como permutaciones de
+        indices) se agregan restricciones lex-leader: f <= p(f) para cada p.
+        Un target rigido no tiene generadores: symmetries vacio o None.
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> c3 = gen_chain(3)
+        >>> model = MorphismModel(Homomorphism, c3.type, c3, c3)
+        >>> model.input_data(symmetries=None) == model.input_data()
+        True
+        >>> any("lexleq" in line for line in model.input_data(
+        ...     symmetries=[(2, 1, 0)]))
+        True
+        """
+        variables, tuplelist, constraints = self.blocks(without, symmetries)
+        result = ["MINION 3\n\n", "**VARIABLES**\n"]
+        result += variables
+        result += ["**SEARCH**\n",
+                   "PRINT [%s]\n\n" % self.f,  # para que no me imprima g
+                   "**TUPLELIST**\n"]
+        result += tuplelist
+        result.append("**CONSTRAINTS**\n")
+        result += constraints
+        result.append("**EOF**\n")
         return result
 
-    def __input_homo(self, without=[]):
+    def blocks(self, without=[], symmetries=[]):
         """
-        Genera un string para darle a Minion para tener los homomorfismos de
-        source en target quitando los que aparecen en without.
+        Devuelve los pedazos del input separados por seccion: (variables,
+        tablas, restricciones). Los bloques que dependen de un solo modelo
+        vienen del cache.
         """
-        A = self.source
-        B = self.target
-
-        result = "MINION 3\n\n"
-        result += "# Busca homomorfismos de \n"
-        result += misc.comment(str(A))
-        result += "# en\n"
-        result += misc.comment(str(B))
-        if self.inj:
-            result += "# que sean inyectivos\n"
-        if self.surj:
-            result += "# que sean suryectivos\n"
-        result += "\n"
-        result += "**VARIABLES**\n"
-        result += "DISCRETE f[%s]{0..%s}\n\n" % (A.cardinality, B.cardinality-1)
-        result += "**TUPLELIST**\n"
-        for op in self.subtype.operations:
-            result += self.__oprel_table(op, B.operations[op]) + "\n"
-        for rel in self.subtype.relations:
-            result += self.__oprel_table(rel, B.relations[rel]) + "\n"
-
+        if self.morph_type == Homomorphism:
+            variables, tuplelist, constraints = self.__blocks_homo()
+        else:
+            variables, tuplelist, constraints = self.__blocks_embedd()
+        sym_variables, sym_tuplelist, sym_constraints = \
+            self.__symmetry_blocks(symmetries)
+        variables += sym_variables
+        tuplelist += sym_tuplelist
+        constraints += sym_constraints
         if without:
-            result += self.morphisms_to_minion_table(without) + "\n"
+            tuplelist.append(self.morphisms_to_minion_table(without))
+            constraints.append("negativetable(%s,%swithout)\n" %
+                               (self.f, self.tag))
+        return variables, tuplelist, constraints
 
-        result += "**CONSTRAINTS**\n"
+    def __symmetry_blocks(self, symmetries):
+        """
+        Variables, tablas y restricciones lex-leader: s<k> es la imagen de f
+        por la permutacion k y se pide lexleq(f, s<k>)
+        """
+        variables = []
+        tuplelist = []
+        constraints = []
+        for k, p in enumerate(symmetries or []):
+            s = "%ss%s" % (self.tag, k)
+            table = "%ssym%s" % (self.tag, k)
+            variables.append("DISCRETE %s[%s]{0..%s}\n" %
+                             (s, self.source.n, self.target.n - 1))
+            tuplelist.append(minion_table(table, list(enumerate(p)), 2))
+            for i in range(self.source.n):
+                constraints.append("table([%s[%s],%s[%s]],%s)\n" %
+                                   (self.f, i, s, i, table))
+            constraints.append("lexleq(%s,%s)\n" % (self.f, s))
+        if variables:
+            variables.append("\n")
+        return variables, tuplelist, constraints
+
+    def __tuplelist(self, tables, prefix="", operations=True):
+        """
+        Bloque de TUPLELIST con las tablas del subtype en el modelo de
+        tables. Se calcula una vez por (modelo, subtype, prefijo).
+        """
+        key = ("tuplelist", self.subtype, prefix, operations)
+        if key not in tables.cache:
+            result = []
+            if operations:
+                for op in self.subtype.operations:
+                    result.append(minion_table(prefix + minion_name(op),
+                                               tables.graph(op),
+                                               tables.arity(op) + 1))
+            for rel in self.subtype.relations:
+                result.append(minion_table(prefix + minion_name(rel),
+                                           sorted(tables.relation(rel)),
+                                           tables.arity(rel)))
+            tables.cache[key] = "".join(result)
+        return tables.cache[key]
+
+    def __table_constraints(self, tables, prefix=""):
+        """
+        Restricciones que piden que f preserve las operaciones y relaciones
+        del subtype del modelo de tables. Se calcula una vez por (modelo,
+        subtype, prefijo, variable).
+        """
+        key = ("constraints", self.subtype, prefix, self.f)
+        if key not in tables.cache:
+            result = []
+            separator = "],%s[" % self.f
+            for op in self.subtype.operations:
+                name = prefix + minion_name(op)
+                for row in tables.graph(op):
+                    result.append("table([%s[%s]],%s)\n" %
+                                  (self.f, separator.join(map(str, row)),
+                                   name))
+            for rel in self.subtype.relations:
+                name = prefix + minion_name(rel)
+                for row in sorted(tables.relation(rel)):
+                    result.append("table([%s[%s]],%s)\n" %
+                                  (self.f, separator.join(map(str, row)),
+                                   name))
+            tables.cache[key] = "".join(result)
+        return tables.cache[key]
+
+    def __reflection_constraints(self, tables):
+        """
+        Restricciones que piden que la inversa g refleje las relaciones del
+        subtype del modelo de tables. Se calcula una vez por (modelo,
+        subtype, tag).
+        """
+        key = ("reflection", self.subtype, self.tag)
+        if key not in tables.cache:
+            result = []
+            g = self.g
+            for rel in self.subtype.relations:
+                name = self.tag + "a" + minion_name(rel)
+                for row in sorted(tables.relation(rel)):
+                    result.append(
+                        "watched-or({%stable([%s[%s]],%s)})\n" %
+                        ("".join("element(%s, %s, -1)," % (g, i)
+                                 for i in row),
+                         g, ("],%s[" % g).join(map(str, row)), name))
+            tables.cache[key] = "".join(result)
+        return tables.cache[key]
+
+    def __injective_surjective(self):
+        """
+        Restricciones de inyectividad y suryectividad
+        """
+        result = []
         if self.inj:
             # exige que todos los valores de f
-            result += "alldiff([f[%s]])\n" % "],f[".join(map(str, A.universe))
             # sean distintos para el univ de partida
+            result.append("alldiff([%s[%s]])\n" %
+                          (self.f, ("],%s[" % self.f).join(
+                              map(str, range(self.source.n)))))
         if self.surj:
-            for i in B.universe:
+            for i in range(self.target.n):
                 # exige que i aparezca al menos una vez en el "vector" f
-                result += "occurrencegeq(f, " + str(i) + ", 1)\n"
-
-        for op in self.subtype.operations:
-            cons = A.operations[op].table()
-            for row in cons:
-                result += "table([f[" + "],f[".join(map(str, row)
-                                                    ) + "]],%s)\
-                                                \n" % self.__minion_name(op)
-            result += "\n"
-
-        for rel in self.subtype.relations:
-            cons = A.relations[rel].table()
-            for row in cons:
-                result += "table([f[" + "],f[".join(map(str, row)
-                                                    ) + "]],%s)\
-                                                \n" % self.__minion_name(rel)
-            result += "\n"
-
-        if without:
-            result += "negativetable(f,without)\n"
-
-        result += "**EOF**\n"
+                result.append("occurrencegeq(%s, %s, 1)\n" % (self.f, i))
         return result
 
-    def __input_embedd(self, without=[]):
+    def __blocks_homo(self):
         """
-        Genera un string para darle a Minion para tener los embeddings de A en B
+        Pedazos para tener los homomorfismos de source en target
         """
         A = self.source
         B = self.target
+        variables = ["DISCRETE %s[%s]{0..%s}\n\n" % (self.f, A.n, B.n - 1)]
+        tuplelist = [self.__tuplelist(B, prefix=self.tag)]
+        constraints = self.__injective_surjective()
+        constraints.append(self.__table_constraints(A, prefix=self.tag))
+        return variables, tuplelist, constraints
 
-        result = "MINION 3\n\n"
-        result += "# Busca embeddings de a en b\n"
-        if self.inj:
-            result += "# que sean inyectivos\n"
-        if self.surj:
-            result += "# que sean suryectivos\n"
-        result += "\n"
-        result += "**VARIABLES**\n"
-        result += "DISCRETE f[%s]{0..%s}\n\n" % (A.cardinality,
-                                                 B.cardinality-1)
-        result += "DISCRETE g[%s]{-1..%s}\n\n" % (B.cardinality,
-                                                  A.cardinality-1)
-        result += "**SEARCH**\n"
-        result += "PRINT [f]\n\n"  # para que no me imprima los valores de g
-        result += "**TUPLELIST**\n"
-
-        for op in self.subtype.operations:
-            result += self.__oprel_table(op,
-                                         B.operations[op], prefix="b") + "\n"
-        for rel in self.subtype.relations:
-            result += self.__oprel_table(rel,
-                                         B.relations[rel], prefix="b") + "\n"
-        for rel in self.subtype.relations:
-            result += self.__oprel_table(rel,
-                                         A.relations[rel], prefix="a") + "\n"
-        if without:
-            result += self.morphisms_to_minion_table(without) + "\n"
-        result += "**CONSTRAINTS**\n"
-        if self.inj:
-            # exige que todos los valores de f
-            result += "alldiff([f[%s]])\n" % "],f[".join(map(str, A.universe))
-            # sean distintos para el univ de partida
-        if self.surj:
-            for i in B.universe:
-                # exige que i aparezca al menos una vez en el "vector" f
-                result += "occurrencegeq(f, " + str(i) + ", 1)\n"
-
-        for op in self.subtype.operations:
-            cons = A.operations[op].table()
-            for row in cons:
-                result += "table([f[" + "],f[".join(map(str, row)
-                                                    ) + "]],%s)\
-                                        \n" % ("b" + self.__minion_name(op))
-            result += "\n"
-        for rel in self.subtype.relations:
-            cons = A.relations[rel].table()
-            for row in cons:
-                result += "table([f[" + "],f[".join(map(str, row)
-                                                    ) + "]],%s)\
-                                        \n" % ("b" + self.__minion_name(rel))
-            result += "\n"
-        for rel in self.subtype.relations:
-            cons = B.relations[rel].table()
-            for row in cons:
-                result += "watched-or({"
-                for i in row:
-                    result += "element(g, %s, -1)," % i
-                result += "table([g[" + "],g[".join(map(str, row))
-                result += "]],%s)})\n" % ("a" + self.__minion_name(rel))
-            result += "\n"
-        for i in A.universe:
-            result += "element(g, f[%s], %s)\n" % (i, i)  # g(f(x))=X
+    def __blocks_embedd(self):
+        """
+        Pedazos para tener los embeddings de A en B
+        """
+        A = self.source
+        B = self.target
+        f = self.f
+        g = self.g
+        variables = ["DISCRETE %s[%s]{0..%s}\n\n" % (f, A.n, B.n - 1),
+                     "DISCRETE %s[%s]{-1..%s}\n\n" % (g, B.n, A.n - 1)]
+        tuplelist = [self.__tuplelist(B, prefix=self.tag + "b"),
+                     self.__tuplelist(A, prefix=self.tag + "a",
+                                      operations=False)]
+        constraints = self.__injective_surjective()
+        constraints.append(self.__table_constraints(A,
+                                                    prefix=self.tag + "b"))
+        constraints.append(self.__reflection_constraints(B))
+        for i in range(A.n):
+            # g(f(x))=X
+            constraints.append("element(%s, %s[%s], %s)\n" % (g, f, i, i))
 
         # cant de valores en el rango no en dominio
-        result += "occurrencegeq(g, -1, %s)\n" % (max(B.universe) +
-                                                  1 - A.cardinality)
-        if without:
-            result += "negativetable(f,without)\n"
-        result += "**EOF**\n"
-        return result
+        constraints.append("occurrencegeq(%s, -1, %s)\n" % (g, B.n - A.n))
+        return variables, tuplelist, constraints
 
     def morphisms_to_minion_table(self, morphs):
         """
         Convierte una lista de morfismos en una tabla que entiende minion
         """
         table = [self.morphism_to_minion_format(morph) for morph in morphs]
-        table_name = "without"
-        height = len(table)
-        width = len(table[0])
-        result = ""
-        for row in table:
-            result += " ".join(map(str, row)) + "\n"
-        result = "%s %s %s\n" % (table_name, height, width) + result
-        return result
+        return minion_table(self.tag + "without", table, self.source.n)
 
     def morphism_to_minion_format(self, morph):
         """
         Genera la entrada de minion para un morfismo.
         """
-        result = [-1] * (max([x[0] for x in list(morph.dict.keys())]) + 1)
-        for i in list(morph.dict.keys()):
-            result[i[0]] = morph.dict[i]
+        result = [-1] * self.source.n
+        for k, v in morph.dict.items():
+            result[self.source.index[k[0]]] = self.target.index[v]
         return result
 
 
+class MorphMinionSol(MinionSol):
+    """
+    Soluciones de Minion que son morfismos
+    """
+
+    def __init__(self,
+                 morph_type,
+                 subtype,
+                 source,
+                 target,
+                 inj=None, surj=None, allsols=True, without=[], pool=None,
+                 notify=None, buffer=0, symmetries=[]):
+        self.EOF = False
+        self.model = MorphismModel(morph_type, subtype, source, target, inj,
+                                   surj)
+        self.morph_type = morph_type
+        self.subtype = subtype
+        self.inj = self.model.inj
+        self.surj = self.model.surj
+        self.fun = self.model.fun
+        super(MorphMinionSol, self).__init__(self.model.input_data(without,
+                                                                   symmetries),
+                                             allsols, fun=self.fun,
+                                             pool=pool, notify=notify,
+                                             buffer=buffer)
+
+
+def parse_solution(line):
+    """
+    Convierte una linea de solucion de Minion en un diccionario {(i,): v};
+    los -1 se vuelven None
+
+    >>> parse_solution("0 2 -1\\n")
+    {(0,): 0, (1,): 2, (2,): None}
+    """
+    values = map(int, line.strip().split(" "))
+    # ACA IRIAN LAS TRADUCCIONES DE NOMBRES EN EL FUTURO
+    return {(i,): (None if v == -1 else v) for i, v in enumerate(values)}
+
+
+def minion_name(oprel):
+    """
+    Traduce los nombres de las operaciones/relaciones
+
+    >>> minion_name("<=")
+    'leq'
+    >>> minion_name("f")
+    'f'
+    """
+    # Minion accepts only letters for first character of names
+    if oprel.isalpha():
+        return oprel
+
+    ops = {"^": "m", "+": "p", "-": "s", "*": "t", "<=": "leq"}
+    if oprel in ops:
+        return ops[oprel]
+    else:
+        # le agrego espacios para evitar los = que mete b64
+        oprel += " " * ((3 - len(oprel)) % 3)
+
+        return codecs.encode(bytearray(oprel, "ascii"),
+                             "base64").decode("ascii")[:-1]
+
+
+def minion_table(name, rows, width):
+    """
+    Devuelve un string con una tabla de TUPLELIST para Minion
+
+    >>> print(minion_table("leq", [(0, 0), (0, 1), (1, 1)], 2))
+    leq 3 2
+    0 0
+    0 1
+    1 1
+    <BLANKLINE>
+    <BLANKLINE>
+    """
+    lines = ["%s %s %s\n" % (name, len(rows), width)]
+    lines += [" ".join(map(str, row)) + "\n" for row in rows]
+    lines.append("\n")
+    return "".join(lines)
+
+
 class ParallelMorphMinionSol(object):
 
     """
     Maneja varias consultas del mismo tipo a Minion que corren en paralelo.
+    Las consultas se encolan en el pool (a lo sumo cores a la vez) y los
+    workers avisan en una cola comun cada vez que alguna tiene algo nuevo.
     """
 
     def __init__(self,
@@ -417,7 +454,8 @@ class ParallelMorphMinionSol(object):
                  surj=None,
                  allsols=False,
                  cores=100,
-                 without={}):
+                 without={},
+                 pool=None):
 
         self.targets = list(targets)
         self.morph_type = morph_type
@@ -432,8 +470,9 @@ class ParallelMorphMinionSol(object):
         self.solution = None
         self.without = defaultdict(list, without)
         self.queue = list(product(self.sources, self.targets))
+        self.pool = pool if pool is not None else default_pool()
 
-        self.poll = poll()
+        self.notify = Queue()
         self.minions = {}
         self.iterators = {}
 
@@ -442,7 +481,7 @@ class ParallelMorphMinionSol(object):
 
     def next_to_running(self):
         """
-        Pone a la siguiente instancia de Minion a andar
+        Encola en el pool la siguiente consulta a Minion
         """
         if self.queue:
             source, target = self.queue.pop()
@@ -451,25 +490,25 @@ class ParallelMorphMinionSol(object):
                                         source,
                                         target,
                                         inj=self.inj,
-                                        surj=self.inj,
+                                        surj=self.surj,
                                         allsols=self.allsols,
-                                        without=self.without[(source, target)])
-            fd = new_minion.minionapp.stdout.fileno()
-            self.minions[fd] = new_minion
-            self.iterators[fd] = iter(new_minion)
-            self.poll.register(fd, POLLIN)
+                                        without=self.without[(source, target)],
+                                        pool=self.pool,
+                                        notify=self.notify)
+            self.minions[new_minion.job] = new_minion
+            self.iterators[new_minion.job] = iter(new_minion)
 
-    def read(self, fd):
+    def read(self, job):
         """
-        Lee un file descriptor y lo vuelve a poner en el poll
+        Lee la primera respuesta de una consulta y la saca de las que
+        estan corriendo
         """
-        if self.minions[fd]:
-            result = self.minions[fd][0]
+        if self.minions[job]:
+            result = self.minions[job][0]
         else:
             result = False
-        del self.minions[fd]
-        del self.iterators[fd]
-        self.poll.unregister(fd)
+        del self.minions[job]
+        del self.iterators[job]
         return result
 
     def solve(self):
@@ -478,17 +517,20 @@ class ParallelMorphMinionSol(object):
         """
         if self.solution is None:
             while self.queue or self.minions:
-                for (fd, event) in self.poll.poll():
-                    result = self.read(fd)
-                    if result:
-                        self.solution = result
-                        if not self.allsols:
-                            for f in list(self.minions.keys()):
-                                self.minions[f].__del__()
-                        return self.solution
-                    else:
-                        if self.queue:
-                            self.next_to_running()
+                job = self.notify.get()
+                if job not in self.minions:
+                    # aviso de una consulta que ya se leyo
+                    continue
+                result = self.read(job)
+                if result:
+                    self.solution = result
+                    if not self.allsols:
+                        for minion in list(self.minions.values()):
+                            minion.__del__()
+                    return self.solution
+                else:
+                    if self.queue:
+                        self.next_to_running()
             self.solution = False
             return False
         else:
@@ -496,19 +538,300 @@ class ParallelMorphMinionSol(object):
 
     def __iter__(self):
         while self.queue or self.minions:
-            for (fd, event) in self.poll.poll():
-                try:
-                    result = next(self.iterators[fd])
-                    assert not self.minions[fd].EOF
-                    self.poll.register(fd, POLLIN)
-                    yield result
-                except StopIteration:
-                    assert self.minions[fd].EOF
-                    self.poll.unregister(fd)
-                    self.minions[fd].__del__()
-                    del self.minions[fd]
-                    if self.queue:
-                        self.next_to_running()
+            job = self.notify.get()
+            if job not in self.minions:
+                continue
+            try:
+                yield next(self.iterators[job])
+            except StopIteration:
+                assert self.minions[job].EOF
+                del self.minions[job]
+                del self.iterators[job]
+                if self.queue:
+                    self.next_to_running()
+
+
+# los problemas con |source| * |target| hasta este valor se resuelven con el
+# resolvedor en Python, donde levantar Minion cuesta mas que resolverlos
+NATIVE_LIMIT = 400
+
+# en esos problemas grandes, si source tiene operaciones y a lo sumo esta
+# cantidad de candidatos (|target| a la cantidad de generadores de source)
+# se buscan solo las imagenes de los generadores
+GENERATED_LIMIT = 100000
+
+
+def minion_available():
+    """
+    Decide si esta el ejecutable de Minion
+    """
+    return os.access(get_path() + "/minion", os.X_OK)
+
+
+def morph_solver(source, target, backend=None, subtype=None):
+    """
+    Devuelve la clase que resuelve la consulta de morfismos. Sin backend
+    elige: si target es un producto, factor por factor; si no, por tamaño
+    del problema: los problemas chicos en Python; en los grandes, si se da
+    el subtype y tiene operaciones, la busqueda por generadores cuando hay
+    pocos candidatos, y si no Minion (si esta instalado).
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> morph_solver(gen_chain(2), gen_chain(3)).__name__
+    'NativeMorphSol'
+    >>> morph_solver(gen_chain(2), gen_chain(3), "minion").__name__
+    'MorphMinionSol'
+    >>> c2 = gen_chain(2)
+    >>> morph_solver(c2 ** 7, gen_chain(4), subtype=c2.type).__name__
+    'GeneratedMorphSol'
+    >>> morph_solver(gen_chain(3), c2 ** 3).__name__
+    'ProductMorphSol'
+    """
+    if backend is None:
+        if product_factors(target) is not None:
+            backend = "product"
+        elif len(source) * len(target) <= NATIVE_LIMIT:
+            backend = "native"
+        elif (subtype is not None and subtype.operations and
+                len(target) ** len(generation_plan(source, subtype)[0]) <=
+                GENERATED_LIMIT):
+            backend = "generators"
+        elif minion_available():
+            backend = "minion"
+        else:
+            backend = "native"
+    return BACKENDS[backend]
+
+
+def solve_morphisms(morph_type, subtype, source, target, inj, surj, allsols,
+                    without, backend=None):
+    """
+    Resuelve una consulta de morfismos con el resolvedor que corresponda,
+    pasando por la cache de consultas si esta prendida
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> from folpy.utils.minion.cache import MorphismCache, set_morphism_cache
+    >>> old = get_morphism_cache()
+    >>> cache = MorphismCache()
+    >>> set_morphism_cache(cache)
+    >>> c2 = gen_chain(2)
+    >>> len(solve_morphisms(Homomorphism, c2.type, c2, c2, None, None, True,
+    ...                     []))
+    3
+    >>> len(solve_morphisms(Homomorphism, c2.type, c2, c2, None, None, True,
+    ...                     []))
+    3
+    >>> bool(solve_morphisms(Homomorphism, c2.type, c2, c2, None, True,
+    ...                      False, []))
+    True
+    >>> (cache.hits, cache.misses)
+    (1, 2)
+    >>> set_morphism_cache(old)
+    """
+    solver = morph_solver(source, target, backend, subtype)
+    cache = get_morphism_cache()
+    if cache is None:
+        return solver(morph_type, subtype, source, target, inj, surj,
+                      allsols, without)
+    if morph_type in (Embedding, Isomorphism):
+        inj = True
+    if morph_type == Isomorphism:
+        surj = True
+    key = morphism_key(morph_type, subtype, source, target, inj, surj,
+                       without)
+    solutions = cache.lookup(key, allsols)
+    if solutions is not None:
+        return CachedSolutions(cache, key, solutions=solutions,
+                               allsols=allsols,
+                               fun=morphism_fun(morph_type, subtype, source,
+                                                target, inj, surj))
+    solver = solver(morph_type, subtype, source, target, inj, surj, allsols,
+                    without)
+    return CachedSolutions(cache, key, solver=solver, allsols=allsols,
+                           fun=solver.fun)
+
+
+def discarded(morph_type, subtype, source, target, inj=None, surj=None):
+    """
+    Decide si la consulta no tiene soluciones sin resolverla, por
+    cardinalidad o porque los invariantes no lo permiten
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> discarded(Isomorphism, rhombus.type, gen_chain(4), rhombus)
+    True
+    >>> discarded(Homomorphism, rhombus.type, gen_chain(4), rhombus)
+    False
+    """
+    if morph_type == Isomorphism:
+        # evidentemente no son isomorfos
+        return (len(source) != len(target) or
+                invariants(source, subtype) != invariants(target, subtype))
+    if inj and len(source) > len(target):
+        # evidentemente no hay homos inyectivos
+        return True
+    if surj and len(source) < len(target):
+        # evidentemente no hay homos sobreyectivos
+        return True
+    # los invariantes no lo permiten
+    return not invariants(source, subtype).may_map_to(
+        invariants(target, subtype), inj=inj, surj=surj)
+
+
+def minion_count(input_data, pool=None):
+    """
+    Cuenta las soluciones de un input de Minion sin que las imprima
+    """
+    if pool is None:
+        job = MinionProcess(input_data, count=True)
+    else:
+        job = pool.submit(input_data, count=True)
+    found = None
+    output = ""
+    line = job.get()
+    while line is not None:
+        if isinstance(line, Exception):
+            raise line
+        output += line
+        if line.startswith("Solutions Found:"):
+            found = int(line.split(":")[1])
+        line = job.get()
+    if found is None:
+        raise ValueError("Minion Error:\n%s" % output)
+    return found
+
+
+def count_morphisms(morph_type, subtype, source, target, inj=None,
+                    surj=None, without=[], backend=None):
+    """
+    Cuenta los morfismos de source en target sin construirlos: Minion
+    corre en modo de conteo y el resolvedor en Python cuenta sin generar
+    las soluciones. Usa la cache de consultas si esta prendida.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> count_morphisms(Homomorphism, rhombus.type, rhombus, rhombus)
+    36
+    >>> count_morphisms(Embedding, rhombus.type, gen_chain(2), rhombus)
+    5
+    """
+    if morph_type in (Embedding, Isomorphism):
+        inj = True
+    if morph_type == Isomorphism:
+        surj = True
+    if discarded(morph_type, subtype, source, target, inj, surj):
+        return 0
+    cache = get_morphism_cache()
+    if cache is not None:
+        key = morphism_key(morph_type, subtype, source, target, inj, surj,
+                           without)
+        count = cache.lookup_count(key)
+        if count is not None:
+            return count
+    solver = morph_solver(source, target, backend, subtype)
+    if solver == MorphMinionSol:
+        model = MorphismModel(morph_type, subtype, source, target, inj, surj)
+        count = minion_count(model.input_data(without))
+    elif solver == NativeMorphSol:
+        count = NativeMorphSol(morph_type, subtype, source, target, inj, surj,
+                               without=without).csp.count()
+    elif solver == ProductMorphSol:
+        count = ProductMorphSol(morph_type, subtype, source, target, inj,
+                                surj, without=without).count()
+    else:
+        count = sum(len(block) for block in
+                    solver(morph_type, subtype, source, target, inj, surj,
+                           without=without).arrays())
+    if cache is not None:
+        cache.store_count(key, count)
+    return count
+
+
+def stream_morphisms(morph_type, subtype, source, target, inj=None,
+                     surj=None, without=[], backend=None, batch=1024,
+                     view=True):
+    """
+    Genera los morfismos de source en target sin guardarlos (ni pasar por
+    la cache), leyendo las soluciones en bloques de batch. Con view son
+    MorphismView, que arman el morfismo recien cuando se lo usa; si no,
+    arrays de numpy con el indice en target de cada elemento de source.
+    Minion no puede adelantarse mas de unos pocos bloques al consumidor.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> c3 = gen_chain(3)
+    >>> sum(1 for h in stream_morphisms(Homomorphism, c3.type, c3, rhombus))
+    16
+    >>> rows = stream_morphisms(Homomorphism, c3.type, c3, c3, view=False)
+    >>> next(rows).tolist()
+    [0, 0, 0]
+    """
+    if morph_type in (Embedding, Isomorphism):
+        inj = True
+    if morph_type == Isomorphism:
+        surj = True
+    if discarded(morph_type, subtype, source, target, inj, surj):
+        return iter(())
+    solver = morph_solver(source, target, backend, subtype)
+    if solver == MorphMinionSol:
+        solutions = MorphMinionSol(morph_type, subtype, source, target, inj,
+                                   surj, without=without, buffer=4 * batch)
+    else:
+        solutions = solver(morph_type, subtype, source, target, inj, surj,
+                           without=without)
+    return solutions.stream(batch, view)
+
+
+def morphism_orbits(morph_type, subtype, source, target, inj=None, surj=None,
+                    backend=None):
+    """
+    Enumera los morfismos de source en target salvo automorfismos de
+    target: devuelve una lista de (morfismo, tamaño de su orbita), con un
+    representante por orbita (el lexicograficamente menor).
+    Al resolvedor se le agregan restricciones lex-leader con los
+    generadores de Aut(target), que dejan pasar al menor de cada orbita
+    pero no solo a el; los que no son el menor se descartan con la cadena
+    de estabilizadores, sin enumerar el grupo.
+
+    >>> from folpy.examples.lattices import M3, gen_chain
+    >>> orbits = morphism_orbits(Embedding, M3.type, gen_chain(3), M3)
+    >>> len(orbits), [size for morph, size in orbits]
+    (1, [3])
+    >>> orbits = morphism_orbits(Homomorphism, M3.type, M3, M3)
+    >>> [size for morph, size in orbits]
+    [1, 6, 3, 1]
+    >>> c3 = gen_chain(3)
+    >>> [size for morph, size in morphism_orbits(Homomorphism, c3.type,
+    ...                                           c3, c3)]
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+    """
+    from ..methods.endomorphisms import automorphism_chain
+
+    if morph_type in (Embedding, Isomorphism):
+        inj = True
+    if morph_type == Isomorphism:
+        surj = True
+    if discarded(morph_type, subtype, source, target, inj, surj):
+        return []
+    group = automorphism_chain(target, subtype)
+    symmetries = [tuple(g.tolist()) for g in group.generators]
+    solver = morph_solver(source, target, backend, subtype)
+    solutions = solver(morph_type, subtype, source, target, inj, surj,
+                       symmetries=symmetries)
+    chains = {}
+    result = []
+    for row in solutions.stream(view=False):
+        row = row.tolist()
+        image = tuple(dict.fromkeys(row))
+        if image not in chains:
+            chains[image] = group.rebase(image)
+        chain = chains[image]
+        # el menor de la orbita: ningun automorfismo que fija los primeros
+        # valores de la imagen lleva el siguiente a uno menor
+        levels = chain.transversals[:len(image)]
+        if any(min(t) < v for t, v in zip(levels, image)):
+            continue
+        size = int(np.prod([len(t) for t in levels], dtype=object))
+        result.append((solutions.fun({(i,): v for i, v in enumerate(row)}),
+                       size))
+    return result
 
 
 def homomorphisms(source,
@@ -517,7 +840,8 @@ def homomorphisms(source,
                   inj=None,
                   surj=None,
                   allsols=True,
-                  without=[]):
+                  without=[],
+                  backend=None):
     """
     call Minion to calculate all homomorphisms from A to B
 
@@ -526,23 +850,21 @@ def homomorphisms(source,
     >>> len(homomorphisms(rhombus, c2, rhombus.type))
     4
     """
-    if inj and len(source) > len(target):
-        # evidentemente no hay homos inyectivos
+    if discarded(Homomorphism, subtype, source, target, inj, surj):
         return []
-    if surj and len(source) < len(target):
-        # evidentemente no hay homos sobreyectivos
-        return []
-    return MorphMinionSol(Homomorphism,
-                          subtype,
-                          source,
-                          target,
-                          inj,
-                          surj,
-                          allsols,
-                          without)
-
-
-def embeddings(source, target, subtype, surj=None, allsols=True, without=[]):
+    return solve_morphisms(Homomorphism,
+                           subtype,
+                           source,
+                           target,
+                           inj,
+                           surj,
+                           allsols,
+                           without,
+                           backend)
+
+
+def embeddings(source, target, subtype, surj=None, allsols=True, without=[],
+               backend=None):
     """
     call Minion to calculate all embeddings of A into B
 
@@ -551,20 +873,21 @@ def embeddings(source, target, subtype, surj=None, allsols=True, without=[]):
     >>> len(embeddings(c2, rhombus, rhombus.type))
     5
     """
-    if len(source) > len(target):
-        # evidentemente no hay embedding
+    if discarded(Embedding, subtype, source, target, True, surj):
         return []
-    return MorphMinionSol(Embedding,
-                          subtype,
-                          source,
-                          target,
-                          True,
-                          surj,
-                          allsols,
-                          without)
-
-
-def isomorphisms(source, target, subtype, allsols=True, without=[]):
+    return solve_morphisms(Embedding,
+                           subtype,
+                           source,
+                           target,
+                           True,
+                           surj,
+                           allsols,
+                           without,
+                           backend)
+
+
+def isomorphisms(source, target, subtype, allsols=True, without=[],
+                 backend=None):
     """
     call Minion to calculate all homomorphisms from A to B
 
@@ -580,20 +903,58 @@ def isomorphisms(source, target, subtype, allsols=True, without=[]):
     >>> len(isomorphisms(M3, M3, M3.type))
     6
     """
-    if len(source) != len(target):
-        # evidentemente no son isomorfos
+    if discarded(Isomorphism, subtype, source, target, True, True):
         return []
-    return MorphMinionSol(Isomorphism,
-                          subtype,
-                          source,
-                          target,
-                          True,
-                          True,
-                          allsols,
-                          without)
+    return solve_morphisms(Isomorphism,
+                           subtype,
+                           source,
+                           target,
+                           True,
+                           True,
+                           allsols,
+                           without,
+                           backend)
+
+
+def count_homomorphisms(source, target, subtype, inj=None, surj=None,
+                        without=[], backend=None):
+    """
+    Cuenta los homomorfismos de A en B sin generarlos
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> count_homomorphisms(gen_chain(3), gen_chain(2), gen_chain(2).type)
+    4
+    """
+    return count_morphisms(Homomorphism, subtype, source, target, inj, surj,
+                           without, backend)
+
+
+def count_embeddings(source, target, subtype, surj=None, without=[],
+                     backend=None):
+    """
+    Cuenta los embeddings de A en B sin generarlos
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> count_embeddings(gen_chain(3), rhombus, rhombus.type)
+    2
+    """
+    return count_morphisms(Embedding, subtype, source, target, True, surj,
+                           without, backend)
 
 
-def is_homomorphic_image(source, target, subtype, without=[]):
+def count_isomorphisms(source, target, subtype, without=[], backend=None):
+    """
+    Cuenta los isomorfismos de A en B sin generarlos
+
+    >>> from folpy.examples.posets import M3
+    >>> count_isomorphisms(M3, M3, M3.type)
+    6
+    """
+    return count_morphisms(Isomorphism, subtype, source, target, True, True,
+                           without, backend)
+
+
+def is_homomorphic_image(source, target, subtype, without=[], backend=None):
     """
     return homomorphism if B is a homomorphic image of A (uses Minion)
     else returns False
@@ -605,14 +966,15 @@ def is_homomorphic_image(source, target, subtype, without=[]):
     >>> bool(is_homomorphic_image(M3, rhombus, M3.type))
     True
     """
-    h = homomorphisms(source, target, subtype, allsols=False, without=without)
+    h = homomorphisms(source, target, subtype, allsols=False, without=without,
+                      backend=backend)
     if h:
         return h[0]
     else:
         return False
 
 
-def is_substructure(source, target, subtype, without=[]):
+def is_substructure(source, target, subtype, without=[], backend=None):
     """
     return embedding if B is a substructure of A (uses Minion)
     else returns False
@@ -626,14 +988,15 @@ def is_substructure(source, target, subtype, without=[]):
     >>> bool(is_substructure(rhombus, M3, M3.type))
     True
     """
-    e = embeddings(source, target, subtype, allsols=False, without=without)
+    e = embeddings(source, target, subtype, allsols=False, without=without,
+                   backend=backend)
     if e:
         return e[0]
     else:
         return False
 
 
-def is_isomorphic(source, target, subtype, without=[]):
+def is_isomorphic(source, target, subtype, without=[], backend=None):
     """
     return isomorphism if A is isomorphic to B (uses Minion)
     else returns False
@@ -645,24 +1008,106 @@ def is_isomorphic(source, target, subtype, without=[]):
     >>> bool(is_isomorphic(M3, M3, M3.type))
     True
     """
-    i = isomorphisms(source, target, subtype, allsols=False, without=without)
+    if not without and backend is None:
+        return certificate_isomorphism(source, target, subtype)
+    i = isomorphisms(source, target, subtype, allsols=False, without=without,
+                     backend=backend)
     if i:
         return i[0]
     else:
         return False
 
 
-def is_isomorphic_to_any(source, targets, subtype, cores=10, without=[]):
+def certificate_isomorphism(source, target, subtype):
+    """
+    Devuelve un isomorfismo de source en target comparando sus
+    certificados canonicos, o False si no son isomorfos
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> certificate_isomorphism(gen_chain(2) ** 2, rhombus, rhombus.type)
+    Isomorphism(
+      [(0, 0)] -> 0,
+      [(0, 1)] -> 2,
+      [(1, 0)] -> 3,
+      [(1, 1)] -> 1,
+    ,
+      Type({},{'<=': 2})
+    ,
+      Injective,
+      Surjective,
+    )
+    """
+    if invariants(source, subtype) != invariants(target, subtype):
+        return False
+    iso = canonical_isomorphism(source, target, subtype)
+    if iso is None:
+        return False
+    return morphism_fun(Isomorphism, subtype, source, target, True, True)(iso)
+
+
+def is_isomorphic_to_any(source, targets, subtype, cores=10, without=[],
+                         backend=None):
     """
     Devuelve un iso si source es isomorfa a algun target
-    sino, false. Usa multiples preguntas a minion en paralelo.
+    sino, false. Si hay que preguntarle a Minion, junta las consultas en
+    pocas corridas (ver folpy.utils.minion.batch), salvo que todas se
+    resuelvan en Python.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> bool(is_isomorphic_to_any(gen_chain(2)**2, [gen_chain(4), rhombus],
+    ...                           rhombus.type))
+    True
     """
+    without = defaultdict(list, without)
+    source_invariants = invariants(source, subtype)
+    targets = [target for target in targets
+               if invariants(target, subtype) == source_invariants]
     if not targets:
         return False
 
-    i = ParallelMorphMinionSol(
-        Isomorphism, subtype, source, targets, cores=cores, without=without)
-    return i.solve()
+    if backend is None and not any(without[(source, target)]
+                                   for target in targets):
+        for target in targets:
+            i = certificate_isomorphism(source, target, subtype)
+            if i:
+                return i
+        return False
+
+    if all(morph_solver(source, target, backend, subtype) != MorphMinionSol
+           for target in targets):
+        for target in targets:
+            i = is_isomorphic(source, target, subtype,
+                              without=without[(source, target)],
+                              backend=backend)
+            if i:
+                return i
+        return False
+
+    cache = get_morphism_cache()
+    if cache is not None:
+        # solo se le pregunta a Minion por los que no estan en la cache
+        pending = []
+        for target in targets:
+            key = morphism_key(Isomorphism, subtype, source, target, True,
+                               True, without[(source, target)])
+            solutions = cache.lookup(key, allsols=False)
+            if solutions is None:
+                pending.append(target)
+            elif solutions:
+                return morphism_fun(Isomorphism, subtype, source, target,
+                                    True, True)(
+                    {(i,): v for i, v in enumerate(solutions[0])})
+        targets = pending
+        if not targets:
+            return False
+
+    found = first_morphism(Isomorphism, subtype,
+                           [(source, target, without[(source, target)])
+                            for target in targets], cores=cores,
+                           backend=backend)
+    if found is None:
+        return False
+    return found[1]
 
 
 def get_path():
@@ -739,6 +1184,12 @@ def write(path, data):
     f.close()
 
 
+BACKENDS = {"minion": MorphMinionSol,
+            "native": NativeMorphSol,
+            "generators": GeneratedMorphSol,
+            "product": ProductMorphSol}
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Resolvedor de restricciones en Python, para no levantar Minion en problemas
+chicos. Los dominios de las variables son bitmasks y la busqueda es un
+backtracking con orden estatico de variables y valores crecientes (el mismo
+orden en que Minion devuelve las soluciones), con propagacion por
+consistencia de arco sobre las tablas.
+"""
+
+from itertools import islice, product
+
+from ...semantics import Homomorphism, Embedding, Isomorphism
+from ..misc import bits
+from ..tables import indexed_tables
+from .solutions import LazySolutions, morphism_fun
+
+
+TABLE, FUNCTION, FORBIDDEN, ALLDIFF, SURJECTIVE, LEX = range(6)
+
+# cantidad maxima de combinaciones de argumentos que se recorren para
+# propagar una restriccion funcional que no tiene todos sus argumentos fijos
+FUNCTION_SUPPORT_LIMIT = 64
+
+
+class CSP(object):
+
+    """
+    Problema de satisfaccion de restricciones sobre variables 0..nvars-1
+    con valores en 0..size-1.
+
+    >>> csp = CSP(3, 3)
+    >>> csp.add_alldiff()
+    >>> csp.add_table((0, 1), {(0, 1), (1, 2), (2, 0)})
+    >>> list(csp.solutions())
+    [[0, 1, 2], [1, 2, 0], [2, 0, 1]]
+    >>> csp.count()
+    3
+    """
+
+    def __init__(self, nvars, size):
+        self.nvars = nvars
+        self.size = size
+        self.full = (1 << size) - 1
+        self.domains = [self.full] * nvars
+        self.constraints = []
+        self.watchers = [[] for _ in range(nvars)]
+        self.globals = []
+        # SearchLimit de solutions, o None
+        self.limits = None
+
+    def restrict(self, var, values):
+        """
+        Restringe el dominio de var a la lista de valores
+        """
+        mask = 0
+        for v in values:
+            mask |= 1 << v
+        self.domains[var] &= mask
+
+    def add_table(self, scope, rows):
+        """
+        Restriccion positiva: la tupla de valores de scope tiene que estar
+        en rows
+        """
+        self.__add((TABLE, tuple(scope), frozenset(map(tuple, rows))))
+
+    def add_function(self, args, result, table):
+        """
+        Restriccion funcional: result == table[args en base mixta]
+        """
+        self.__add((FUNCTION, tuple(args) + (result,), table))
+
+    def add_forbidden(self, scope, rows):
+        """
+        Restriccion negativa: la tupla de valores de scope no puede estar
+        en rows
+        """
+        self.__add((FORBIDDEN, tuple(scope), frozenset(map(tuple, rows))))
+
+    def add_alldiff(self):
+        """
+        Todas las variables toman valores distintos
+        """
+        self.globals.append(len(self.constraints))
+        self.constraints.append((ALLDIFF, tuple(range(self.nvars)), None))
+
+    def add_surjective(self):
+        """
+        Todos los valores son tomados por alguna variable
+        """
+        self.globals.append(len(self.constraints))
+        self.constraints.append((SURJECTIVE, tuple(range(self.nvars)),
+                                 None))
+
+    def add_lex_leader(self, permutations):
+        """
+        Rompe simetrias de los valores: la solucion tiene que ser
+        lexicograficamente menor o igual que la que resulta de aplicarle
+        cada permutacion a sus valores
+        """
+        self.globals.append(len(self.constraints))
+        self.constraints.append((LEX, tuple(range(self.nvars)),
+                                 [tuple(p) for p in permutations]))
+
+    def __add(self, constraint):
+        i = len(self.constraints)
+        self.constraints.append(constraint)
+        for var in set(constraint[1]):
+            self.watchers[var].append(i)
+
+    def solutions(self):
+        """
+        Generador de las soluciones, como listas de valores, en orden
+        lexicografico
+        """
+        domains = list(self.domains)
+        if not self.propagate(domains, range(len(self.constraints))):
+            return
+        var = self.next_var(domains, 0)
+        if var == self.nvars:
+            yield [d.bit_length() - 1 for d in domains]
+            return
+        stack = [(domains, var, iter(bits(domains[var])))]
+        while stack:
+            domains, var, values = stack[-1]
+            value = next(values, None)
+            if value is None:
+                stack.pop()
+                continue
+            if self.limits is not None and not self.limits.step():
+                return
+            new = list(domains)
+            new[var] = 1 << value
+            if not self.propagate(new, self.watchers[var] + self.globals):
+                continue
+            following = self.next_var(new, var + 1)
+            if following == self.nvars:
+                yield [d.bit_length() - 1 for d in new]
+                continue
+            stack.append((new, following, iter(bits(new[following]))))
+
+    def next_var(self, domains, var):
+        """
+        Devuelve la primer variable sin valor fijo a partir de var
+        """
+        while var < self.nvars and single(domains[var]):
+            var += 1
+        return var
+
+    def first(self):
+        """
+        Devuelve la primer solucion o None
+        """
+        return next(self.solutions(), None)
+
+    def count(self):
+        """
+        Cuenta las soluciones sin generarlas. Cuando queda una sola
+        variable libre la propagacion es exacta, asi que suma el tamaño de
+        su dominio en lugar de recorrerlo.
+        """
+        domains = list(self.domains)
+        if not self.propagate(domains, range(len(self.constraints))):
+            return 0
+        var = self.next_var(domains, 0)
+        if var == self.nvars:
+            return 1
+        if self.next_var(domains, var + 1) == self.nvars:
+            return bin(domains[var]).count("1")
+        total = 0
+        stack = [(domains, var, iter(bits(domains[var])))]
+        while stack:
+            domains, var, values = stack[-1]
+            value = next(values, None)
+            if value is None:
+                stack.pop()
+                continue
+            new = list(domains)
+            new[var] = 1 << value
+            if not self.propagate(new, self.watchers[var] + self.globals):
+                continue
+            following = self.next_var(new, var + 1)
+            if following == self.nvars:
+                total += 1
+            elif self.next_var(new, following + 1) == self.nvars:
+                total += bin(new[following]).count("1")
+            else:
+                stack.append((new, following, iter(bits(new[following]))))
+        return total
+
+    def propagate(self, domains, pending):
+        """
+        Propaga las restricciones hasta un punto fijo. Modifica domains y
+        devuelve False si algun dominio queda vacio.
+        """
+        queue = list(pending)
+        queued = set(queue)
+        while queue:
+            i = queue.pop()
+            queued.discard(i)
+            changed = self.revise(self.constraints[i], domains)
+            if changed is None:
+                return False
+            for var in changed:
+                for j in self.watchers[var]:
+                    if j not in queued:
+                        queued.add(j)
+                        queue.append(j)
+                for j in self.globals:
+                    if j not in queued:
+                        queued.add(j)
+                        queue.append(j)
+        return True
+
+    def revise(self, constraint, domains):
+        """
+        Revisa una restriccion. Devuelve la lista de variables cuyo dominio
+        cambio, o None si hay una inconsistencia.
+        """
+        kind, scope, data = constraint
+        if kind == TABLE:
+            supports = support_table(scope, data, domains)
+        elif kind == FUNCTION:
+            supports = support_function(scope, data, domains, self.size)
+        elif kind == FORBIDDEN:
+            supports = support_forbidden(scope, data, domains)
+        elif kind == ALLDIFF:
+            return revise_alldiff(domains)
+        elif kind == SURJECTIVE:
+            return revise_surjective(domains, self.full)
+        else:
+            return revise_lex_leader(domains, data)
+        if supports is None:
+            return None
+        changed = []
+        for var, mask in supports.items():
+            new = domains[var] & mask
+            if not new:
+                return None
+            if new != domains[var]:
+                domains[var] = new
+                changed.append(var)
+        return changed
+
+
+def support_table(scope, rows, domains):
+    """
+    Calcula los valores con soporte en una tabla positiva
+    """
+    supports = dict.fromkeys(scope, 0)
+    for row in rows:
+        seen = {}
+        for var, value in zip(scope, row):
+            if not domains[var] >> value & 1 or seen.get(var,
+                                                         value) != value:
+                break
+            seen[var] = value
+        else:
+            for var, value in seen.items():
+                supports[var] |= 1 << value
+    return supports
+
+
+def support_function(scope, table, domains, size):
+    """
+    Propaga result == table[args]. Si hay pocas combinaciones posibles de
+    argumentos (o a lo sumo un argumento libre) calcula los soportes; si
+    no, espera a que se fijen.
+    """
+    args = scope[:-1]
+    result = scope[-1]
+    variables = sorted(set(args))
+    options = [list(bits(domains[var])) for var in variables]
+    total = 1
+    free = 0
+    for values in options:
+        total *= len(values)
+        free += len(values) > 1
+    if total > FUNCTION_SUPPORT_LIMIT and free > 1:
+        return {}
+    supports = dict.fromkeys(scope, 0)
+    for values in product(*options):
+        seen = dict(zip(variables, values))
+        position = 0
+        for var in args:
+            position = position * size + seen[var]
+        image = table[position]
+        if image is None or not domains[result] >> image & 1:
+            continue
+        if seen.get(result, image) != image:
+            continue
+        seen[result] = image
+        for var, value in seen.items():
+            supports[var] |= 1 << value
+    return supports
+
+
+def support_forbidden(scope, rows, domains):
+    """
+    Propaga una tabla negativa cuando queda a lo sumo una variable libre
+    """
+    free = [var for var in set(scope) if not single(domains[var])]
+    if len(free) > 1:
+        return {}
+    fixed = {var: domains[var].bit_length() - 1 for var in scope
+             if single(domains[var])}
+    if not free:
+        if tuple(fixed[var] for var in scope) in rows:
+            return None
+        return {}
+    var = free[0]
+    mask = domains[var]
+    for value in bits(mask):
+        fixed[var] = value
+        if tuple(fixed[v] for v in scope) in rows:
+            mask &= ~(1 << value)
+    return {var: mask}
+
+
+def revise_alldiff(domains):
+    """
+    Saca los valores de las variables fijas de los dominios de las demas
+    """
+    changed = []
+    taken = 0
+    for d in domains:
+        if single(d):
+            if taken & d:
+                return None
+            taken |= d
+    free = 0
+    nfree = 0
+    for var, d in enumerate(domains):
+        if not single(d):
+            new = d & ~taken
+            if not new:
+                return None
+            if new != d:
+                domains[var] = new
+                changed.append(var)
+            if not single(new):
+                free |= new
+                nfree += 1
+    if nfree and bin(free).count("1") < nfree:
+        return None
+    return changed
+
+
+def revise_surjective(domains, full):
+    """
+    Todos los valores tienen que aparecer en algun dominio. Si un valor que
+    no esta tomado puede ir solo a una variable, la fija.
+    """
+    changed = []
+    union = 0
+    taken = 0
+    for d in domains:
+        union |= d
+        if single(d):
+            taken |= d
+    if union != full:
+        return None
+    missing = full & ~taken
+    free = [var for var, d in enumerate(domains) if not single(d)]
+    if bin(missing).count("1") > len(free):
+        return None
+    for value in bits(missing):
+        candidates = [var for var in free if domains[var] >> value & 1]
+        if len(candidates) == 1:
+            var = candidates[0]
+            domains[var] = 1 << value
+            changed.append(var)
+            free.remove(var)
+    return changed
+
+
+def revise_lex_leader(domains, permutations):
+    """
+    Para cada permutacion p compara la solucion x con p(x) sobre el prefijo
+    de variables fijas. Si hasta ahi son iguales, saca de la primer
+    variable libre los valores que harian a p(x) menor que x (mirando
+    tambien las variables fijas que le siguen).
+
+    >>> domains = [0b010, 0b111, 0b001]
+    >>> changed = revise_lex_leader(domains, [(0, 1, 2), (0, 2, 1)])
+    >>> changed, list(bits(domains[1]))
+    ([], [0, 1, 2])
+    >>> revise_lex_leader(domains, [(2, 1, 0)]), list(bits(domains[1]))
+    ([1], [0, 1])
+    """
+    changed = []
+    for p in permutations:
+        var = 0
+        while var < len(domains) and single(domains[var]):
+            value = domains[var].bit_length() - 1
+            if p[value] < value:
+                return None
+            if p[value] > value:
+                break
+            var += 1
+        else:
+            if var == len(domains):
+                continue
+            # el prefijo es igual: si la variable toma un valor fijo por p,
+            # decide lo que sigue
+            tail_smaller = False
+            for d in domains[var + 1:]:
+                if not single(d):
+                    break
+                value = d.bit_length() - 1
+                if p[value] != value:
+                    tail_smaller = p[value] < value
+                    break
+            mask = domains[var]
+            for value in bits(mask):
+                if p[value] < value or (p[value] == value and tail_smaller):
+                    mask &= ~(1 << value)
+            if not mask:
+                return None
+            if mask != domains[var]:
+                domains[var] = mask
+                changed.append(var)
+    return changed
+
+
+def single(mask):
+    """
+    Decide si el dominio tiene un solo valor
+    """
+    return mask and not mask & (mask - 1)
+
+
+def morphism_csp(morph_type, subtype, source, target, inj=None, surj=None,
+                 without=[], symmetries=None):
+    """
+    Arma el CSP de los morfismos de source en target para el subtype: una
+    variable por elemento de source, una restriccion funcional por fila de
+    cada operacion y una tabla por tupla de cada relacion. Los embeddings
+    ademas prohiben mandar tuplas fuera de una relacion adentro de ella.
+    Si se dan symmetries (automorfismos de target como permutaciones de
+    indices) solo quedan los morfismos lex-leader.
+    """
+    A = indexed_tables(source)
+    B = indexed_tables(target)
+    csp = CSP(A.n, B.n)
+    if morph_type in (Embedding, Isomorphism):
+        inj = True
+    if morph_type == Isomorphism:
+        surj = True
+    for op in subtype.operations:
+        table_a = A.operation(op)
+        table_b = B.operation(op)
+        arity = A.arity(op)
+        for i, args in enumerate(product(range(A.n), repeat=arity)):
+            if table_a[i] is not None:
+                csp.add_function(args, table_a[i], table_b)
+    for rel in subtype.relations:
+        rows_b = B.relation(rel)
+        for row in A.relation(rel):
+            csp.add_table(row, rows_b)
+        if morph_type in (Embedding, Isomorphism):
+            rows_a = A.relation(rel)
+            for row in product(range(A.n), repeat=A.arity(rel)):
+                if row not in rows_a:
+                    csp.add_forbidden(row, rows_b)
+    if inj:
+        csp.add_alldiff()
+    if surj:
+        csp.add_surjective()
+    if without:
+        rows = [[B.index[morph(x)] for x in A.universe] for morph in without]
+        csp.add_forbidden(range(A.n), rows)
+    if symmetries:
+        csp.add_lex_leader(symmetries)
+    return csp
+
+
+class NativeMorphSol(LazySolutions):
+    """
+    Soluciones del resolvedor en Python que son morfismos. Tiene la misma
+    interfaz que MorphMinionSol.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> c2 = gen_chain(2)
+    >>> len(NativeMorphSol(Homomorphism, c2.type, c2, rhombus))
+    9
+    >>> len(NativeMorphSol(Embedding, c2.type, c2, rhombus))
+    5
+    >>> len(NativeMorphSol(Isomorphism, rhombus.type, rhombus, rhombus))
+    2
+    """
+
+    def __init__(self,
+                 morph_type,
+                 subtype,
+                 source,
+                 target,
+                 inj=None, surj=None, allsols=True, without=[],
+                 symmetries=None):
+        if morph_type not in (Homomorphism, Embedding, Isomorphism):
+            raise IndexError("Morphism unknown")
+        self.morph_type = morph_type
+        self.subtype = subtype
+        self.source = source
+        self.target = target
+        self.inj = inj
+        self.surj = surj
+        if morph_type in (Embedding, Isomorphism):
+            self.inj = True
+        if morph_type == Isomorphism:
+            self.surj = True
+        self.csp = morphism_csp(morph_type, subtype, source, target,
+                                self.inj, self.surj, without, symmetries)
+        self.search = self.csp.solutions()
+        fun = morphism_fun(morph_type, subtype, source, target, self.inj,
+                           self.surj)
+        super(NativeMorphSol, self).__init__(allsols, fun=fun)
+
+    def set_limits(self, timelimit=None, nodelimit=None):
+        self.csp.limits = super(NativeMorphSol, self).set_limits(timelimit,
+                                                                 nodelimit)
+        return self.csp.limits
+
+    def next_solution(self):
+        """
+        Devuelve la siguiente solucion o None si no hay mas
+        """
+        if self.EOF:
+            return None
+        values = next(self.search, None)
+        if values is None or not self.allsols:
+            self.EOF = True
+        if values is None:
+            return None
+        return {(i,): v for i, v in enumerate(values)}
+
+    def next_batch(self, size):
+        """
+        Toma hasta size soluciones directo de la busqueda, sin armar
+        diccionarios
+        """
+        if self.EOF:
+            return []
+        if not self.allsols:
+            size = 1
+        batch = list(islice(self.search, size))
+        if len(batch) < size or not self.allsols:
+            self.EOF = True
+        return batch
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
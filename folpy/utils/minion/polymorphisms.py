@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Polimorfismos n-arios de un modelo (homomorfismos A^n -> A) sin construir
+A^n: el CSP se arma directo de las tablas de A, con una variable por
+n-upla de elementos indexada en base mixta (el indice de (a1,...,an) es
+a1*m^(n-1) + ... + an, como en el universo de A ** n).
+
+Las identidades (ver folpy.utils.identities) se imponen sobre las
+variables: las identidades entre dos aplicaciones de f identifican
+variables y las de una aplicacion con una letra fijan valores, asi que el
+CSP que queda es mas chico.
+"""
+
+from itertools import product
+
+import numpy as np
+
+from ..identities import identity_instances
+from ..preservation import arguments, encode, operation_array
+from ..tables import indexed_tables
+from .native import CSP
+from .solutions import SearchSolutions
+
+
+def identity_classes(m, n, identities):
+    """
+    Aplica las identidades a las m^n variables. Devuelve (rep, allowed):
+    rep[c] es el representante de la clase de la variable c y allowed un
+    diccionario de representante en el conjunto de valores que puede tomar
+    (solo para los que quedaron fijos).
+
+    >>> rep, allowed = identity_classes(2, 2, [("ab", "ba"), ("xx", "x")])
+    >>> rep.tolist(), allowed
+    ([0, 1, 1, 3], {0: {0}, 3: {1}})
+    """
+    parent = list(range(m ** n))
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    fixed = {}
+    for left, right, value in identity_instances(identities, m, n):
+        if right is None:
+            fixed.setdefault(left, set()).add(value)
+            continue
+        a, b = find(left), find(right)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    rep = np.array([find(c) for c in range(m ** n)], dtype=np.int64)
+    allowed = {}
+    for c, values in fixed.items():
+        # una variable fijada a dos valores distintos no tiene valores
+        options = set(values) if len(values) == 1 else set()
+        r = int(rep[c])
+        allowed[r] = allowed.get(r, options) & options
+    return rep, allowed
+
+
+def polymorphism_csp(model, n, subtype, identities=[]):
+    """
+    Arma el CSP de los polimorfismos n-arios del modelo para el subtype.
+    Devuelve (csp, variables, rep): las variables del CSP son las clases
+    de las identidades, variables[i] es el representante de la variable i
+    y rep[c] la variable del CSP de la n-upla c.
+    Por cada operacion de aridad k hay una restriccion funcional por cada
+    k-upla de n-uplas (sin repetir las que las identidades vuelven iguales)
+    y por cada relacion de aridad r una tabla por cada n-upla de filas.
+    """
+    tables = indexed_tables(model)
+    m = tables.n
+    classes, allowed = identity_classes(m, n, identities)
+    variables, rep = np.unique(classes, return_inverse=True)
+    rep = rep.reshape(-1)
+    csp = CSP(len(variables), m)
+    for r, values in allowed.items():
+        csp.restrict(int(rep[r]), values)
+    digits = arguments(m, n)
+    for op in sorted(subtype.operations):
+        table = operation_array(tables, op)
+        arity = tables.arity(op)
+        args = arguments(len(digits), arity)
+        # coordenada a coordenada, op sobre las j-esimas componentes
+        results = np.stack([table[encode(digits[args, j], m)]
+                            for j in range(n)], axis=1)
+        defined = np.all(results != -1, axis=1)
+        rows = np.column_stack([rep[args[defined]],
+                                rep[encode(results[defined], m)]])
+        for row in np.unique(rows, axis=0).tolist():
+            csp.add_function(row[:-1], row[-1], tables.operation(op))
+    for rel in sorted(subtype.relations):
+        rows = sorted(tables.relation(rel))
+        if not rows:
+            continue
+        matrix = np.array(rows, dtype=np.int64)
+        chosen = arguments(len(rows), n)
+        scopes = np.stack([rep[encode(matrix[chosen, j], m)]
+                           for j in range(tables.arity(rel))], axis=1)
+        for scope in np.unique(scopes, axis=0).tolist():
+            csp.add_table(scope, rows)
+    return csp, variables, rep
+
+
+class PolymorphismSol(SearchSolutions):
+    """
+    Polimorfismos n-arios del modelo para el subtype que cumplen las
+    identidades, como operaciones sobre el universo. Las soluciones en
+    crudo (stream(view=False)) son arrays con el valor (indice del
+    universo) en cada n-upla, en base mixta.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> c2 = gen_chain(2)
+    >>> len(PolymorphismSol(c2, 2, c2.type))
+    6
+    >>> f = PolymorphismSol(c2, 2, c2.type, ["symmetric", "idempotent"])[0]
+    >>> f(0, 1), f(1, 0)
+    (0, 0)
+    >>> PolymorphismSol(rhombus, 2, rhombus.type, ["symmetric"]).count()
+    784
+    """
+
+    def __init__(self, model, n, subtype, identities=[], allsols=True):
+        self.model = model
+        self.n = n
+        self.subtype = subtype
+        self.csp, self.variables, self.rep = polymorphism_csp(
+            model, n, subtype, identities)
+        self.search = self.assignments()
+        universe = indexed_tables(model).universe
+        d_universe = list(model.universe)
+
+        def fun(solution):
+            from ...semantics.modelfunctions import Operation
+
+            values = [universe[solution[(c,)]]
+                      for c in range(len(solution))]
+            return Operation(dict(zip(product(d_universe, repeat=n),
+                                      values)),
+                             d_universe=d_universe, arity=n)
+
+        super(PolymorphismSol, self).__init__(allsols, fun=fun)
+
+    def assignments(self):
+        """
+        Generador de las soluciones como listas de valores, una por n-upla
+        """
+        for values in self.csp.solutions():
+            yield np.array(values, dtype=np.int64)[self.rep].tolist()
+
+    def count(self):
+        """
+        Cuenta los polimorfismos sin generarlos
+        """
+        return self.csp.count()
+
+
+def polymorphisms(model, n, subtype, identities=[], allsols=True):
+    """
+    Polimorfismos n-arios del modelo en el subtype que cumplen las
+    identidades
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> c3 = gen_chain(3)
+    >>> len(polymorphisms(c3, 2, c3.type, ["idempotent", "symmetric"]))
+    8
+    """
+    return PolymorphismSol(model, n, subtype, identities, allsols)
+
+
+def has_polymorphism(model, n, subtype, identities=[]):
+    """
+    Si existe, devuelve un polimorfismo n-ario del modelo en el subtype
+    que cumple las identidades; si no, devuelve False
+
+    >>> from folpy.examples.posets import gen_chain
+    >>> from folpy.examples.lattices import rhombus
+    >>> bool(has_polymorphism(gen_chain(3), 3, gen_chain(3).type,
+    ...                       [("xxy", "x"), ("xyx", "x"), ("yxx", "x")]))
+    True
+    >>> bool(has_polymorphism(rhombus, 2, rhombus.type,
+    ...                       ["idempotent", "symmetric"]))
+    False
+    """
+    solutions = PolymorphismSol(model, n, subtype, identities, allsols=False)
+    if solutions:
+        return solutions[0]
+    return False
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
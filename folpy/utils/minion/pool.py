@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Corridas de Minion.
+MinionProcess corre un problema en su propio Minion, leyendo la salida en
+el hilo que la pide; es lo que usa MinionSol por defecto.
+El pool sirve para acotar cuantos Minions corren a la vez cuando se lanzan
+muchas consultas juntas (ParallelMorphMinionSol, MinionBatch). Cada worker
+es un hilo con su propio named pipe que atiende problemas de una cola
+comun, de a uno por vez. Minion no sabe resolver varios problemas en un
+mismo proceso, asi que el worker lanza un Minion por problema.
+Ninguno de los dos ahorra el arranque de Minion, que es casi todo el costo
+de un problema chico; por eso esos problemas se resuelven en Python (ver
+NATIVE_LIMIT en folpy.utils.minion.minion).
+Los pipes se crean en directorios temporales.
+"""
+
+import atexit
+import errno
+import itertools
+import os
+import queue
+import select
+import shutil
+import subprocess as sp
+import tempfile
+import threading
+import time
+
+from ..files import create_pipe, remove
+
+
+def get_executable():
+    """
+    Devuelve el path del ejecutable de Minion, que esta en este directorio
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "minion")
+
+
+directory = None
+pipe_ids = itertools.count()
+
+
+def pipe_directory():
+    """
+    Devuelve el directorio temporal de los pipes de las corridas de este
+    proceso, creandolo la primera vez
+    """
+    global directory
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="folpy_minion")
+        atexit.register(shutil.rmtree, directory, True)
+    return directory
+
+
+def minion_args(executable, input_filename, allsols=True, count=False):
+    """
+    Argumentos para correr Minion sobre input_filename. Con count, Minion
+    solo cuenta las soluciones.
+
+    >>> minion_args("minion", "input", allsols=False)
+    ['minion', '-printsolsonly', '-randomseed', '0', 'input']
+    """
+    if count:
+        args = [executable, "-noprintsols", "-findallsols", "-randomseed",
+                "0"]
+    else:
+        args = [executable, "-printsolsonly", "-randomseed", "0"]
+        if allsols:
+            args.append("-findallsols")
+    args.append(input_filename)
+    return args
+
+
+def feed(input_filename, process, data):
+    """
+    Escribe el problema (un string o una lista de pedazos) en el pipe
+    input_filename. Espera a que Minion abra el pipe sin bloquearse, por si
+    Minion muere antes de leerlo.
+    """
+    if isinstance(data, str):
+        data = [data]
+    while True:
+        try:
+            fd = os.open(input_filename, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as error:
+            if error.errno != errno.ENXIO or process.poll() is not None:
+                return
+            time.sleep(0.0001)
+    os.set_blocking(fd, True)
+    try:
+        with os.fdopen(fd, "w") as open_file:
+            for chunk in data:
+                open_file.write(chunk)
+    except BrokenPipeError:
+        # Minion murio mientras leia
+        pass
+
+
+class MinionProcess(object):
+
+    """
+    Un problema corrido por su propio Minion, sin hilos: el pipe se crea en
+    el directorio temporal del proceso y las lineas de Minion se leen a
+    medida que se piden. Tiene la misma interfaz que MinionJob.
+    """
+
+    def __init__(self, input_data, allsols=True, count=False,
+                 executable=None):
+        self.allsols = allsols
+        self.count = count
+        self.input_filename = os.path.join(pipe_directory(),
+                                           "input_minion%s" % next(pipe_ids))
+        create_pipe(self.input_filename)
+        self.buffer = b""
+        self.tail = []
+        self.process = sp.Popen(
+            minion_args(executable or get_executable(), self.input_filename,
+                        allsols, count),
+            stdin=sp.DEVNULL, stdout=sp.PIPE, stderr=sp.PIPE, bufsize=0)
+        feed(self.input_filename, self.process, input_data)
+
+    def read_line(self, block=True):
+        """
+        Devuelve la proxima linea de Minion, b"" en el EOF o None si no
+        hay una linea completa y block es falso
+        """
+        while b"\n" not in self.buffer:
+            if not block and not select.select([self.process.stdout], [],
+                                               [], 0)[0]:
+                return None
+            chunk = os.read(self.process.stdout.fileno(), 65536)
+            if not chunk:
+                line, self.buffer = self.buffer, b""
+                return line
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return line + b"\n"
+
+    def get(self, block=True):
+        """
+        Bloquea hasta que haya una linea, el final (None) o un error
+        """
+        if self.tail:
+            return self.tail.pop(0)
+        if self.process is None:
+            return None
+        line = self.read_line(block)
+        if line is None:
+            return None
+        if line:
+            if not self.allsols and not self.count:
+                self.close()
+            return line.decode("utf-8")
+        error = self.process.stderr.read().decode("utf-8")
+        returncode = self.process.wait()
+        self.close()
+        if returncode < 0 and not error:
+            error = "el proceso murio"
+        if error:
+            self.tail.append(None)
+            return ValueError("Minion Error:\n%s" % error)
+        return None
+
+    def get_many(self, size):
+        """
+        Bloquea hasta que haya algo y devuelve hasta size elementos, sin
+        esperar por los que todavia no llegaron. Corta despues del final o
+        de un error.
+        """
+        items = [self.get()]
+        while len(items) < size and isinstance(items[-1], str):
+            item = self.get(block=False)
+            if item is None and self.process is not None:
+                break
+            items.append(item)
+        return items
+
+    def close(self):
+        """
+        Mata a Minion y borra el pipe
+        """
+        if self.process is not None:
+            process, self.process = self.process, None
+            try:
+                process.kill()
+            except OSError:
+                # ya habia terminado
+                pass
+            process.stdout.close()
+            process.stderr.close()
+            process.wait()
+        remove(self.input_filename)
+
+    def cancel(self):
+        """
+        Cancela el problema
+        """
+        self.close()
+
+    def __del__(self):
+        if hasattr(self, "process"):
+            self.close()
+
+
+class MinionJob(object):
+
+    """
+    Un problema para Minion encolado en el pool. Las lineas que imprime
+    Minion se van dejando en una cola; None marca el final y una excepcion
+    indica que Minion termino con error. Si se da notify, cada vez que hay
+    algo nuevo en la cola se avisa poniendo el job en notify.
+    Con count, Minion solo cuenta las soluciones y en la cola quedan todas
+    las lineas de su resumen.
+    Con buffer, la cola guarda a lo sumo esa cantidad de lineas: el worker
+    espera a que se lean y Minion queda frenado en su salida.
+    """
+
+    def __init__(self, input_data, allsols=True, notify=None, count=False,
+                 buffer=0):
+        self.input_data = input_data
+        self.allsols = allsols
+        self.notify = notify
+        self.count = count
+        self.lines = queue.Queue(buffer)
+        self.delivered = 0
+        self.cancelled = False
+        self.process = None
+
+    def put(self, item):
+        while True:
+            try:
+                self.lines.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self.cancelled:
+                    return
+        if self.notify is not None:
+            self.notify.put(self)
+
+    def get(self):
+        """
+        Bloquea hasta que haya una linea, el final (None) o un error
+        """
+        return self.lines.get()
+
+    def get_many(self, size):
+        """
+        Bloquea hasta que haya algo y devuelve hasta size elementos de la
+        cola, sin esperar por los que todavia no llegaron. Corta despues
+        del final o de un error.
+        """
+        items = [self.lines.get()]
+        while len(items) < size and isinstance(items[-1], str):
+            try:
+                items.append(self.lines.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def cancel(self):
+        """
+        Cancela el job; si ya estaba corriendo mata a su Minion
+        """
+        self.cancelled = True
+        process = self.process
+        if process is not None:
+            try:
+                process.kill()
+            except OSError:
+                # ya habia terminado
+                pass
+
+
+class MinionWorker(threading.Thread):
+
+    """
+    Hilo que resuelve los problemas de la cola del pool uno tras otro.
+    Si Minion muere por una señal que no le mandamos, lo vuelve a lanzar
+    salteando las soluciones que ya se habian entregado (Minion corre con
+    semilla fija, asi que el orden de las soluciones es el mismo).
+    """
+
+    def __init__(self, pool, number):
+        super(MinionWorker, self).__init__(daemon=True)
+        self.pool = pool
+        self.input_filename = os.path.join(
+            pipe_directory(), "input_minion_worker%s_%s" % (id(pool), number))
+        self.job = None
+        create_pipe(self.input_filename)
+
+    def run(self):
+        while True:
+            job = self.pool.jobs.get()
+            if job is None:
+                break
+            if not job.cancelled:
+                self.job = job
+                self.solve(job)
+                self.job = None
+        remove(self.input_filename)
+
+    def solve(self, job):
+        """
+        Corre el job, relanzando Minion si se cae
+        """
+        for attempt in range(self.pool.retries + 1):
+            try:
+                crashed = self.attempt(job)
+            except OSError as error:
+                job.put(ValueError("Minion Error:\n%s" % error))
+                break
+            if not crashed:
+                break
+            self.pool.restarts += 1
+        else:
+            job.put(ValueError("Minion Error:\nel proceso murio %s veces" %
+                               (self.pool.retries + 1)))
+        job.process = None
+        job.put(None)
+
+    def attempt(self, job):
+        """
+        Lanza un Minion para el job y pasa sus lineas a la cola del job.
+        Devuelve si Minion se cayo.
+        """
+        process = sp.Popen(minion_args(self.pool.executable,
+                                       self.input_filename, job.allsols,
+                                       job.count),
+                           stdin=sp.DEVNULL, stdout=sp.PIPE, stderr=sp.PIPE)
+        job.process = process
+        if job.cancelled:
+            process.kill()
+        else:
+            feed(self.input_filename, process, job.input_data)
+
+        # al contar, el resumen de un intento caido no sirve
+        skip = 0 if job.count else job.delivered
+        finished = False
+        for line in process.stdout:
+            if job.cancelled:
+                break
+            if skip:
+                skip -= 1
+                continue
+            job.delivered += 1
+            job.put(line.decode("utf-8"))
+            if not job.allsols:
+                finished = True
+                process.kill()
+                break
+        process.stdout.close()
+        error = process.stderr.read().decode("utf-8")
+        process.stderr.close()
+        returncode = process.wait()
+
+        if job.cancelled or finished:
+            return False
+        if returncode < 0:
+            return True
+        if error:
+            job.put(ValueError("Minion Error:\n%s" % error))
+        return False
+
+
+class MinionPool(object):
+
+    """
+    Pool de tamaño fijo de workers de Minion con una cola de problemas.
+    Por defecto usa tantos workers como CPUs.
+    """
+
+    def __init__(self, size=None, executable=None, retries=2):
+        self.executable = executable or get_executable()
+        self.size = size or os.cpu_count() or 1
+        self.retries = retries
+        self.restarts = 0
+        self.jobs = queue.Queue()
+        self.workers = [MinionWorker(self, i) for i in range(self.size)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, input_data, allsols=True, notify=None, count=False,
+               buffer=0):
+        """
+        Encola un problema y devuelve su MinionJob
+        """
+        job = MinionJob(input_data, allsols, notify, count, buffer)
+        self.jobs.put(job)
+        return job
+
+    def close(self):
+        """
+        Cancela los problemas pendientes y termina los workers
+        """
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.cancel()
+        for worker in self.workers:
+            if worker.job is not None:
+                worker.job.cancel()
+        for worker in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+
+pool = None
+
+
+def default_pool():
+    """
+    Devuelve el pool compartido, creandolo la primera vez
+    """
+    global pool
+    if pool is None:
+        pool = MinionPool()
+        atexit.register(pool.close)
+    return pool
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Morfismos en un producto, factor por factor.
+Un homomorfismo A -> B1 x ... x Bk es exactamente una tupla de
+homomorfismos A -> Bi, asi que se calcula una vez el conjunto de
+homomorfismos de A en cada factor (distinto) y se los combina de forma
+perezosa. Para los embeddings la combinacion tiene que separar puntos: el
+nucleo de la tupla es la interseccion de los nucleos y solo se afina al
+agregar factores, asi que esas combinaciones se arman factor por factor
+cortando las tuplas parciales que ya no pueden separar puntos.
+"""
+
+from itertools import islice, product
+
+import numpy as np
+
+from ...semantics import Homomorphism, Embedding, Isomorphism, Product
+from ..preservation import relation_violation
+from ..tables import indexed_tables
+from .solutions import SearchSolutions, morphism_fun
+
+
+def product_factors(model):
+    """
+    Devuelve los factores de model si es un producto (de al menos dos
+    factores) cuyo universo es el producto cartesiano de los universos de
+    los factores, en ese orden. Si no, devuelve None.
+
+    >>> from folpy.examples.lattices import gen_chain, rhombus
+    >>> len(product_factors(gen_chain(2) ** 3))
+    3
+    >>> product_factors(rhombus) is None
+    True
+    """
+    factors = getattr(model, "factors", None)
+    if not isinstance(model, Product) or not factors or len(factors) < 2:
+        return None
+    if list(model.universe) != list(product(*[f.universe for f in factors])):
+        return None
+    return factors
+
+
+class ProductMorphSol(SearchSolutions):
+    """
+    Soluciones que son morfismos en un producto, combinando los
+    homomorfismos en cada factor. Tiene la misma interfaz que
+    NativeMorphSol. La inyectividad (separacion de puntos), la
+    sobreyectividad y la vuelta de las relaciones se verifican sobre cada
+    combinacion, de a bloques.
+
+    >>> from folpy.examples.lattices import gen_chain, rhombus
+    >>> c2 = gen_chain(2)
+    >>> len(ProductMorphSol(Homomorphism, c2.type, rhombus, c2 ** 3))
+    64
+    >>> len(ProductMorphSol(Embedding, c2.type, rhombus, c2 ** 3))
+    18
+    >>> len(ProductMorphSol(Isomorphism, c2.type, rhombus, c2 ** 2))
+    2
+    """
+
+    def __init__(self,
+                 morph_type,
+                 subtype,
+                 source,
+                 target,
+                 inj=None, surj=None, allsols=True, without=[],
+                 symmetries=None):
+        if morph_type not in (Homomorphism, Embedding, Isomorphism):
+            raise IndexError("Morphism unknown")
+        self.morph_type = morph_type
+        self.subtype = subtype
+        self.source = source
+        self.target = target
+        self.inj = inj
+        self.surj = surj
+        if morph_type in (Embedding, Isomorphism):
+            self.inj = True
+        if morph_type == Isomorphism:
+            self.surj = True
+        A = indexed_tables(source)
+        B = indexed_tables(target)
+        factors = product_factors(target)
+        if factors is None:
+            raise ValueError("Target is not a product")
+        # cada factor distinto se resuelve una sola vez
+        homs = {}
+        self.factor_rows = []
+        for factor in factors:
+            key = indexed_tables(factor).fingerprint()
+            if key not in homs:
+                homs[key] = self.factor_homomorphisms(factor)
+            self.factor_rows.append(homs[key])
+        self.strides = [int(np.prod([len(f) for f in factors[i + 1:]]))
+                        for i in range(len(factors))]
+        # cantidad de elementos del producto de los primeros i+1 factores
+        self.covers = [len(target) // stride for stride in self.strides]
+        self.reflected = []
+        if morph_type in (Embedding, Isomorphism):
+            self.reflected = sorted(subtype.relations)
+        self.without = {tuple(B.index[morph(x)] for x in A.universe)
+                        for morph in without}
+        self.symmetries = symmetries or []
+        self.search = self.assignments()
+        fun = morphism_fun(morph_type, subtype, source, target, self.inj,
+                           self.surj)
+        super(ProductMorphSol, self).__init__(allsols, fun=fun)
+
+    def factor_homomorphisms(self, factor):
+        """
+        Array con los homomorfismos de source en factor, uno por fila
+        """
+        from .minion import morph_solver
+
+        solver = morph_solver(self.source, factor, None, self.subtype)
+        blocks = list(solver(Homomorphism, self.subtype, self.source,
+                             factor).arrays())
+        if not blocks:
+            return np.zeros((0, len(self.source)), dtype=np.int64)
+        return np.concatenate(blocks)
+
+    def is_plain(self):
+        """
+        Decide si todas las combinaciones son soluciones
+        """
+        return not (self.inj or self.surj or self.without or
+                    self.symmetries)
+
+    def count(self):
+        """
+        Cantidad de soluciones. Para homomorfismos sin restricciones es el
+        producto de las cantidades en cada factor.
+
+        >>> from folpy.examples.lattices import gen_chain, rhombus
+        >>> c2 = gen_chain(2)
+        >>> ProductMorphSol(Homomorphism, c2.type, rhombus, c2 ** 6).count()
+        4096
+        """
+        if self.is_plain():
+            return int(np.prod([len(rows) for rows in self.factor_rows]))
+        return sum(len(block) for block in self.arrays())
+
+    def combinations(self, size=1024):
+        """
+        Genera las combinaciones de homomorfismos en los factores, de a
+        bloques de size, como arrays de indices en target (una por fila)
+        """
+        k = len(self.factor_rows)
+        choices = product(*[range(len(rows)) for rows in self.factor_rows])
+        while True:
+            chunk = np.array(list(islice(choices, size)),
+                             dtype=np.int64).reshape(-1, k)
+            if not len(chunk):
+                return
+            values = np.zeros((len(chunk), len(self.source)), dtype=np.int64)
+            for i, (rows, stride) in enumerate(zip(self.factor_rows,
+                                                   self.strides)):
+                values += rows[chunk[:, i]] * stride
+            yield values
+
+    def accepts(self, row):
+        """
+        Verificaciones sobre cada combinacion inyectiva y sobreyectiva (si
+        se piden)
+        """
+        if tuple(row) in self.without:
+            return False
+        for rel in self.reflected:
+            if relation_violation(row, self.source, self.target, rel,
+                                  inverse=True) is not None:
+                return False
+        for p in self.symmetries:
+            if tuple(p[v] for v in row) < tuple(row):
+                return False
+        return True
+
+    def assignments(self):
+        """
+        Generador de las soluciones como listas de valores
+        """
+        if self.inj or self.surj:
+            return self.pruned_assignments()
+        return self.block_assignments()
+
+    def block_assignments(self):
+        """
+        Recorre todas las combinaciones de a bloques
+        """
+        for values in self.combinations():
+            if self.limits is not None and \
+                    not self.limits.step(len(values)):
+                return
+            for row in values:
+                row = row.tolist()
+                if self.accepts(row):
+                    yield row
+
+    def pruned_assignments(self):
+        """
+        Recorre las combinaciones factor por factor, en el mismo orden que
+        combinations, cortando las tuplas parciales que no pueden separar
+        puntos (con inj) o que no cubren el producto de sus factores (con
+        surj)
+
+        >>> from folpy.examples.lattices import gen_chain, N5
+        >>> c2 = gen_chain(2)
+        >>> sol = ProductMorphSol(Embedding, c2.type, N5, c2 ** 12)
+        >>> sol.count(), sol.limits is None
+        (0, True)
+        """
+        from ..methods.endomorphisms import kernel_key
+
+        k = len(self.factor_rows)
+        n = len(self.source)
+        kernels = [sorted({kernel_key(row.tolist()) for row in rows})
+                   for rows in self.factor_rows]
+        separable = {}
+
+        def can_separate(i, kernel):
+            # los factores de i en adelante pueden separar lo que queda
+            if max(kernel, default=-1) + 1 == len(kernel):
+                return True
+            if i == k:
+                return False
+            if (i, kernel) not in separable:
+                separable[(i, kernel)] = any(
+                    can_separate(i + 1, kernel_key(list(zip(kernel, other))))
+                    for other in kernels[i])
+            return separable[(i, kernel)]
+
+        start = (0, np.zeros(n, dtype=np.int64), (0,) * n)
+        if self.inj and not can_separate(0, start[2]):
+            return
+        stack = [start]
+        while stack:
+            i, values, kernel = stack.pop()
+            if self.limits is not None and not self.limits.step():
+                return
+            if i == k:
+                row = values.tolist()
+                if self.accepts(row):
+                    yield row
+                continue
+            children = []
+            for factor_row in self.factor_rows[i]:
+                new = values + factor_row * self.strides[i]
+                if self.surj and len(set(new.tolist())) < self.covers[i]:
+                    continue
+                if self.inj:
+                    new_kernel = kernel_key(list(zip(kernel,
+                                                     factor_row.tolist())))
+                    if not can_separate(i + 1, new_kernel):
+                        continue
+                else:
+                    new_kernel = kernel
+                children.append((i + 1, new, new_kernel))
+            stack += reversed(children)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Planificador asincronico (asyncio) de consultas de morfismos a Minion.
+Cada consulta corre en su propio proceso, con limites de tiempo y de nodos
+que se pasan a Minion; la cantidad de Minions corriendo a la vez esta
+acotada. Las soluciones se consumen con iteradores asincronicos.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from ...semantics import Embedding, Isomorphism
+from ..files import remove
+from ..invariants import invariants
+from .minion import (MorphismModel, parse_solution, morph_solver,
+                     MorphMinionSol, discarded)
+
+
+class MinionScheduler(object):
+
+    """
+    Corre consultas de morfismos a Minion con asyncio.
+    concurrency acota los Minions simultaneos (por defecto, las CPUs).
+
+    Los limites son por consulta: timelimit (segundos de reloj) se le pasa
+    a Minion y ademas se controla desde Python, y si se alcanza se levanta
+    asyncio.TimeoutError; nodelimit se le pasa a Minion, que al llegar al
+    limite termina, asi que la enumeracion puede quedar incompleta. El
+    resolvedor en Python cumple los mismos limites.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> from folpy.semantics import Homomorphism
+    >>> async def homs(**kwargs):
+    ...     scheduler = MinionScheduler()
+    ...     try:
+    ...         return len([h async for h in scheduler.morphisms(
+    ...             Homomorphism, rhombus.type, gen_chain(2), rhombus,
+    ...             **kwargs)])
+    ...     except asyncio.TimeoutError:
+    ...         return "timeout"
+    >>> asyncio.run(homs()), asyncio.run(homs(nodelimit=3)) < 9
+    (9, True)
+    >>> asyncio.run(homs(timelimit=0))
+    'timeout'
+    >>> asyncio.run(MinionScheduler().is_isomorphic_to_any(
+    ...     rhombus, [rhombus], rhombus.type, timelimit=0)) is None
+    True
+
+    Las consultas que los invariantes descartan no se corren:
+
+    >>> asyncio.run(MinionScheduler().first(
+    ...     Isomorphism, rhombus.type, gen_chain(4), rhombus, timelimit=0))
+    False
+    """
+
+    def __init__(self, concurrency=None, executable=None):
+        self.path = os.path.dirname(os.path.abspath(__file__))
+        self.executable = executable or os.path.join(self.path, "minion")
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.semaphore = None
+
+    def limit(self):
+        # el semaforo se crea dentro del loop que lo usa
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.semaphore
+
+    async def run(self, input_data, allsols=True, timelimit=None,
+                  nodelimit=None):
+        """
+        Iterador asincronico de las soluciones ({(i,): v}) de un input de
+        Minion
+        """
+        args = ["-printsolsonly", "-randomseed", "0"]
+        if allsols:
+            args.append("-findallsols")
+        if timelimit is not None:
+            args += ["-timelimit", str(int(timelimit) + 1)]
+        if nodelimit is not None:
+            args += ["-nodelimit", str(int(nodelimit))]
+        loop = asyncio.get_running_loop()
+
+        async with self.limit():
+            deadline = None
+            if timelimit is not None:
+                deadline = loop.time() + timelimit
+            with tempfile.NamedTemporaryFile("w", suffix=".minion",
+                                             delete=False) as open_file:
+                if isinstance(input_data, str):
+                    input_data = [input_data]
+                for chunk in input_data:
+                    open_file.write(chunk)
+                filename = open_file.name
+            process = None
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.executable, *(args + [filename]),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE)
+                while True:
+                    line = process.stdout.readline()
+                    if deadline is not None:
+                        line = asyncio.wait_for(line, deadline - loop.time())
+                    line = (await line).decode("utf-8")
+                    if not line:
+                        break
+                    try:
+                        solution = parse_solution(line)
+                    except ValueError:
+                        line += (await process.stdout.read()).decode("utf-8")
+                        raise ValueError("Minion Error:\n%s" % line)
+                    yield solution
+                    if not allsols:
+                        return
+                error = (await process.stderr.read()).decode("utf-8")
+                await process.wait()
+                if error:
+                    raise ValueError("Minion Error:\n%s" % error)
+            finally:
+                if process is not None and process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                remove(filename)
+
+    async def morphisms(self, morph_type, subtype, source, target, inj=None,
+                        surj=None, allsols=True, without=[], timelimit=None,
+                        nodelimit=None, backend=None):
+        """
+        Iterador asincronico de los morfismos de source en target.
+        Como en la API sincronica, si la consulta se descarta por
+        cardinalidad o por invariantes no se busca nada.
+        Si el problema le toca al resolvedor en Python, cada solucion se
+        busca en un hilo para no frenar el loop, y los limites se controlan
+        dentro de la busqueda (ver SearchLimit): el tiempo cuenta desde que
+        la consulta consigue su lugar y al cerrar el iterador la busqueda
+        se detiene.
+        """
+        if morph_type in (Embedding, Isomorphism):
+            inj = True
+        if morph_type == Isomorphism:
+            surj = True
+        if discarded(morph_type, subtype, source, target, inj, surj):
+            return
+        solver = morph_solver(source, target, backend, subtype)
+        if solver != MorphMinionSol:
+            loop = asyncio.get_running_loop()
+            async with self.limit():
+                solutions = solver(morph_type, subtype, source, target, inj,
+                                   surj, allsols, without)
+                limits = solutions.set_limits(timelimit, nodelimit)
+                try:
+                    while not solutions.EOF:
+                        solution = await loop.run_in_executor(
+                            None, solutions.next_solution)
+                        if solution:
+                            yield solutions.fun(solution)
+                except TimeoutError:
+                    raise asyncio.TimeoutError()
+                finally:
+                    limits.stop()
+            return
+
+        model = MorphismModel(morph_type, subtype, source, target, inj, surj)
+        solutions = self.run(model.input_data(without), allsols, timelimit,
+                             nodelimit)
+        try:
+            async for solution in solutions:
+                yield model.fun(solution)
+        finally:
+            await solutions.aclose()
+
+    async def first(self, morph_type, subtype, source, target, **kwargs):
+        """
+        Devuelve el primer morfismo de source en target, o False
+        """
+        kwargs["allsols"] = False
+        solutions = self.morphisms(morph_type, subtype, source, target,
+                                   **kwargs)
+        try:
+            async for solution in solutions:
+                return solution
+        finally:
+            await solutions.aclose()
+        return False
+
+    async def first_of(self, queries, **kwargs):
+        """
+        Corre varias consultas de existencia (tuplas de argumentos de
+        first, con los mismos kwargs) a la vez y devuelve la primera
+        respuesta positiva, cancelando las demas. Una consulta que se pasa
+        del tiempo queda sin respuesta: si ninguna tiene solucion devuelve
+        False, o None si alguna quedo sin respuesta.
+        """
+        tasks = [asyncio.ensure_future(self.first(*query, **kwargs))
+                 for query in queries]
+        unknown = False
+        try:
+            for task in asyncio.as_completed(tasks):
+                try:
+                    result = await task
+                except asyncio.TimeoutError:
+                    unknown = True
+                    continue
+                if result:
+                    return result
+            return None if unknown else False
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def is_isomorphic_to_any(self, source, targets, subtype,
+                                   **kwargs):
+        """
+        Devuelve un isomorfismo de source en alguno de targets, False si
+        no hay o None si alguna consulta se paso del tiempo
+        """
+        source_invariants = invariants(source, subtype)
+        return await self.first_of(
+            [(Isomorphism, subtype, source, target) for target in targets
+             if invariants(target, subtype) == source_invariants],
+            **kwargs)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+import time
+from itertools import islice
+
+
+class SearchLimit(object):
+
+    """
+    Limites de una busqueda en Python: timelimit segundos de reloj desde
+    que se crea y nodelimit nodos. La busqueda llama a step en cada nodo:
+    levanta TimeoutError si se paso el tiempo o si se la detuvo con stop, y
+    devuelve False si se paso de nodos, y ahi la busqueda termina como si
+    no hubiera mas soluciones (como Minion con -nodelimit).
+
+    >>> limit = SearchLimit(nodelimit=2)
+    >>> limit.step(), limit.step(), limit.step()
+    (True, True, False)
+    >>> limit.stop()
+    >>> limit.step()
+    Traceback (most recent call last):
+        ...
+    TimeoutError: Search stopped.
+    """
+
+    def __init__(self, timelimit=None, nodelimit=None):
+        self.deadline = None
+        if timelimit is not None:
+            self.deadline = time.monotonic() + timelimit
+        self.nodelimit = nodelimit
+        self.nodes = 0
+        self.stopped = False
+
+    def step(self, nodes=1):
+        self.nodes += nodes
+        if self.stopped:
+            raise TimeoutError("Search stopped.")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError("Time limit reached.")
+        return self.nodelimit is None or self.nodes <= self.nodelimit
+
+    def stop(self):
+        """
+        Detiene la busqueda en el proximo nodo (desde otro hilo)
+        """
+        self.stopped = True
+
+
+class LazySolutions(object):
+
+    """
+    Interfaz comun de los resolvedores: se comporta como una lista de
+    soluciones que se van calculando a medida que se piden.
+    Las subclases implementan next_solution, que bloquea hasta conseguir una
+    solucion (un diccionario {(i,): v}) o devuelve None y marca EOF.
+
+    Para conjuntos grandes de soluciones, arrays y stream las recorren sin
+    guardarlas; despues de eso ya no se puede usar como lista.
+    """
+
+    def __init__(self, allsols=True, fun=lambda x: x):
+        self.fun = fun
+        self.allsols = allsols
+        self.EOF = False
+        self.solutions = []
+        self.streamed = False
+        self.limits = None
+
+    def next_solution(self):
+        raise NotImplementedError
+
+    def set_limits(self, timelimit=None, nodelimit=None):
+        """
+        Acota lo que falta de la busqueda (ver SearchLimit), para los
+        resolvedores en Python. Devuelve el SearchLimit.
+        """
+        self.limits = SearchLimit(timelimit, nodelimit)
+        return self.limits
+
+    def next_batch(self, size):
+        """
+        Devuelve hasta size soluciones nuevas como listas de valores (-1 si
+        esta indefinido), sin guardarlas. Si devuelve menos es porque no
+        hay mas.
+        """
+        batch = []
+        while len(batch) < size and not self.EOF:
+            solution = self.next_solution()
+            if solution:
+                batch.append([-1 if solution[(i,)] is None else solution[(i,)]
+                              for i in range(len(solution))])
+        return batch
+
+    def arrays(self, batch=1024):
+        """
+        Genera las soluciones en bloques de a lo sumo batch: arrays de numpy
+        de enteros, con una solucion por fila. No guarda las soluciones.
+        """
+        import numpy as np
+
+        if self.solutions:
+            yield np.array([[-1 if s[(i,)] is None else s[(i,)]
+                             for i in range(len(s))]
+                            for s in self.solutions], dtype=np.int64)
+        while not self.EOF:
+            self.streamed = True
+            rows = self.next_batch(batch)
+            if len(rows):
+                yield np.asarray(rows, dtype=np.int64)
+
+    def stream(self, batch=1024, view=True):
+        """
+        Genera las soluciones de a una sin guardarlas, leyendolas en bloques
+        de batch. Con view son MorphismView, que arman la solucion con fun
+        recien cuando se la usa; si no, son las filas de enteros.
+        """
+        for block in self.arrays(batch):
+            for row in block:
+                yield MorphismView(row, self.fun) if view else row
+
+    def check_retained(self):
+        if self.streamed:
+            raise ValueError("The solutions were streamed, not retained.")
+
+    def __iter__(self):
+        self.check_retained()
+        for solution in self.solutions:
+            yield self.fun(solution)
+
+        while not self.EOF:
+            solution = self.next_solution()
+            if solution:
+                self.solutions.append(solution)
+                yield self.fun(solution)
+
+    def __getitem__(self, index):
+        try:
+            return self.fun(self.solutions[index])
+        except IndexError:
+            for i, solution in enumerate(self):
+                if i == index:
+                    # no hace falta aplicar self.fun porque esta llamando a
+                    # __iter__
+                    return solution
+            raise IndexError("There aren't so many solutions.")
+
+    def __bool__(self):
+        self.check_retained()
+        if self.solutions or self.EOF:
+            return bool(self.solutions)
+        else:
+            solution = self.next_solution()
+            if solution:
+                self.solutions.append(solution)
+                return True
+            else:
+                return False
+
+    def __len__(self):
+        self.check_retained()
+        if not self.EOF:
+            for i in self:
+                pass
+        return len(self.solutions)
+
+
+class SearchSolutions(LazySolutions):
+
+    """
+    Soluciones de los resolvedores en Python cuya busqueda es un generador
+    (self.search) de listas de valores
+    """
+
+    def next_solution(self):
+        """
+        Devuelve la siguiente solucion o None si no hay mas
+        """
+        if self.EOF:
+            return None
+        values = next(self.search, None)
+        if values is None or not self.allsols:
+            self.EOF = True
+        if values is None:
+            return None
+        return {(i,): v for i, v in enumerate(values)}
+
+    def next_batch(self, size):
+        """
+        Toma hasta size soluciones directo de la busqueda
+        """
+        if self.EOF:
+            return []
+        if not self.allsols:
+            size = 1
+        batch = list(islice(self.search, size))
+        if len(batch) < size or not self.allsols:
+            self.EOF = True
+        return batch
+
+
+class MorphismView(object):
+
+    """
+    Vista perezosa de una solucion: guarda solo su fila de enteros y arma
+    la solucion con fun la primera vez que hace falta. Si fun viene de
+    morphism_fun, evaluar la vista en un elemento no arma el morfismo.
+
+    >>> from folpy.semantics import Homomorphism
+    >>> from folpy.examples.posets import gen_chain
+    >>> c2 = gen_chain(2)
+    >>> fun = morphism_fun(Homomorphism, c2.type, c2, c2)
+    >>> view = MorphismView([1, 1], fun)
+    >>> view(0), view.built is None
+    (1, True)
+    >>> sorted(view.dict.items())
+    [((0,), 1), ((1,), 1)]
+    """
+
+    __slots__ = ("row", "fun", "built")
+
+    def __init__(self, row, fun):
+        self.row = row
+        self.fun = fun
+        self.built = None
+
+    def morphism(self):
+        """
+        Devuelve la solucion armada con fun
+        """
+        if self.built is None:
+            self.built = self.fun({(i,): None if v == -1 else int(v)
+                                   for i, v in enumerate(self.row)})
+        return self.built
+
+    def __call__(self, *args):
+        index = getattr(self.fun, "index", None)
+        if index is not None and len(args) == 1 and args[0] in index:
+            value = self.row[index[args[0]]]
+            if value != -1:
+                return self.fun.target_universe[value]
+        return self.morphism()(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.morphism(), name)
+
+    def __repr__(self):
+        return repr(self.morphism())
+
+
+def morphism_fun(morph_type, subtype, source, target, inj=None, surj=None):
+    """
+    Devuelve la funcion que convierte una solucion {(i,): v} sobre los
+    indices de los universos en un morfismo de morph_type
+    """
+    source_universe = list(source.universe)
+    target_universe = list(target.universe)
+
+    def fun(x):
+        return morph_type(
+            {(source_universe[k[0]],): target_universe[v]
+                for k, v in x.items()},
+            source,
+            target,
+            subtype,
+            antitype=[],
+            inj=inj,
+            surj=surj
+            )  # funcion que tipa los morfismos
+    fun.index = {x: i for i, x in enumerate(source_universe)}
+    fun.target_universe = target_universe
+    return fun
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
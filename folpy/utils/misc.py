@@ -62,6 +62,20 @@ def compose(f, g):
     return composition
 
 
+def bits(mask):
+    """
+    Generador de los indices de los bits prendidos de mask, de menor a
+    mayor
+
+    >>> list(bits(0b10110))
+    [1, 2, 4]
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
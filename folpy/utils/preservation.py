@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+"""
+Verificacion vectorizada (con numpy) de que una funcion entre universos
+preserva operaciones y relaciones. La funcion se da como array de indices
+(ver Homomorphism.array) y cada verificacion devuelve la primer tupla que
+la rompe, o None.
+"""
+
+import numpy as np
+
+from .tables import indexed_tables
+
+
+def operation_array(tables, op):
+    """
+    Tabla plana de la operacion como array, con -1 donde no esta definida.
+    Se calcula una vez por modelo.
+    """
+    key = ("operation_array", op)
+    if key not in tables.cache:
+        tables.cache[key] = np.array(
+            [-1 if v is None else v for v in tables.operation(op)],
+            dtype=np.int64)
+    return tables.cache[key]
+
+
+def relation_array(tables, rel):
+    """
+    Filas de la relacion como array (una tupla de indices por fila) y sus
+    codigos en base n ordenados. Se calcula una vez por modelo.
+    """
+    key = ("relation_array", rel)
+    if key not in tables.cache:
+        arity = tables.arity(rel)
+        rows = np.array(sorted(tables.relation(rel)),
+                        dtype=np.int64).reshape(-1, arity)
+        tables.cache[key] = (rows, np.sort(encode(rows, tables.n)))
+    return tables.cache[key]
+
+
+def encode(rows, n):
+    """
+    Codigo en base n de cada fila
+
+    >>> encode(np.array([[0, 1], [1, 1]]), 2).tolist()
+    [1, 3]
+    """
+    codes = np.zeros(len(rows), dtype=np.int64)
+    for j in range(rows.shape[1]):
+        codes = codes * n + rows[:, j]
+    return codes
+
+
+def arguments(n, arity):
+    """
+    Todas las tuplas de argumentos en el orden de las tablas planas, como
+    array de forma (n ** arity, arity)
+
+    >>> arguments(2, 2).tolist()
+    [[0, 0], [0, 1], [1, 0], [1, 1]]
+    >>> arguments(3, 0).shape
+    (1, 0)
+    """
+    if arity == 0:
+        return np.zeros((1, 0), dtype=np.int64)
+    return np.indices((n,) * arity).reshape(arity, -1).T
+
+
+def operation_violation(values, source, target, op):
+    """
+    Devuelve la primer tupla de argumentos (elementos de source) en la que
+    f(op_A(args)) != op_B(f(args)), o None si f preserva op. Las filas en las
+    que op_A o f no estan definidas no se miran.
+
+    >>> from folpy.examples.lattices import gen_chain
+    >>> c3 = gen_chain(3)
+    >>> operation_violation(np.array([0, 2, 2]), c3, c3, "^") is None
+    True
+    >>> operation_violation(np.array([0, 2, 1]), c3, c3, "^")
+    (1, 2)
+    """
+    A = indexed_tables(source)
+    B = indexed_tables(target)
+    values = np.asarray(values, dtype=np.int64)
+    table_a = operation_array(A, op)
+    table_b = operation_array(B, op)
+    arity = A.arity(op)
+    args = arguments(A.n, arity)
+    images = values[args]
+    defined = (table_a != -1) & np.all(images != -1, axis=1)
+    defined[defined] &= values[table_a[defined]] != -1
+    expected = np.full(len(table_a), -1, dtype=np.int64)
+    expected[defined] = values[table_a[defined]]
+    found = np.full(len(table_a), -1, dtype=np.int64)
+    found[defined] = table_b[encode(images[defined], B.n)]
+    wrong = np.flatnonzero(defined & (found != expected))
+    if len(wrong):
+        return tuple(A.universe[i] for i in args[wrong[0]])
+    return None
+
+
+def relation_violation(values, source, target, rel, inverse=False):
+    """
+    Devuelve la primer tupla de rel en source (elementos de source) cuya
+    imagen no esta en rel en target, o None si f preserva rel. Las tuplas
+    con elementos donde f no esta definida no se miran.
+    Con inverse, en cambio, verifica que f refleje rel: devuelve la primer
+    tupla de rel en target (elementos de target), con todos sus elementos
+    en la imagen, que no es imagen de una tupla de rel en source.
+
+    >>> from folpy.examples.posets import gen_chain, rhombus
+    >>> c2 = gen_chain(2)
+    >>> relation_violation(np.array([1, 0]), c2, c2, "<=")
+    (0, 1)
+    >>> relation_violation(np.array([0, 1]), c2, rhombus, "<=") is None
+    True
+    >>> f = np.array([0, 3, 1, 2])
+    >>> relation_violation(f, rhombus, gen_chain(4), "<=") is None
+    True
+    >>> relation_violation(f, rhombus, gen_chain(4), "<=", inverse=True)
+    (1, 2)
+    """
+    A = indexed_tables(source)
+    B = indexed_tables(target)
+    values = np.asarray(values, dtype=np.int64)
+    rows_a = relation_array(A, rel)[0]
+    rows_b, codes_b = relation_array(B, rel)
+    images = values[rows_a]
+    defined = np.all(images != -1, axis=1)
+    images = images[defined]
+    if not inverse:
+        wrong = np.flatnonzero(~np.isin(encode(images, B.n), codes_b))
+        if len(wrong):
+            row = rows_a[np.flatnonzero(defined)[wrong[0]]]
+            return tuple(A.universe[i] for i in row)
+        return None
+    in_image = np.zeros(B.n, dtype=bool)
+    in_image[values[values != -1]] = True
+    inside = np.all(in_image[rows_b], axis=1)
+    mapped = encode(images, B.n)
+    wrong = np.flatnonzero(inside & ~np.isin(codes_b, mapped))
+    if len(wrong):
+        # codes_b esta ordenado, hay que recuperar la fila
+        row = rows_b[np.flatnonzero(encode(rows_b, B.n) ==
+                                    codes_b[wrong[0]])[0]]
+        return tuple(B.universe[i] for i in row)
+    return None
+
+
+def morphism_violation(values, source, target, subtype, inverse=False):
+    """
+    Verifica todas las operaciones y relaciones del subtype (y con inverse
+    tambien la reflexion de las relaciones). Devuelve (simbolo, tupla) de la
+    primer violacion, o None si f es morfismo.
+
+    >>> from folpy.examples.lattices import gen_chain, rhombus
+    >>> morphism_violation([0, 1, 1, 1], rhombus, gen_chain(2), rhombus.type)
+    ('^', (1, 2))
+    """
+    values = np.asarray(values, dtype=np.int64)
+    for op in sorted(subtype.operations):
+        violation = operation_violation(values, source, target, op)
+        if violation is not None:
+            return (op, violation)
+    for rel in sorted(subtype.relations):
+        violation = relation_violation(values, source, target, rel)
+        if violation is None and inverse:
+            violation = relation_violation(values, source, target, rel,
+                                           inverse=True)
+        if violation is not None:
+            return (rel, violation)
+    return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
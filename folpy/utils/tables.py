@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+import hashlib
+from itertools import product
+
+
+class IndexedTables(object):
+
+    """
+    Tablas de las operaciones y relaciones de un modelo sobre los indices
+    de su universo. Las operaciones se guardan como una lista plana en base
+    mixta (el indice de (a1,...,ak) es a1*n^(k-1) + ... + ak) con None donde
+    no estan definidas, y las relaciones como conjuntos de tuplas de
+    indices. Cada tabla se calcula una sola vez, la primera vez que se pide;
+    cache guarda datos derivados de las tablas (por ejemplo los bloques que
+    se le pasan a Minion).
+
+    >>> from folpy.examples.lattices import rhombus
+    >>> tables = IndexedTables(rhombus)
+    >>> tables.operation("v")[:4]
+    [0, 1, 2, 3]
+    >>> from folpy.examples.posets import gen_chain
+    >>> sorted(IndexedTables(gen_chain(2)).relation("<="))
+    [(0, 0), (0, 1), (1, 1)]
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.universe = list(model.universe)
+        self.index = {x: i for i, x in enumerate(self.universe)}
+        self.n = len(self.universe)
+        self.operations = {}
+        self.relations = {}
+        self.cache = {}
+        self.digest = None
+
+    def arity(self, symbol):
+        """
+        Aridad de una operacion o relacion del modelo
+        """
+        if symbol in self.model.operations:
+            return self.model.operations[symbol].arity()
+        return self.model.relations[symbol].arity()
+
+    def operation(self, op):
+        """
+        Devuelve la tabla plana de la operacion op
+        """
+        if op not in self.operations:
+            function = self.model.operations[op]
+            universe = self.universe
+            index = self.index
+            table = []
+            for t in product(range(self.n), repeat=function.arity()):
+                try:
+                    value = function(*[universe[i] for i in t])
+                except ValueError:
+                    value = None
+                table.append(index.get(value))
+            self.operations[op] = table
+        return self.operations[op]
+
+    def relation(self, rel):
+        """
+        Devuelve el conjunto de tuplas de indices de la relacion rel
+        """
+        if rel not in self.relations:
+            index = self.index
+            self.relations[rel] = frozenset(
+                tuple(index[x] for x in row)
+                for row in self.model.relations[rel].table()
+                if all(x in index for x in row))
+        return self.relations[rel]
+
+    def graph(self, op):
+        """
+        Devuelve el grafico de la operacion op como lista de tuplas de
+        indices (argumentos y resultado)
+
+        >>> from folpy.examples.lattices import gen_chain
+        >>> IndexedTables(gen_chain(2)).graph("^")
+        [(0, 0, 0), (0, 1, 0), (1, 0, 0), (1, 1, 1)]
+        """
+        table = self.operation(op)
+        k = self.arity(op)
+        return [t + (table[i],)
+                for i, t in enumerate(product(range(self.n), repeat=k))
+                if table[i] is not None]
+
+    def fingerprint(self):
+        """
+        Huella del modelo: un hash de su universo (con su orden) y de todas
+        sus tablas. Dos modelos con la misma huella tienen los mismos
+        morfismos sobre los indices.
+
+        >>> from folpy.examples.posets import gen_chain
+        >>> a = IndexedTables(gen_chain(3)).fingerprint()
+        >>> a == IndexedTables(gen_chain(3)).fingerprint()
+        True
+        >>> a == IndexedTables(gen_chain(3).restrict([0, 2])).fingerprint()
+        False
+        """
+        if self.digest is None:
+            data = [self.universe]
+            for op in sorted(self.model.operations):
+                data.append((op, self.operation(op)))
+            for rel in sorted(self.model.relations):
+                data.append((rel, sorted(self.relation(rel))))
+            self.digest = hashlib.sha1(repr(data).encode("utf8")).hexdigest()
+        return self.digest
+
+
+def indexed_tables(model):
+    """
+    Devuelve las IndexedTables del modelo, guardandolas en el modelo para
+    reusarlas
+    """
+    if getattr(model, "indexed", None) is None:
+        model.indexed = IndexedTables(model)
+    return model.indexed
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
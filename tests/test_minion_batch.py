@@ -0,0 +1,330 @@
+import re
+from itertools import product
+from unittest import TestCase, skipUnless
+
+from folpy.examples import lattices, posets
+from folpy.semantics import Homomorphism, Embedding, Isomorphism
+from folpy.utils.minion import MinionBatch
+from folpy.utils.minion.batch import batch_input
+from folpy.utils.minion.minion import MorphismModel, minion_available
+from folpy.utils.minion.native import NativeMorphSol
+from folpy.utils.preservation import morphism_violation
+
+
+queries = [
+    (lattices.gen_chain(3), lattices.gen_chain(2)),
+    (lattices.M3, lattices.N5),
+    (lattices.rhombus, lattices.gen_chain(2) ** 2),
+    (lattices.N5, lattices.M3),
+    (lattices.gen_chain(4), lattices.M3),
+    (lattices.gen_chain(2) ** 2, lattices.rhombus),
+    (lattices.M3, lattices.M3),
+]
+
+poset_queries = [
+    (posets.gen_chain(3), posets.rhombus),
+    (posets.rhombus, posets.gen_chain(4)),
+    (posets.M3, posets.gen_chain(2) * posets.gen_chain(3)),
+]
+
+
+@skipUnless(minion_available(), "the Minion executable is not available")
+class MinionBatchTest(TestCase):
+    """
+    Compara las corridas de varias consultas en un solo Minion con el
+    resolvedor en Python. Usa MinionBatch directamente porque
+    batch_morphisms le deja los problemas chicos al resolvedor en Python.
+    """
+
+    def expected(self, morph_type, subtype, queries):
+        return [bool(NativeMorphSol(morph_type, subtype, source, target,
+                                    allsols=False))
+                for source, target in queries]
+
+    def check(self, morph_type, subtype, queries):
+        expected = self.expected(morph_type, subtype, queries)
+        for size in (1, 2, len(queries)):
+            answers = MinionBatch(morph_type, subtype, queries, size=size,
+                                  cores=2).solve()
+            self.assertEqual([bool(a) for a in answers], expected)
+            for answer, (source, target) in zip(answers, queries):
+                if answer:
+                    self.assertIs(answer.source, source)
+                    self.assertIs(answer.target, target)
+                    self.assertIsNone(morphism_violation(
+                        answer.array(), source, target, subtype))
+            found = MinionBatch(morph_type, subtype, queries, size=size,
+                                cores=2).first()
+            if True in expected:
+                self.assertEqual(found[0], expected.index(True))
+            else:
+                self.assertIsNone(found)
+
+    def test_lattices(self):
+        subtype = lattices.M3.type
+        for morph_type in (Homomorphism, Embedding, Isomorphism):
+            self.check(morph_type, subtype, queries)
+
+    def test_posets(self):
+        subtype = posets.M3.type
+        for morph_type in (Homomorphism, Embedding, Isomorphism):
+            self.check(morph_type, subtype, poset_queries)
+
+
+def parse_term(tokens):
+    """
+    Lee un termino de un input de Minion: entero, variable, x[i], lista,
+    conjunto de restricciones o restriccion
+    """
+    token = tokens.pop(0)
+    if token in "[{":
+        items = []
+        while tokens[0] not in "]}":
+            items.append(parse_term(tokens))
+            if tokens[0] == ",":
+                tokens.pop(0)
+        tokens.pop(0)
+        return ("list", items)
+    if re.match(r"-?\d+$", token):
+        return ("int", int(token))
+    if tokens and tokens[0] == "(":
+        tokens.pop(0)
+        args = []
+        while tokens[0] != ")":
+            args.append(parse_term(tokens))
+            if tokens[0] == ",":
+                tokens.pop(0)
+        tokens.pop(0)
+        return ("call", token, args)
+    if tokens and tokens[0] == "[":
+        index = int(tokens[1])
+        del tokens[:3]
+        return ("ref", token, index)
+    return ("var", token)
+
+
+class MinionInput(object):
+    """
+    Input de Minion de batch_input, leido para evaluar asignaciones
+    completas de sus variables
+    """
+
+    def __init__(self, data):
+        self.domains = {}
+        self.tables = {}
+        self.constraints = []
+        section = None
+        lines = iter(data.splitlines())
+        for line in lines:
+            line = line.strip()
+            if line.startswith("**"):
+                section = line
+            elif not line:
+                continue
+            elif section == "**VARIABLES**":
+                match = re.match(r"(\w+) (\w+)(?:\[(\d+)\])?"
+                                 r"(?:\{(-?\d+)\.\.(-?\d+)\})?$", line)
+                kind, name, length, low, high = match.groups()
+                if kind == "BOOL":
+                    low, high = 0, 1
+                self.domains[name] = (int(length) if length else None,
+                                      range(int(low), int(high) + 1))
+            elif section == "**TUPLELIST**":
+                name, rows, _ = line.split()
+                self.tables[name] = {tuple(map(int, next(lines).split()))
+                                     for _ in range(int(rows))}
+            elif section == "**CONSTRAINTS**":
+                tokens = re.findall(r"-?\d+|[\w-]+|[\[\]{}(),]", line)
+                self.constraints.append(parse_term(tokens))
+        self.blocks = self.domains["which"][1]
+        self.tags = [name[:-1] for name in self.domains
+                     if re.match(r"q\d+f$", name)]
+
+    def value(self, term, values):
+        if term[0] == "int":
+            return term[1]
+        if term[0] == "ref":
+            return values[term[1]][term[2]]
+        if term[0] == "var":
+            return values[term[1]]
+        result = []
+        for item in term[1]:
+            value = self.value(item, values)
+            result += value if isinstance(value, list) else [value]
+        return result
+
+    def holds(self, term, values):
+        _, name, args = term
+        if name in ("reify", "reifyimply"):
+            flag = self.value(args[1], values)
+            if name == "reifyimply" and not flag:
+                return True
+            return self.holds(args[0], values) == bool(flag)
+        if name == "watched-or":
+            return any(self.holds(c, values) for c in args[0][1])
+        if name in ("table", "negativetable"):
+            row = tuple(self.value(args[0], values))
+            return (row in self.tables[args[1][1]]) == (name == "table")
+        vals = [self.value(arg, values) for arg in args]
+        if name == "eq":
+            return vals[0] == vals[1]
+        if name == "alldiff":
+            return len(set(vals[0])) == len(vals[0])
+        if name == "occurrencegeq":
+            return vals[0].count(vals[1]) >= vals[2]
+        if name == "element":
+            return 0 <= vals[1] < len(vals[0]) and vals[0][vals[1]] == vals[2]
+        if name == "lexleq":
+            return vals[0] <= vals[1]
+        raise ValueError("restriccion desconocida %s" % name)
+
+    def solutions(self, k):
+        """
+        Generador de los valores de f del bloque k que cumplen todas las
+        restricciones con which = k, en el orden en que los encuentra
+        Minion. Las demas variables toman el valor que las deja libres: g
+        es la inversa de f en su imagen y -1 afuera, y los otros bloques
+        estan apagados.
+        """
+        values = {"which": k, "b": [int(j == k) for j in self.blocks]}
+        for name, (length, domain) in self.domains.items():
+            if name not in values and length:
+                values[name] = [domain[0]] * length
+        f, g = self.tags[k] + "f", self.tags[k] + "g"
+        length, domain = self.domains[f]
+        out = self.domains["out"][0]
+        for fun in product(domain, repeat=length):
+            values[f] = list(fun)
+            if g in values:
+                values[g] = [-1] * self.domains[g][0]
+                for i, v in enumerate(fun):
+                    values[g][v] = i
+            values["out"] = [k] + list(fun) + [-1] * (out - 1 - length)
+            if all(self.holds(c, values) for c in self.constraints):
+                yield fun
+
+    def first(self):
+        """
+        La linea que imprime Minion al buscar una solucion, o None
+        """
+        for k in self.blocks:
+            for fun in self.solutions(k):
+                out = [k] + list(fun)
+                out += [-1] * (self.domains["out"][0] - len(out))
+                return " ".join(map(str, out)) + "\n"
+        return None
+
+
+class CannedJob(object):
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def get(self):
+        return self.lines.pop(0)
+
+    def cancel(self):
+        self.lines = [None]
+
+
+class CannedPool(object):
+    """
+    Pool que contesta cada input con la linea que imprimiria Minion
+    """
+
+    def __init__(self):
+        self.inputs = []
+
+    def submit(self, data, allsols=False):
+        self.inputs.append(data)
+        return CannedJob([MinionInput("".join(data)).first(), None])
+
+
+mixed_queries = [
+    (lattices.gen_chain(3), lattices.gen_chain(2)),
+    (lattices.N5, lattices.gen_chain(2) ** 2),
+    (lattices.rhombus, lattices.gen_chain(4)),
+    (lattices.gen_chain(2), lattices.gen_chain(2) ** 2),
+    (lattices.rhombus, lattices.gen_chain(2) ** 2),
+]
+
+mixed_poset_queries = [
+    (posets.rhombus, posets.gen_chain(4)),
+    (posets.gen_chain(3), posets.rhombus),
+    (posets.gen_chain(2) * posets.gen_chain(2), posets.rhombus),
+]
+
+
+class MinionBatchEncodingTest(TestCase):
+    """
+    Compara la codificacion de batch_input y la lectura de las respuestas
+    con el resolvedor en Python, sin Minion: las restricciones se evaluan
+    en Python y las corridas devuelven la linea que imprimiria Minion.
+    """
+
+    def native(self, morph_type, subtype, source, target, without=[]):
+        return {tuple(morph.array().tolist())
+                for morph in NativeMorphSol(morph_type, subtype, source,
+                                            target)} - \
+            {tuple(morph.array().tolist()) for morph in without}
+
+    def check_encoding(self, morph_type, subtype, queries, withouts):
+        models = [MorphismModel(morph_type, subtype, source, target,
+                                tag="q%s" % k)
+                  for k, (source, target) in enumerate(queries)]
+        data = MinionInput("".join(batch_input(models, withouts)))
+        for k, (source, target) in enumerate(queries):
+            self.assertEqual(set(data.solutions(k)),
+                             self.native(morph_type, subtype, source, target,
+                                         withouts[k]))
+
+    def test_encoding(self):
+        for morph_type in (Homomorphism, Embedding, Isomorphism):
+            self.check_encoding(morph_type, lattices.M3.type, mixed_queries,
+                                [[]] * len(mixed_queries))
+            self.check_encoding(morph_type, posets.M3.type,
+                                mixed_poset_queries,
+                                [[]] * len(mixed_poset_queries))
+
+    def test_encoding_without(self):
+        source, target = mixed_queries[3]
+        without = list(NativeMorphSol(Embedding, lattices.M3.type, source,
+                                      target))[:2]
+        queries = [(source, target), mixed_queries[2]]
+        self.check_encoding(Embedding, lattices.M3.type, queries,
+                            [without, []])
+
+    def check(self, morph_type, subtype, queries):
+        expected = [bool(self.native(morph_type, subtype, *query))
+                    for query in queries]
+        for size in (1, 2, len(queries)):
+            pool = CannedPool()
+            answers = MinionBatch(morph_type, subtype, queries, size=size,
+                                  cores=2, pool=pool).solve()
+            self.assertEqual([bool(a) for a in answers], expected)
+            self.assertTrue(len(pool.inputs) >= -(-len(queries) // size))
+            for answer, (source, target) in zip(answers, queries):
+                if answer:
+                    self.assertIs(answer.source, source)
+                    self.assertIs(answer.target, target)
+                    self.assertIsNone(morphism_violation(
+                        answer.array(), source, target, subtype))
+            found = MinionBatch(morph_type, subtype, queries, size=size,
+                                cores=2, pool=CannedPool()).first()
+            if True in expected:
+                self.assertEqual(found[0], expected.index(True))
+            else:
+                self.assertIsNone(found)
+
+    def test_lattices(self):
+        for morph_type in (Homomorphism, Embedding, Isomorphism):
+            self.check(morph_type, lattices.M3.type, mixed_queries)
+
+    def test_posets(self):
+        for morph_type in (Homomorphism, Embedding, Isomorphism):
+            self.check(morph_type, posets.M3.type, mixed_poset_queries)
+
+    def test_all_unsatisfiable(self):
+        queries = [mixed_queries[2], mixed_queries[4][::-1]]
+        self.check(Embedding, lattices.M3.type, queries[:1])
+        self.check(Isomorphism, lattices.M3.type, queries)